@@ -0,0 +1,121 @@
+"""
+Shared JWT authentication with a short-TTL principal cache.
+
+A principal is the compact part of a user document that authorization
+needs: id, roles, blocked flag and display name. Principals are cached per
+user id through Django's cache framework, so authenticated requests skip
+the users lookup. Writers that change any of these fields call
+invalidate_principal; the TTL bounds staleness in other processes when the
+cache is per-process (the default local-memory backend).
+"""
+import jwt
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.core.cache import cache
+
+from .mongo import users_collection
+
+PRINCIPAL_PROJECTION = {"_id": 1, "roles": 1, "isBlocked": 1, "name": 1, "username": 1}
+
+
+class AuthenticationError(Exception):
+    """Raised when a request cannot be authenticated. Carries the HTTP status."""
+
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def principal_cache_key(user_id):
+    return f"principal:{user_id}"
+
+
+def build_principal(user):
+    """Reduces a user document to the fields authorization needs."""
+    return {
+        "_id": user["_id"],
+        "roles": list(user.get("roles", [])),
+        "isBlocked": bool(user.get("isBlocked", False)),
+        "name": user.get("name") or user.get("username") or ""
+    }
+
+
+def get_principal(user_id):
+    """
+    Returns the cached principal for a user id, loading it on a miss.
+    Returns None when the user does not exist (misses are not cached).
+    """
+    user_oid = user_id if isinstance(user_id, ObjectId) else ObjectId(user_id)
+    key = principal_cache_key(user_oid)
+    principal = cache.get(key)
+    if principal is not None:
+        return principal
+
+    user = users_collection.find_one({"_id": user_oid}, PRINCIPAL_PROJECTION)
+    if not user:
+        return None
+    principal = build_principal(user)
+    cache.set(key, principal, settings.PRINCIPAL_CACHE_TTL)
+    return principal
+
+
+def invalidate_principal(user_id):
+    """Drops a cached principal after its roles, block flag or name change."""
+    cache.delete(principal_cache_key(user_id))
+
+
+def bearer_token(request):
+    """Returns the bearer token from the Authorization header, or None."""
+    auth_header = request.headers.get("Authorization", "")
+    parts = auth_header.split(" ")
+    if len(parts) != 2 or parts[0] != "Bearer" or not parts[1]:
+        return None
+    return parts[1]
+
+
+def user_id_from_token(token):
+    """Decodes a JWT and returns its user_id. Raises AuthenticationError."""
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise AuthenticationError("Token expired")
+    except jwt.InvalidTokenError:
+        raise AuthenticationError("Invalid token")
+    user_id = payload.get("user_id")
+    if not user_id:
+        raise AuthenticationError("Invalid token payload")
+    return user_id
+
+
+def authenticate(request, allow_blocked=False):
+    """
+    Resolves the request's bearer token to a principal.
+    Raises AuthenticationError with the status the view should return.
+    """
+    token = bearer_token(request)
+    if not token:
+        raise AuthenticationError("Authorization header missing or invalid")
+
+    user_id = user_id_from_token(token)
+    try:
+        principal = get_principal(user_id)
+    except (InvalidId, TypeError):
+        raise AuthenticationError("Invalid token payload")
+
+    if not principal:
+        raise AuthenticationError("User not found", status=404)
+    if principal["isBlocked"] and not allow_blocked:
+        raise AuthenticationError("User account is blocked", status=403)
+    return principal
+
+
+def optional_principal(request):
+    """Returns the principal for a valid token, or None for anonymous/invalid ones."""
+    if not bearer_token(request):
+        return None
+    try:
+        return authenticate(request, allow_blocked=True)
+    except AuthenticationError:
+        return None
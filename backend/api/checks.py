@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+from pymongo.errors import PyMongoError
+
+
+# A deploy check, so only `manage.py check --deploy` connects to MongoDB
+@register("mongo", deploy=True)
+def check_mongo_indexes(app_configs, **kwargs):
+    """Warns when the database is missing registered indexes."""
+    if not getattr(settings, "MONGO_VERIFY_INDEXES", True):
+        return []
+
+    from .indexes import missing_index_warnings
+    from .mongo import db
+
+    try:
+        problems = missing_index_warnings(db)
+    except PyMongoError as e:
+        return [Warning(f"Could not verify MongoDB indexes: {e}", id="api.W002")]
+
+    return [
+        Warning(problem, hint="Run `python manage.py ensure_indexes`.", id="api.W001")
+        for problem in problems
+    ]
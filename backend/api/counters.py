@@ -0,0 +1,207 @@
+"""
+Maintained counters for homepage and dashboard statistics.
+
+Writers adjust a single `stats` document with atomic $inc updates so reads
+never have to count whole collections. A periodic task reconciles the
+counters against the collections to correct any drift.
+
+Each species also carries `observations_count` and per-status
+`status_counts`. Every observation write goes through ObservationCounters,
+which moves an observation's contribution from its old species/status to
+the new one with paired $inc updates.
+"""
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+STATS_DOC_ID = "global"
+STAT_FIELDS = ("species", "users", "observations", "pending", "complete_observations")
+
+# An observation counts as complete when it has all of these
+COMPLETE_OBSERVATION_QUERY = {
+    "species_id": {"$exists": True},
+    "location_id": {"$exists": True},
+    "timestamp": {"$exists": True},
+    "photo": {"$exists": True, "$ne": []}
+}
+
+
+def is_complete_observation(doc):
+    """Mirrors COMPLETE_OBSERVATION_QUERY for a single observation document."""
+    return all(field in doc for field in ("species_id", "location_id", "timestamp")) and bool(doc.get("photo"))
+
+
+def observation_stat_deltas(before, after):
+    """
+    Returns the pending/complete counter changes between two versions of an
+    observation. Either side may be None for inserts and deletes.
+    """
+    deltas = {"observations": 0, "pending": 0, "complete_observations": 0}
+    for doc, sign in ((before, -1), (after, 1)):
+        if doc is None:
+            continue
+        deltas["observations"] += sign
+        deltas["pending"] += sign * (doc.get("status") == "pending")
+        deltas["complete_observations"] += sign * is_complete_observation(doc)
+    return deltas
+
+
+def increment_stats(db, **deltas):
+    """Atomically applies counter deltas, creating the stats document if needed."""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    db["stats"].update_one(
+        {"_id": STATS_DOC_ID},
+        {"$inc": deltas, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+# Observation fields the counters depend on; writers fetch these as the "before" document
+COUNTER_FIELDS = {"species_id": 1, "status": 1, "location_id": 1, "timestamp": 1, "photo": 1}
+
+
+def species_contribution(doc):
+    """Returns the species counter fields an observation adds to, or None if it has no species."""
+    if doc is None or not doc.get("species_id"):
+        return None
+    return doc["species_id"], ("observations_count", f"status_counts.{doc.get('status') or 'unknown'}")
+
+
+class ObservationCounters:
+    """
+    Collects the counter changes of one or more observation writes and
+    applies them together: one stats update and one species bulk_write.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+        self.species = defaultdict(Counter)
+
+    def add(self, before, after):
+        """Records a write that turned `before` into `after` (None for inserts and deletes)."""
+        self.stats.update(observation_stat_deltas(before, after))
+        for doc, sign in ((before, -1), (after, 1)):
+            contribution = species_contribution(doc)
+            if contribution:
+                species_id, fields = contribution
+                for field in fields:
+                    self.species[species_id][field] += sign
+
+    def species_updates(self):
+        updates = []
+        for species_id, deltas in self.species.items():
+            deltas = {field: value for field, value in deltas.items() if value}
+            if deltas:
+                updates.append(UpdateOne({"_id": species_id}, {"$inc": deltas}))
+        return updates
+
+    def apply(self, db, **extra_stats):
+        """Writes the collected changes; extra_stats are added to the global counters."""
+        # Counter addition would drop negative deltas, so update() is used
+        self.stats.update(extra_stats)
+        increment_stats(db, **self.stats)
+        updates = self.species_updates()
+        if updates:
+            db["species"].bulk_write(updates, ordered=False)
+        self.stats.clear()
+        self.species.clear()
+
+
+def record_observation_change(db, before, after):
+    """Applies the global and species counter changes for a single observation write."""
+    counters = ObservationCounters()
+    counters.add(before, after)
+    counters.apply(db)
+
+
+def compute_stats(db):
+    """Counts every statistic from the collections themselves."""
+    return {
+        "species": db["species"].count_documents({}),
+        "users": db["users"].count_documents({}),
+        "observations": db["observations"].count_documents({}),
+        "pending": db["observations"].count_documents({"status": "pending"}),
+        "complete_observations": db["observations"].count_documents(COMPLETE_OBSERVATION_QUERY)
+    }
+
+
+def reconcile_stats(db):
+    """Overwrites the counters with freshly computed values and returns them."""
+    stats = compute_stats(db)
+    now = datetime.utcnow()
+    db["stats"].update_one(
+        {"_id": STATS_DOC_ID},
+        {"$set": {**stats, "updated_at": now, "reconciled_at": now}},
+        upsert=True
+    )
+    logger.info(f"[STATS] Reconciled counters: {stats}")
+    return stats
+
+
+def reconcile_species_counts(db):
+    """Recomputes every species' observations_count and status_counts. Returns the species count."""
+    totals = defaultdict(lambda: {"observations_count": 0, "status_counts": {}})
+    pipeline = [
+        {"$match": {"species_id": {"$ne": None}}},
+        {"$group": {"_id": {"species_id": "$species_id", "status": "$status"}, "count": {"$sum": 1}}}
+    ]
+    for row in db["observations"].aggregate(pipeline):
+        species = totals[row["_id"]["species_id"]]
+        species["observations_count"] += row["count"]
+        species["status_counts"][row["_id"].get("status") or "unknown"] = row["count"]
+
+    updates = [UpdateOne({"_id": species_id}, {"$set": counts}) for species_id, counts in totals.items()]
+    if updates:
+        db["species"].bulk_write(updates, ordered=False)
+    db["species"].update_many(
+        {"_id": {"$nin": list(totals)}},
+        {"$set": {"observations_count": 0, "status_counts": {}}}
+    )
+    logger.info(f"[STATS] Reconciled observation counts for {len(totals)} species")
+    return len(totals)
+
+
+def read_stats(db):
+    """
+    Reads the counters in a single fetch.
+    Falls back to a reconcile the first time, before any counter exists.
+    """
+    doc = db["stats"].find_one({"_id": STATS_DOC_ID})
+    if not doc or "reconciled_at" not in doc:
+        return reconcile_stats(db)
+    return {field: max(doc.get(field, 0), 0) for field in STAT_FIELDS}
+
+
+async def areconcile_stats(adb):
+    """Async reconcile for ASGI views; the counts run concurrently."""
+    observations = adb["observations"]
+    counts = await asyncio.gather(
+        adb["species"].count_documents({}),
+        adb["users"].count_documents({}),
+        observations.count_documents({}),
+        observations.count_documents({"status": "pending"}),
+        observations.count_documents(COMPLETE_OBSERVATION_QUERY)
+    )
+    stats = dict(zip(STAT_FIELDS, counts))
+    now = datetime.utcnow()
+    await adb["stats"].update_one(
+        {"_id": STATS_DOC_ID},
+        {"$set": {**stats, "updated_at": now, "reconciled_at": now}},
+        upsert=True
+    )
+    return stats
+
+
+async def aread_stats(adb):
+    """Async read_stats for ASGI views."""
+    doc = await adb["stats"].find_one({"_id": STATS_DOC_ID})
+    if not doc or "reconciled_at" not in doc:
+        return await areconcile_stats(adb)
+    return {field: max(doc.get(field, 0), 0) for field in STAT_FIELDS}
@@ -0,0 +1,117 @@
+"""
+Admin dashboard statistics snapshot.
+
+One $facet aggregation over observations computes the totals, pending and
+complete counts and the per-status and per-source breakdowns in a single
+pass; a small $group over users adds the user totals. The result is stored
+as a snapshot document in the `stats` collection, so the dashboard reads one
+document. Snapshots older than DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS are still
+served, and a background refresh is queued.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DOC_ID = "dashboard"
+
+# Held while a refresh is queued so concurrent stale reads queue only one
+REFRESH_LOCK_KEY = "dashboard:refresh-queued"
+
+# Expression form of counters.COMPLETE_OBSERVATION_QUERY
+IS_COMPLETE = {"$and": [
+    {"$ne": [{"$type": "$species_id"}, "missing"]},
+    {"$ne": [{"$type": "$location_id"}, "missing"]},
+    {"$ne": [{"$type": "$timestamp"}, "missing"]},
+    {"$gt": [{"$size": {"$ifNull": ["$photo", []]}}, 0]},
+]}
+
+# Synced observations keep their iNaturalist link; uploads have none
+OBSERVATION_SOURCE = {"$cond": [{"$gt": ["$external_link", None]}, "inaturalist", "upload"]}
+
+OBSERVATION_FACETS = [
+    {"$facet": {
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "observations": {"$sum": 1},
+                "pending": {"$sum": {"$cond": [{"$eq": ["$status", "pending"]}, 1, 0]}},
+                "complete_observations": {"$sum": {"$cond": [IS_COMPLETE, 1, 0]}},
+            }}
+        ],
+        "by_status": [
+            {"$group": {"_id": {"$ifNull": ["$status", "unknown"]}, "count": {"$sum": 1}}}
+        ],
+        "by_source": [
+            {"$group": {"_id": OBSERVATION_SOURCE, "count": {"$sum": 1}}}
+        ],
+    }}
+]
+
+USER_SOURCES = [
+    {"$group": {"_id": {"$ifNull": ["$source", "manual"]}, "count": {"$sum": 1}}}
+]
+
+
+def _breakdown(rows):
+    return {str(row["_id"]): row["count"] for row in rows}
+
+
+def compute_snapshot(db):
+    """Runs the dashboard aggregations and returns the snapshot fields."""
+    facets = next(db["observations"].aggregate(OBSERVATION_FACETS), {})
+    totals = (facets.get("totals") or [{}])[0]
+    users_by_source = _breakdown(db["users"].aggregate(USER_SOURCES))
+
+    observations = totals.get("observations", 0)
+    complete = totals.get("complete_observations", 0)
+    return {
+        "observations": observations,
+        "pending": totals.get("pending", 0),
+        "complete_observations": complete,
+        "data_completeness": round(complete / observations * 100, 1) if observations else 0,
+        "users": sum(users_by_source.values()),
+        "observations_by_status": _breakdown(facets.get("by_status", [])),
+        "observations_by_source": _breakdown(facets.get("by_source", [])),
+        "users_by_source": users_by_source,
+    }
+
+
+def refresh_snapshot(db):
+    """Recomputes and stores the snapshot. Returns the stored document."""
+    snapshot = {**compute_snapshot(db), "computed_at": datetime.utcnow()}
+    db["stats"].replace_one({"_id": SNAPSHOT_DOC_ID}, snapshot, upsert=True)
+    cache.delete(REFRESH_LOCK_KEY)
+    logger.info(f"[STATS] Refreshed dashboard snapshot: {snapshot['observations']} observations")
+    return snapshot
+
+
+def queue_refresh():
+    """Queues one background refresh; a failed dispatch is only logged."""
+    if not cache.add(REFRESH_LOCK_KEY, True, settings.DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS):
+        return
+    # Imported here because tasks.py imports the views that use this module
+    from .tasks import refresh_dashboard_snapshot
+    try:
+        refresh_dashboard_snapshot.delay()
+    except Exception as e:
+        cache.delete(REFRESH_LOCK_KEY)
+        logger.warning(f"[STATS] Could not queue dashboard refresh: {e}")
+
+
+def read_snapshot(db):
+    """
+    Returns the stored snapshot, queueing a refresh when it is older than the
+    max age. Only the very first read, before any snapshot exists, computes
+    it inline.
+    """
+    snapshot = db["stats"].find_one({"_id": SNAPSHOT_DOC_ID}, {"_id": 0})
+    if snapshot is None:
+        return refresh_snapshot(db)
+    max_age = timedelta(seconds=settings.DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS)
+    if datetime.utcnow() - snapshot["computed_at"] > max_age:
+        queue_refresh()
+    return snapshot
@@ -0,0 +1,157 @@
+"""
+Web-sized derivatives of uploaded observation photos.
+
+Each locally stored photo gets a fixed-size square thumbnail and a medium
+variant bounded by its longest edge, written next to the originals under derivatives/. Their URLs are
+kept on the observation as `photo_variants`, a list of
+{"src": original, "thumb": url, "medium": url} entries. List endpoints call
+variant_url() to serve the smallest variant that fits instead of the
+multi-megabyte original; iNaturalist photos are already resized remotely,
+so their URLs are rewritten to the matching size instead.
+"""
+import logging
+import os
+import re
+from io import BytesIO
+
+from bson import ObjectId
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .mongo import observations_collection
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> (edge in pixels, crop to a square), smallest first
+VARIANTS = {"thumb": (320, True), "medium": (1024, False)}
+
+# iNaturalist serves square (75px), small (240px), medium (500px), large (1024px) and original
+INATURALIST_PHOTO_RE = re.compile(r"^(https?://[^/]*inaturalist[^/]*/photos/\d+/)(square|small|medium|large|original)(\.\w+.*)$")
+INATURALIST_SIZES = {"thumb": "small", "medium": "medium"}
+
+FORMAT_EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg"}
+
+
+def storage_name(photo):
+    """Returns the storage path of a local media URL, or None for remote photos."""
+    if not photo or not photo.startswith(settings.MEDIA_URL):
+        return None
+    return photo[len(settings.MEDIA_URL):]
+
+
+def derivative_name(source_name, variant):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f"derivatives/{stem}_{variant}{FORMAT_EXTENSIONS[settings.IMAGE_DERIVATIVE_FORMAT]}"
+
+
+def render_variant(image, edge, crop):
+    """Encodes a downscaled (optionally centre-cropped) copy of an image in the configured format."""
+    from PIL import Image, ImageOps
+
+    if crop:
+        variant = ImageOps.fit(image, (edge, edge), Image.Resampling.LANCZOS)
+    else:
+        variant = image.copy()
+        variant.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+    if settings.IMAGE_DERIVATIVE_FORMAT == "JPEG" and variant.mode != "RGB":
+        variant = variant.convert("RGB")
+    buffer = BytesIO()
+    variant.save(buffer, settings.IMAGE_DERIVATIVE_FORMAT, quality=settings.IMAGE_DERIVATIVE_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_photo_variants(photo):
+    """
+    Writes every variant of one local photo, reusing variants that already
+    exist (identical uploads share a file, so they share its variants).
+    Returns its photo_variants entry; undecodable images get an error instead
+    of variants so they are not retried.
+    """
+    # Pillow is only needed by workers, so web processes do not import it at boot
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    source_name = storage_name(photo)
+    names = {variant: derivative_name(source_name, variant) for variant in VARIANTS}
+    if all(default_storage.exists(name) for name in names.values()):
+        return {"src": photo, **{variant: default_storage.url(name) for variant, name in names.items()}}
+
+    try:
+        with default_storage.open(source_name, "rb") as source:
+            image = Image.open(source)
+            # Phone photos are often stored sideways with an orientation tag
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError) as e:
+        logger.warning(f"[DERIVATIVES] Cannot decode {photo}: {e}")
+        return {"src": photo, "error": str(e)}
+
+    entry = {"src": photo}
+    for variant, (edge, crop) in VARIANTS.items():
+        name = names[variant]
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        saved_name = default_storage.save(name, ContentFile(render_variant(image, edge, crop)))
+        entry[variant] = default_storage.url(saved_name)
+    return entry
+
+
+def delete_photo_variants(entries):
+    """Removes the derivative files of photo_variants entries."""
+    for entry in entries:
+        for variant in VARIANTS:
+            name = storage_name(entry.get(variant))
+            if name and default_storage.exists(name):
+                default_storage.delete(name)
+
+
+def generate_observation_derivatives(observation, force=False):
+    """
+    Brings one observation's photo_variants in line with its photos.
+    Returns the number of photos that had variants generated.
+    """
+    existing = {entry["src"]: entry for entry in observation.get("photo_variants", [])}
+    if force:
+        delete_photo_variants(existing.values())
+        existing = {}
+
+    entries = []
+    generated = 0
+    for photo in observation.get("photo", []):
+        if photo in existing:
+            entries.append(existing[photo])
+        elif storage_name(photo) and default_storage.exists(storage_name(photo)):
+            entries.append(generate_photo_variants(photo))
+            generated += 1
+
+    # Matches on the photo list so an edit made meanwhile is not overwritten
+    observations_collection.update_one(
+        {"_id": observation["_id"], "photo": observation.get("photo", [])},
+        {"$set": {"photo_variants": entries}}
+    )
+    return generated
+
+
+def variant_url(photo, photo_variants, variant):
+    """
+    Returns the URL of the given variant of a photo, falling back to the
+    original while variants are still being generated.
+    """
+    for entry in photo_variants or []:
+        if entry.get("src") == photo and entry.get(variant):
+            return entry[variant]
+    match = INATURALIST_PHOTO_RE.match(photo or "")
+    if match:
+        return f"{match.group(1)}{INATURALIST_SIZES[variant]}{match.group(3)}"
+    return photo
+
+
+def generate_derivatives(observation_ids, force=False):
+    """Generates missing variants for the given observations. Returns the photo count."""
+    observations = observations_collection.find(
+        {"_id": {"$in": [ObjectId(oid) for oid in observation_ids]}},
+        {"photo": 1, "photo_variants": 1}
+    )
+    generated = sum(generate_observation_derivatives(obs, force) for obs in observations)
+    logger.info(f"[DERIVATIVES] Generated variants for {generated} photos")
+    return generated
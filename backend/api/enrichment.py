@@ -0,0 +1,167 @@
+"""
+Background enrichment of new observations.
+
+Uploads are saved with `enrichment: "pending"`. The enrichment task then
+reverse geocodes their locations (country, region, continent) and gives
+species without an image the observation's first photo. Work is done in
+batches; locations that keep failing are marked "failed" after
+ENRICHMENT_MAX_ATTEMPTS so they stop holding observations back.
+"""
+import logging
+import time
+from datetime import datetime
+
+import requests
+from bson import ObjectId
+from django.conf import settings
+
+from .mongo import locations_collection, observations_collection, species_collection
+from .views import get_continent, reverse_geocode
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class EnrichmentIncomplete(Exception):
+    """Raised after a batch when some lookups failed transiently and should be retried."""
+
+
+def enrich_location(location):
+    """
+    Geocodes a single pending location.
+    Returns its new enrichment state; PENDING means retry later.
+    """
+    try:
+        details = reverse_geocode(location["latitude"], location["longitude"])
+    except requests.RequestException as e:
+        attempts = location.get("enrichment_attempts", 0) + 1
+        state = FAILED if attempts >= settings.ENRICHMENT_MAX_ATTEMPTS else PENDING
+        locations_collection.update_one(
+            {"_id": location["_id"]},
+            {"$set": {
+                "enrichment": state,
+                "enrichment_attempts": attempts,
+                "enrichment_error": str(e),
+                "updated_at": datetime.utcnow()
+            }}
+        )
+        logger.warning(f"[ENRICH] Geocoding failed for location {location['_id']} (attempt {attempts}): {e}")
+        return state
+
+    update = {
+        "country": details["country"],
+        "region": details["region"],
+        "continent": get_continent(location["latitude"], location["longitude"]),
+        "enrichment": DONE,
+        "updated_at": datetime.utcnow()
+    }
+    # Keeps a name the uploader typed in; fills in the geocoded one otherwise
+    if not location.get("name") or location.get("name") == "Unnamed Location":
+        update["name"] = details["name"] or location.get("name", "")
+    locations_collection.update_one({"_id": location["_id"]}, {"$set": update, "$unset": {"enrichment_error": ""}})
+    return DONE
+
+
+def location_state(location):
+    """Locations created before enrichment existed count as done."""
+    if location is None:
+        return DONE
+    return location.get("enrichment", DONE)
+
+
+def fill_species_images(observations):
+    """Sets a species image from the first photo of its observations where missing."""
+    first_photos = {}
+    for obs in observations:
+        if obs.get("species_id") and obs.get("photo"):
+            first_photos.setdefault(obs["species_id"], obs["photo"][0])
+    if not first_photos:
+        return 0
+
+    updated = 0
+    missing = species_collection.find(
+        {"_id": {"$in": list(first_photos)}, "image_url": {"$in": ["", None]}},
+        {"_id": 1}
+    )
+    for species in missing:
+        result = species_collection.update_one(
+            {"_id": species["_id"], "image_url": {"$in": ["", None]}},
+            {"$set": {"image_url": first_photos[species["_id"]], "updated_at": datetime.utcnow()}}
+        )
+        updated += result.modified_count
+    return updated
+
+
+def enrich_batch(observations):
+    """
+    Enriches one batch of pending observations.
+    Returns (enriched observation count, whether any lookup should be retried).
+    """
+    location_ids = list({obs["location_id"] for obs in observations if obs.get("location_id")})
+    locations = {loc["_id"]: loc for loc in locations_collection.find({"_id": {"$in": location_ids}})}
+
+    states = {}
+    for location_id, location in locations.items():
+        states[location_id] = location_state(location)
+        if states[location_id] == PENDING:
+            states[location_id] = enrich_location(location)
+            # Nominatim's usage policy allows one request per second
+            time.sleep(settings.ENRICHMENT_GEOCODE_INTERVAL)
+
+    fill_species_images(observations)
+
+    now = datetime.utcnow()
+    finished = {DONE: [], FAILED: []}
+    for obs in observations:
+        state = states.get(obs.get("location_id"), DONE)
+        if state != PENDING:
+            finished[state].append(obs["_id"])
+    for state, ids in finished.items():
+        if ids:
+            observations_collection.update_many(
+                {"_id": {"$in": ids}},
+                # updated_at moves too, so incremental exports pick up the enrichment
+                {"$set": {"enrichment": state, "enriched_at": now, "updated_at": now}}
+            )
+
+    enriched = len(finished[DONE]) + len(finished[FAILED])
+    return enriched, enriched < len(observations)
+
+
+def enrich_pending(observation_ids=None, batch_size=None):
+    """
+    Enriches pending observations (all of them, or just the given ids) in
+    batches, walking them once in _id order.
+    Raises EnrichmentIncomplete if any were left pending by transient errors.
+    """
+    batch_size = batch_size or settings.ENRICHMENT_BATCH_SIZE
+    query = {"enrichment": PENDING}
+    if observation_ids:
+        query["_id"] = {"$in": [ObjectId(oid) for oid in observation_ids]}
+
+    total = 0
+    retry = False
+    last_id = None
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {**batch_query.get("_id", {}), "$gt": last_id}
+        batch = list(
+            observations_collection.find(batch_query, {"location_id": 1, "species_id": 1, "photo": 1})
+            .sort("_id", 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        enriched, incomplete = enrich_batch(batch)
+        total += enriched
+        retry = retry or incomplete
+        last_id = batch[-1]["_id"]
+
+    logger.info(f"[ENRICH] Enriched {total} observations")
+    if retry:
+        raise EnrichmentIncomplete(f"Enriched {total} observations; some lookups will be retried")
+    return total
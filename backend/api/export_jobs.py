@@ -0,0 +1,212 @@
+"""
+Background export jobs.
+
+POST /api/export/jobs/ records a job in `export_jobs` and queues a Celery
+task that streams the export (api.exports) into MEDIA_ROOT/exports. Clients
+poll the job for progress and download the artifact once it is done.
+Identical requests within EXPORT_JOB_DEDUPE_SECONDS reuse the existing job,
+and artifacts are deleted EXPORT_ARTIFACT_TTL_SECONDS after they finish.
+A running job refreshes `heartbeat_at` with every progress update; one that
+has not done so for EXPORT_JOB_STALE_SECONDS lost its worker, and
+cleanup_expired() fails it and removes its partial artifact. A job still
+queued after that long lost its task and is failed the same way.
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from .exports import EXPORT_FORMATS, plan_export, stream_export
+from .mongo import export_jobs_collection
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def export_dir():
+    return os.path.join(settings.MEDIA_ROOT, "exports")
+
+
+def artifact_path(job):
+    return os.path.join(export_dir(), f"{job['_id']}.{EXPORT_FORMATS[job['format']][1]}")
+
+
+def partial_artifact_path(job):
+    return f"{artifact_path(job)}.part"
+
+
+def remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def create_job(principal, export_format, target_user_id=None):
+    """
+    Returns (job, created). A queued, running or finished job with the same
+    requester, scope and format created within the dedupe window is reused.
+    """
+    is_admin = "admin" in principal.get("roles", [])
+    if not is_admin:
+        target_user_id = None
+    scope = "user" if target_user_id else ("all" if is_admin else "own")
+    dedupe_key = f"{principal['_id']}:{scope}:{target_user_id or '-'}:{export_format}"
+    now = datetime.utcnow()
+
+    existing = export_jobs_collection.find_one(
+        {
+            "dedupe_key": dedupe_key,
+            "status": {"$in": [QUEUED, RUNNING, DONE]},
+            "created_at": {"$gte": now - timedelta(seconds=settings.EXPORT_JOB_DEDUPE_SECONDS)}
+        },
+        sort=[("created_at", -1)]
+    )
+    if existing:
+        return existing, False
+
+    plan = plan_export(principal["_id"], is_admin, target_user_id)
+    job = {
+        "requested_by": principal["_id"],
+        "scope": scope,
+        "target_user_id": ObjectId(target_user_id) if target_user_id else None,
+        "format": export_format,
+        "plan": [{"collection": collection, "query": query} for collection, query in plan],
+        "dedupe_key": dedupe_key,
+        "status": QUEUED,
+        "progress": {"collections_done": 0, "collections_total": len(plan), "rows": 0, "collection": None},
+        "created_at": now
+    }
+    job["_id"] = export_jobs_collection.insert_one(job).inserted_id
+    return job, True
+
+
+def run_job(job_id):
+    """Writes a queued job's artifact, recording progress as it goes. Returns the final status."""
+    now = datetime.utcnow()
+    job = export_jobs_collection.find_one_and_update(
+        {"_id": ObjectId(job_id), "status": QUEUED},
+        {"$set": {"status": RUNNING, "started_at": now, "heartbeat_at": now}},
+        return_document=ReturnDocument.AFTER
+    )
+    if job is None:
+        # Already picked up by another worker, or gone
+        return None
+
+    finished_rows = 0
+
+    def progress(collection, rows, done):
+        nonlocal finished_rows
+        update = {"$set": {
+            "progress.collection": collection,
+            "progress.rows": finished_rows + rows,
+            "heartbeat_at": datetime.utcnow()
+        }}
+        if done:
+            finished_rows += rows
+            update["$inc"] = {"progress.collections_done": 1}
+        export_jobs_collection.update_one({"_id": job["_id"]}, update)
+
+    path = artifact_path(job)
+    partial_path = partial_artifact_path(job)
+    plan = [(step["collection"], step["query"]) for step in job["plan"]]
+    try:
+        os.makedirs(export_dir(), exist_ok=True)
+        with open(partial_path, "wb") as artifact:
+            for chunk in stream_export(job["format"], plan, progress):
+                artifact.write(chunk)
+        os.replace(partial_path, path)
+    except Exception as e:
+        logger.error(f"[EXPORT] Job {job['_id']} failed: {e}", exc_info=True)
+        remove_file(partial_path)
+        finish(job, FAILED, {"error": str(e)})
+        return FAILED
+
+    finish(job, DONE, {"artifact_size": os.path.getsize(path)})
+    logger.info(f"[EXPORT] Job {job['_id']} wrote {finished_rows} rows to {path}")
+    return DONE
+
+
+def finish(job, status, fields, from_status=RUNNING):
+    """Records the outcome of a job in from_status; a job already failed as stale keeps that status."""
+    now = datetime.utcnow()
+    export_jobs_collection.update_one(
+        {"_id": job["_id"], "status": from_status},
+        {"$set": {
+            "status": status,
+            "finished_at": now,
+            "expires_at": now + timedelta(seconds=settings.EXPORT_ARTIFACT_TTL_SECONDS),
+            **fields
+        }}
+    )
+
+
+def fail_queued(job, error):
+    """Fails a job whose task could not be queued, so it is not reused and expires normally."""
+    finish(job, FAILED, {"error": error}, from_status=QUEUED)
+
+
+def fail_stale():
+    """
+    Fails running jobs whose worker stopped reporting progress, and queued
+    jobs no worker picked up. Returns the number failed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS)
+    stale = {"$or": [
+        {"status": RUNNING, "heartbeat_at": {"$lt": cutoff}},
+        {"status": QUEUED, "created_at": {"$lt": cutoff}},
+    ]}
+    failed = 0
+    for job in export_jobs_collection.find(stale, {"format": 1, "status": 1}):
+        now = datetime.utcnow()
+        # Re-checks the condition so a job that reported progress meanwhile keeps running
+        result = export_jobs_collection.update_one({"_id": job["_id"], **stale}, {"$set": {
+            "status": FAILED,
+            "error": "The export worker stopped responding" if job["status"] == RUNNING else "The export was never started",
+            "finished_at": now,
+            "expires_at": now + timedelta(seconds=settings.EXPORT_ARTIFACT_TTL_SECONDS)
+        }})
+        if result.modified_count:
+            remove_file(partial_artifact_path(job))
+            failed += 1
+    if failed:
+        logger.warning(f"[EXPORT] Failed {failed} stale export jobs")
+    return failed
+
+
+def cleanup_expired():
+    """Fails stale jobs, then deletes expired jobs and their artifacts. Returns the number removed."""
+    fail_stale()
+    removed = 0
+    for job in export_jobs_collection.find({"expires_at": {"$lt": datetime.utcnow()}}, {"format": 1}):
+        remove_file(artifact_path(job))
+        remove_file(partial_artifact_path(job))
+        export_jobs_collection.delete_one({"_id": job["_id"]})
+        removed += 1
+    logger.info(f"[EXPORT] Removed {removed} expired export jobs")
+    return removed
+
+
+def can_access(job, principal):
+    return job["requested_by"] == principal["_id"] or "admin" in principal.get("roles", [])
+
+
+def serialize_job(job):
+    """The job fields clients see while polling."""
+    return {
+        "id": str(job["_id"]),
+        "status": job["status"],
+        "scope": job["scope"],
+        "format": job["format"],
+        "progress": job["progress"],
+        "created_at": job["created_at"],
+        "finished_at": job.get("finished_at"),
+        "expires_at": job.get("expires_at"),
+        "error": job.get("error"),
+        "download_url": f"/api/export/jobs/{job['_id']}/download/" if job["status"] == DONE else None
+    }
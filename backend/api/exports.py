@@ -0,0 +1,216 @@
+"""
+Streaming data exports.
+
+Exports iterate MongoDB cursors in batches and yield encoded chunks as they
+go, so memory use does not grow with the size of the database. Every
+collection has a fixed export schema: it drives the CSV columns and the
+projection for all formats, which also keeps secrets such as password
+hashes out of exports.
+
+Under ASGI, Django buffers a sync iterator completely before sending it,
+so responses wrap the generators with aiterate(), which advances them one
+chunk at a time on a worker thread.
+
+Formats:
+    json    one JSON object mapping collection names to document arrays
+    ndjson  one JSON document per line, tagged with its "_collection"
+    csv     a ZIP archive with one CSV file per collection, written on the fly
+"""
+import csv
+import io
+import zipfile
+
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+
+from .mongo import db
+from .responses import dumps
+
+BATCH_SIZE = 1000
+
+EXPORT_SCHEMAS = {
+    "species": [
+        "_id", "species", "genus", "family", "common_name", "image_url", "audio_url",
+        "observations_count", "status_counts", "created_at", "updated_at"
+    ],
+    "locations": [
+        "_id", "name", "latitude", "longitude", "region", "country", "continent", "source"
+    ],
+    "observations": [
+        "_id", "source_id", "user_id", "species_id", "location_id", "timestamp", "status",
+        "quantity", "photo", "audio", "additional_details", "external_link", "comments_count",
+        "raw_taxonomy", "created_at", "updated_at"
+    ],
+    # No password or password_hash
+    "users": [
+        "_id", "username", "name", "email", "description", "profile_picture", "roles",
+        "isBlocked", "source", "created_at"
+    ],
+    "comments": [
+        "_id", "observation_id", "parent_comment_id", "user_id", "comment_text", "timestamp"
+    ],
+}
+
+# Field linking each collection's documents to their owner
+OWNER_FIELDS = {"observations": "user_id", "comments": "user_id", "users": "_id"}
+
+# format -> (content type, file extension)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("application/zip", "zip"),
+}
+
+
+def plan_export(user_id, is_admin, target_user_id=None):
+    """
+    Returns the (collection, query) pairs an export covers.
+    Admins export everything, or one user's observations and comments;
+    other users get the public collections plus their own documents.
+    """
+    if is_admin and target_user_id:
+        owner = ObjectId(target_user_id)
+        return [(name, {OWNER_FIELDS[name]: owner}) for name in ("observations", "comments")]
+    if is_admin:
+        return [(name, {}) for name in EXPORT_SCHEMAS]
+
+    owner = ObjectId(user_id)
+    return [
+        (name, {OWNER_FIELDS[name]: owner} if name in OWNER_FIELDS else {})
+        for name in EXPORT_SCHEMAS
+    ]
+
+
+def iter_batches(collection, query, batch_size=BATCH_SIZE):
+    """Yields lists of schema-projected documents in _id order."""
+    projection = {field: 1 for field in EXPORT_SCHEMAS[collection]}
+    cursor = db[collection].find(query, projection).sort("_id", 1).batch_size(batch_size)
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_value(value):
+    """Flattens a BSON value into a CSV cell."""
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return dumps(value)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    # ObjectId, datetime, Decimal128 and friends
+    return dumps(value).strip('"')
+
+
+def _notify(progress, collection, rows, done=False):
+    if progress is not None:
+        progress(collection, rows, done)
+
+
+def stream_json(plan, progress=None):
+    yield b"{"
+    for index, (collection, query) in enumerate(plan):
+        yield f'{"," if index else ""}{dumps(collection)}:['.encode("utf-8")
+        rows = 0
+        for batch in iter_batches(collection, query):
+            encoded = ",".join(dumps(doc) for doc in batch)
+            yield f'{"," if rows else ""}{encoded}'.encode("utf-8")
+            rows += len(batch)
+            _notify(progress, collection, rows)
+        yield b"]"
+        _notify(progress, collection, rows, done=True)
+    yield b"}"
+
+
+def stream_ndjson(plan, progress=None):
+    for collection, query in plan:
+        rows = 0
+        for batch in iter_batches(collection, query):
+            yield "".join(dumps({"_collection": collection, **doc}) + "\n" for doc in batch).encode("utf-8")
+            rows += len(batch)
+            _notify(progress, collection, rows)
+        _notify(progress, collection, rows, done=True)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable stream that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def stream_csv_zip(plan, progress=None):
+    # ZipFile detects the unseekable sink and writes sizes after each entry's data
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for collection, query in plan:
+            fields = EXPORT_SCHEMAS[collection]
+            rows = 0
+            with archive.open(f"{collection}.csv", "w", force_zip64=True) as entry:
+                text = io.TextIOWrapper(entry, encoding="utf-8", newline="")
+                writer = csv.writer(text)
+                writer.writerow(fields)
+                for batch in iter_batches(collection, query):
+                    writer.writerows([csv_value(doc.get(field)) for field in fields] for doc in batch)
+                    text.flush()
+                    rows += len(batch)
+                    _notify(progress, collection, rows)
+                    yield sink.drain()
+                text.flush()
+                text.detach()
+            _notify(progress, collection, rows, done=True)
+            yield sink.drain()
+    yield sink.drain()
+
+
+STREAMERS = {"json": stream_json, "ndjson": stream_ndjson, "csv": stream_csv_zip}
+
+
+def stream_export(export_format, plan, progress=None):
+    """
+    Yields the encoded export as byte chunks.
+    `progress(collection, rows, done)` is called after every batch and when
+    each collection finishes.
+    """
+    return STREAMERS[export_format](plan, progress)
+
+
+_EXHAUSTED = object()
+
+
+async def aiterate(chunks):
+    """
+    Async iterator over a sync chunk generator. Each chunk (and the batch
+    fetch behind it) is produced in the thread pool rather than on the
+    thread-sensitive executor, so other sync views are not held up.
+    """
+    iterator = iter(chunks)
+    next_chunk = sync_to_async(next, thread_sensitive=False)
+    try:
+        while True:
+            chunk = await next_chunk(iterator, _EXHAUSTED)
+            if chunk is _EXHAUSTED:
+                return
+            yield chunk
+    finally:
+        # Closes the generator (and its cursor) when the client disconnects
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=False)()
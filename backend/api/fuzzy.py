@@ -0,0 +1,201 @@
+"""
+In-memory fuzzy matching over species names for "did you mean" lookups.
+
+The index is built per process from the species collection and rebuilt when
+the taxonomy version stored in the meta collection changes.
+"""
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+TAXONOMY_VERSION_ID = "taxonomy"
+
+# Number of trigram candidates ranked by edit distance per query
+MAX_CANDIDATES = 32
+
+
+def normalize_name(value):
+    """Lowercases a name and collapses internal whitespace."""
+    return " ".join(str(value or "").lower().split())
+
+
+def trigrams(value):
+    """Returns the set of padded character trigrams for a normalised name."""
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b, max_distance=None):
+    """
+    Computes the edit distance between two strings.
+    Returns None as soon as the distance is known to exceed max_distance.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return None
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return None
+        previous = current
+
+    distance = previous[-1]
+    if max_distance is not None and distance > max_distance:
+        return None
+    return distance
+
+
+def default_max_distance(term):
+    """Allows roughly one typo per four characters, capped at three."""
+    return max(1, min(3, len(term) // 4))
+
+
+class SpeciesNameIndex:
+    """
+    Trigram index over scientific and common names.
+    Trigram overlap narrows the candidates, edit distance ranks them.
+    """
+
+    def __init__(self, species_docs, version=0):
+        self.version = version
+        self._names = []
+        self._payloads = []
+        self._postings = defaultdict(list)
+
+        for doc in species_docs:
+            payload = {
+                "family": doc.get("family", ""),
+                "genus": doc.get("genus", ""),
+                "species": doc.get("species", ""),
+                "common_name": doc.get("common_name", "")
+            }
+            for field in ("species", "common_name"):
+                name = normalize_name(doc.get(field))
+                if not name:
+                    continue
+                position = len(self._names)
+                self._names.append(name)
+                self._payloads.append(payload)
+                for gram in trigrams(name):
+                    self._postings[gram].append(position)
+
+    def __len__(self):
+        return len(self._names)
+
+    def suggest(self, term, limit=5, max_distance=None):
+        """
+        Returns up to `limit` (distance, species) pairs closest to `term`,
+        ordered by edit distance and then by name.
+        """
+        term = normalize_name(term)
+        if not term:
+            return []
+        if max_distance is None:
+            max_distance = default_max_distance(term)
+
+        grams = trigrams(term)
+        shared = defaultdict(int)
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] += 1
+
+        # Each edit destroys at most three trigrams, so closer names must
+        # share at least this many with the term
+        min_shared = len(grams) - 3 * max_distance
+        candidates = heapq.nlargest(
+            MAX_CANDIDATES,
+            ((position, count) for position, count in shared.items() if count >= min_shared),
+            key=lambda item: item[1]
+        )
+
+        scored = []
+        for position, _ in candidates:
+            name = self._names[position]
+            if abs(len(name) - len(term)) > max_distance:
+                continue
+            distance = levenshtein(term, name, max_distance)
+            if distance is not None:
+                scored.append((distance, name, position))
+        scored.sort()
+
+        results = []
+        seen = set()
+        for distance, _, position in scored:
+            payload = self._payloads[position]
+            if payload["species"] in seen:
+                continue
+            seen.add(payload["species"])
+            results.append((distance, payload))
+            if len(results) >= limit:
+                break
+        return results
+
+
+class SpeciesIndexProvider:
+    """
+    Lazily builds the species name index on first use in each process.
+    The taxonomy version is re-read at most once per refresh interval, and
+    the index is rebuilt when it has changed.
+    """
+
+    def __init__(self, species_collection, meta_collection, refresh_seconds=30):
+        self.species_collection = species_collection
+        self.meta_collection = meta_collection
+        self.refresh_seconds = refresh_seconds
+        self._index = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current_version(self):
+        doc = self.meta_collection.find_one({"_id": TAXONOMY_VERSION_ID}, {"version": 1})
+        return doc.get("version", 0) if doc else 0
+
+    def bump_version(self):
+        """Marks the taxonomy as changed so every process rebuilds its index."""
+        self.meta_collection.update_one(
+            {"_id": TAXONOMY_VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+
+    def build(self, version):
+        started = time.perf_counter()
+        docs = self.species_collection.find(
+            {},
+            {"_id": 0, "family": 1, "genus": 1, "species": 1, "common_name": 1}
+        )
+        index = SpeciesNameIndex(docs, version=version)
+        logger.info(f"[FUZZY] Built species index v{version} with {len(index)} names in {time.perf_counter() - started:.2f}s")
+        return index
+
+    def get_index(self):
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < self.refresh_seconds:
+            return self._index
+
+        with self._lock:
+            if self._index is not None and now - self._checked_at < self.refresh_seconds:
+                return self._index
+            version = self.current_version()
+            if self._index is None or self._index.version != version:
+                self._index = self.build(version)
+            self._checked_at = now
+            return self._index
+
+    def suggest(self, term, limit=5, max_distance=None):
+        return self.get_index().suggest(term, limit=limit, max_distance=max_distance)
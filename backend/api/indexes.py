@@ -0,0 +1,147 @@
+"""
+Declarative registry of the MongoDB indexes every collection needs.
+
+`manage.py ensure_indexes` builds whatever is missing. Drift from this
+registry is reported by `ensure_indexes --check` and by a deploy system
+check (`manage.py check --deploy`); it is not checked at startup, so
+ordinary commands never connect to MongoDB. Index names are left to
+MongoDB's defaults so existing indexes are recognised.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Options compared when deciding whether an existing index matches the spec
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+INDEXES = {
+    "species": [
+        IndexModel([("species", ASCENDING)], unique=True),
+        IndexModel(
+            [("species_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"species_key": {"$type": "string"}}
+        ),
+    ],
+    "locations": [
+        IndexModel([("geojson", GEOSPHERE)]),
+    ],
+    "observations": [
+        IndexModel([("source_id", ASCENDING)], unique=True),
+        IndexModel([("species_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("timestamp", DESCENDING)]),
+        # Profile observation feed, newest first; also serves user_id-only queries
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        # Moderation queue, oldest first; also serves status-only queries
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)]),
+        # Incremental Darwin Core exports
+        IndexModel([("updated_at", ASCENDING)]),
+        # Only observations still waiting for the enrichment task
+        IndexModel(
+            [("enrichment", ASCENDING), ("_id", ASCENDING)],
+            partialFilterExpression={"enrichment": "pending"}
+        ),
+    ],
+    "comments": [
+        IndexModel([("observation_id", ASCENDING), ("parent_comment_id", ASCENDING), ("timestamp", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "media_objects": [
+        IndexModel([("url", ASCENDING)], unique=True),
+        # Only unreferenced files waiting for garbage collection
+        IndexModel(
+            [("released_at", ASCENDING)],
+            partialFilterExpression={"released_at": {"$exists": True}}
+        ),
+    ],
+    "export_jobs": [
+        IndexModel([("dedupe_key", ASCENDING), ("created_at", DESCENDING)]),
+        IndexModel([("expires_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)]),
+        # Not unique: synced iNaturalist users share a placeholder email and
+        # usernames were never enforced unique on registration
+        IndexModel([("username", ASCENDING)]),
+        # Admin user listing, newest first
+        IndexModel([("created_at", DESCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+
+def _signature(index):
+    """Returns the comparable parts of an index spec or listIndexes entry."""
+    keys = tuple((field, direction) for field, direction in dict(index["key"]).items())
+    options = tuple((option, index[option]) for option in COMPARED_OPTIONS if option in index)
+    return keys, options
+
+
+def _background(model):
+    """
+    Copies an IndexModel with background=True. Servers before 4.2 then build
+    without blocking the collection; newer ones ignore the flag and always use
+    the optimised build that only locks briefly at the start and end.
+    """
+    options = {key: value for key, value in model.document.items() if key != "key"}
+    return IndexModel(list(model.document["key"].items()), background=True, **options)
+
+
+def diff_indexes(db, registry=None):
+    """
+    Compares the registry against the database.
+    Returns a dict of (collection, index name) lists: missing, changed and extra.
+    """
+    registry = INDEXES if registry is None else registry
+    report = {"missing": [], "changed": [], "extra": []}
+
+    for collection_name, models in registry.items():
+        existing = {index["name"]: index for index in db[collection_name].list_indexes()}
+        expected = {model.document["name"]: model.document for model in models}
+
+        for name, spec in expected.items():
+            if name not in existing:
+                report["missing"].append((collection_name, name))
+            elif _signature(existing[name]) != _signature(spec):
+                report["changed"].append((collection_name, name))
+
+        for name in existing:
+            if name != "_id_" and name not in expected:
+                report["extra"].append((collection_name, name))
+
+    return report
+
+
+def ensure_indexes(db, registry=None, collections=None):
+    """
+    Builds every registered index that is missing.
+    Returns {collection: [created names]} and {collection: error message}.
+    """
+    registry = INDEXES if registry is None else registry
+    created = {}
+    failed = {}
+
+    for collection_name, models in registry.items():
+        if collections and collection_name not in collections:
+            continue
+        try:
+            created[collection_name] = db[collection_name].create_indexes(
+                [_background(model) for model in models]
+            )
+        except PyMongoError as e:
+            failed[collection_name] = str(e)
+            logger.error(f"[INDEXES] Failed to build indexes on {collection_name}: {e}")
+
+    return created, failed
+
+
+def missing_index_warnings(db, registry=None):
+    """Returns human-readable warnings for indexes that are missing or differ."""
+    report = diff_indexes(db, registry)
+    warnings = [f"{collection}.{name} is missing" for collection, name in report["missing"]]
+    warnings += [f"{collection}.{name} differs from the registry" for collection, name in report["changed"]]
+    return warnings
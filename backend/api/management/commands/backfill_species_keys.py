@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne, errors
+
+from api.views import species_collection, species_key
+
+
+class Command(BaseCommand):
+    help = "Populates the normalised species_key on species documents that are missing it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        cursor = species_collection.find(
+            {"species_key": {"$exists": False}},
+            {"_id": 1, "species": 1}
+        ).batch_size(batch_size)
+
+        updated = 0
+        collisions = 0
+        batch = []
+
+        def flush():
+            nonlocal updated, collisions
+            if not batch:
+                return
+            try:
+                result = species_collection.bulk_write(batch, ordered=False)
+                updated += result.modified_count
+            except errors.BulkWriteError as bwe:
+                updated += bwe.details.get("nModified", 0)
+                # Names that only differ by case collide on the unique key
+                for error in bwe.details.get("writeErrors", []):
+                    collisions += 1
+                    self.stderr.write(f"Duplicate species_key for {error['op']['q']['_id']}: {error.get('errmsg', '')}")
+            batch.clear()
+
+        for doc in cursor:
+            key = species_key(doc.get("species"))
+            if not key:
+                continue
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"species_key": key}}))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled species_key on {updated} species ({collisions} collisions)."))
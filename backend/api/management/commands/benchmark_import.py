@@ -0,0 +1,65 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: the same work a gunicorn worker does on boot
+BOOT_SCRIPT = """
+import time
+started = time.perf_counter()
+import django
+django.setup()
+import {modules}
+print(time.perf_counter() - started)
+"""
+
+
+class Command(BaseCommand):
+    help = "Measures cold import time of the api modules in fresh interpreters (worker boot time)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--modules",
+            default="api.urls, api.views, api.tasks",
+            help="Comma-separated modules to import after django.setup()."
+        )
+        parser.add_argument("--max-seconds", type=float, help="Fails when the median exceeds this budget.")
+
+    def handle(self, *args, **options):
+        modules = ", ".join(m.strip() for m in options["modules"].split(",") if m.strip())
+        script = BOOT_SCRIPT.format(modules=modules)
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)}
+
+        import_times = []
+        wall_times = []
+        for run in range(options["runs"]):
+            started = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True
+            )
+            wall_times.append(time.perf_counter() - started)
+            if result.returncode != 0:
+                self.stderr.write(result.stderr)
+                raise SystemExit(result.returncode)
+            import_times.append(float(result.stdout.strip().splitlines()[-1]))
+            self.stdout.write(f"run {run + 1}: import {import_times[-1] * 1000:.0f} ms, process {wall_times[-1] * 1000:.0f} ms")
+
+        median = statistics.median(import_times)
+        self.stdout.write(self.style.SUCCESS(
+            f"median import {median * 1000:.0f} ms (min {min(import_times) * 1000:.0f} ms), "
+            f"median process {statistics.median(wall_times) * 1000:.0f} ms over {options['runs']} runs"
+        ))
+
+        budget = options["max_seconds"]
+        if budget is not None and median > budget:
+            self.stderr.write(f"Median import time exceeds the {budget:.2f}s budget.")
+            raise SystemExit(1)
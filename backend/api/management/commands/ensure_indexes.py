@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.indexes import INDEXES, diff_indexes, ensure_indexes
+from api.mongo import db
+
+
+class Command(BaseCommand):
+    help = "Builds the MongoDB indexes declared in api/indexes.py and reports any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only reports the diff; builds nothing.")
+        parser.add_argument("collections", nargs="*", help="Limits the build to these collections.")
+
+    def handle(self, *args, **options):
+        unknown = set(options["collections"]) - set(INDEXES)
+        if unknown:
+            raise CommandError(f"No indexes registered for: {', '.join(sorted(unknown))}")
+
+        report = diff_indexes(db)
+        for label in ("missing", "changed", "extra"):
+            for collection, name in report[label]:
+                self.stdout.write(f"{label:>8}  {collection}.{name}")
+        if not any(report.values()):
+            self.stdout.write("All registered indexes are present.")
+
+        if options["check"]:
+            if report["missing"] or report["changed"]:
+                raise CommandError("Indexes differ from the registry; run ensure_indexes to build them.")
+            return
+
+        created, failed = ensure_indexes(db, collections=options["collections"])
+        for collection, error in failed.items():
+            self.stderr.write(f"{collection}: {error}")
+        if report["changed"]:
+            self.stderr.write("Changed indexes are not rebuilt automatically; drop them first to apply the registry.")
+
+        built = sum(
+            1 for collection, name in report["missing"]
+            if name in created.get(collection, [])
+        )
+        self.stdout.write(self.style.SUCCESS(f"Built {built} missing indexes."))
+        if failed:
+            raise CommandError(f"Index build failed on: {', '.join(sorted(failed))}")
@@ -0,0 +1,42 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.derivatives import generate_observation_derivatives
+from api.mongo import observations_collection
+
+
+class Command(BaseCommand):
+    help = "Generates thumbnail and medium variants for locally stored observation photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--force", action="store_true", help="Regenerates variants that already exist.")
+        parser.add_argument("--dry-run", action="store_true", help="Reports how many observations would be processed.")
+
+    def handle(self, *args, **options):
+        # iNaturalist photos are remote and resized by iNaturalist itself
+        query = {"photo": {"$regex": f"^{re.escape(settings.MEDIA_URL)}"}}
+        if not options["force"]:
+            query["$expr"] = {"$ne": [
+                {"$size": {"$ifNull": ["$photo_variants", []]}},
+                {"$size": {"$filter": {
+                    "input": "$photo",
+                    "cond": {"$eq": [{"$indexOfBytes": ["$$this", settings.MEDIA_URL]}, 0]}
+                }}}
+            ]}
+
+        if options["dry_run"]:
+            count = observations_collection.count_documents(query)
+            self.stdout.write(self.style.SUCCESS(f"Would process {count} observations."))
+            return
+
+        cursor = observations_collection.find(query, {"photo": 1, "photo_variants": 1}).batch_size(options["batch_size"])
+        observations = 0
+        photos = 0
+        for observation in cursor:
+            photos += generate_observation_derivatives(observation, force=options["force"])
+            observations += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {photos} photos on {observations} observations."))
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from api.timestamps import to_utc_datetime
+from api.mongo import observations_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Converts observation timestamps stored as ISO strings into BSON dates and "
+        "backfills missing created_at from the _id creation time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Reports what would change without writing.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        cursor = observations_collection.find(
+            {"timestamp": {"$type": "string"}},
+            {"_id": 1, "timestamp": 1}
+        ).batch_size(batch_size)
+
+        converted = 0
+        unparseable = 0
+        batch = []
+
+        def flush():
+            """Writes the pending updates and returns how many documents changed."""
+            if not batch:
+                return 0
+            if not dry_run:
+                # Filters match the old value so concurrent edits are not overwritten
+                written = observations_collection.bulk_write(batch, ordered=False).modified_count
+            else:
+                written = len(batch)
+            batch.clear()
+            return written
+
+        for doc in cursor:
+            value = to_utc_datetime(doc["timestamp"])
+            if value is None:
+                unparseable += 1
+                self.stderr.write(f"Unparseable timestamp on {doc['_id']}: {doc['timestamp']!r}")
+                continue
+            batch.append(UpdateOne(
+                {"_id": doc["_id"], "timestamp": doc["timestamp"]},
+                {"$set": {"timestamp": value}}
+            ))
+            if len(batch) >= batch_size:
+                converted += flush()
+        converted += flush()
+
+        verb = "Would convert" if dry_run else "Converted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {converted} timestamps ({unparseable} unparseable)."))
+
+        # Keyset pages ordered by created_at (the moderation queue) need it on every document
+        backfilled = 0
+        cursor = observations_collection.find({"created_at": {"$exists": False}}, {"_id": 1}).batch_size(batch_size)
+        for doc in cursor:
+            batch.append(UpdateOne(
+                {"_id": doc["_id"], "created_at": {"$exists": False}},
+                {"$set": {"created_at": doc["_id"].generation_time.replace(tzinfo=None)}}
+            ))
+            if len(batch) >= batch_size:
+                backfilled += flush()
+        backfilled += flush()
+
+        verb = "Would backfill" if dry_run else "Backfilled"
+        self.stdout.write(self.style.SUCCESS(f"{verb} created_at on {backfilled} observations."))
@@ -0,0 +1,100 @@
+import mimetypes
+import re
+from collections import Counter
+from datetime import datetime
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from api.derivatives import storage_name
+from api.media_store import content_hash, delete_media_files
+from api.mongo import media_objects_collection, observations_collection, users_collection
+
+
+class Command(BaseCommand):
+    help = (
+        "Registers every referenced upload in media_objects, merges files with identical "
+        "content and recomputes reference counts. Run it while uploads are quiet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Reports duplicates without changing anything.")
+
+    def count_references(self):
+        """Returns a Counter of local media URLs referenced by observations and users."""
+        local = {"$regex": f"^{re.escape(settings.MEDIA_URL)}"}
+        references = Counter()
+        for obs in observations_collection.find({"$or": [{"photo": local}, {"audio": local}]}, {"photo": 1, "audio": 1}):
+            references.update(url for url in obs.get("photo", []) + obs.get("audio", []) if storage_name(url))
+        for user in users_collection.find({"profile_picture": local}, {"profile_picture": 1}):
+            references[user["profile_picture"]] += 1
+        return references
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        references = self.count_references()
+
+        # Content hash -> URL kept for it; files already in the store keep their names
+        canonical = {doc["_id"]: doc["url"] for doc in media_objects_collection.find({}, {"url": 1})}
+        known = set(canonical)
+        duplicates = {}   # duplicate URL -> canonical URL
+        refcounts = Counter()
+        missing = 0
+        for url in sorted(references):
+            name = storage_name(url)
+            if not default_storage.exists(name):
+                missing += 1
+                self.stderr.write(f"Referenced file is missing: {url}")
+                continue
+            with default_storage.open(name, "rb") as f:
+                sha = content_hash(f)
+            canonical.setdefault(sha, url)
+            if canonical[sha] != url:
+                duplicates[url] = canonical[sha]
+            refcounts[sha] += references[url]
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(
+                f"Would merge {len(duplicates)} duplicate files into {len(refcounts)} objects ({missing} missing)."
+            ))
+            return
+
+        for url, kept in duplicates.items():
+            for field in ("photo", "audio"):
+                observations_collection.update_many(
+                    {field: url},
+                    {"$set": {f"{field}.$[old]": kept}},
+                    array_filters=[{"old": url}]
+                )
+            # Variants are regenerated for the kept file by generate_photo_derivatives
+            observations_collection.update_many({"photo_variants.src": url}, {"$pull": {"photo_variants": {"src": url}}})
+            users_collection.update_many({"profile_picture": url}, {"$set": {"profile_picture": kept}})
+            delete_media_files(storage_name(url))
+
+        referenced = set(refcounts)
+        for sha in referenced:
+            url = canonical[sha]
+            name = storage_name(url)
+            media_objects_collection.update_one(
+                {"_id": sha},
+                {
+                    "$set": {"refcount": refcounts[sha], "name": name, "url": url},
+                    "$unset": {"released_at": ""},
+                    "$setOnInsert": {
+                        "content_type": mimetypes.guess_type(name)[0],
+                        "size": default_storage.size(name)
+                    }
+                },
+                upsert=True
+            )
+
+        # Stored files nothing points at any more become eligible for collection
+        media_objects_collection.update_many(
+            {"_id": {"$in": list(known - referenced)}, "refcount": {"$gt": 0}},
+            {"$set": {"refcount": 0, "released_at": datetime.utcnow()}}
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged {len(duplicates)} duplicate files into {len(refcounts)} objects ({missing} missing)."
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import reconcile_species_counts
+from api.mongo import db
+
+
+class Command(BaseCommand):
+    help = "Recomputes each species' observations_count and per-status status_counts."
+
+    def handle(self, *args, **options):
+        count = reconcile_species_counts(db)
+        self.stdout.write(self.style.SUCCESS(f"Reconciled observation counts for {count} species."))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django_celery_beat.models import IntervalSchedule, PeriodicTask
+
+# (name, task, every, period)
+PERIODIC_TASKS = [
+    ('Daily Taxa Sync', 'api.tasks.fetch_and_store_all_periodic', 2, IntervalSchedule.MINUTES),
+    ('Reconcile Stats Counters', 'api.tasks.reconcile_stats_periodic', 1, IntervalSchedule.HOURS),
+    ('Reconcile Species Counts', 'api.tasks.reconcile_species_counts_periodic', 1, IntervalSchedule.DAYS),
+    ('Refresh Dashboard Snapshot', 'api.tasks.refresh_dashboard_snapshot', 5, IntervalSchedule.MINUTES),
+    ('Enrich Pending Observations', 'api.tasks.enrich_observations', 10, IntervalSchedule.MINUTES),
+    ('Collect Unreferenced Media', 'api.tasks.collect_media_garbage', 1, IntervalSchedule.HOURS),
+    ('Clean Up Expired Exports', 'api.tasks.cleanup_export_jobs', 1, IntervalSchedule.HOURS),
+]
+
+
+class Command(BaseCommand):
+    help = "Creates or re-enables the Celery beat schedule for the api tasks."
+
+    def handle(self, *args, **options):
+        for name, task_path, every, period in PERIODIC_TASKS:
+            schedule, _ = IntervalSchedule.objects.get_or_create(every=every, period=period)
+            task, created = PeriodicTask.objects.get_or_create(
+                name=name,
+                defaults={'interval': schedule, 'task': task_path, 'enabled': True}
+            )
+
+            if created:
+                self.stdout.write(f"Created periodic task: {name}")
+                continue
+
+            changed = False
+            if task.task != task_path or task.interval_id != schedule.id:
+                task.task = task_path
+                task.interval = schedule
+                changed = True
+            if not task.enabled:
+                task.enabled = True
+                changed = True
+            if changed:
+                task.save()
+                self.stdout.write(f"Updated periodic task: {name}")
+            else:
+                self.stdout.write(f"Periodic task already up to date: {name}")
+
+        self.stdout.write(self.style.SUCCESS("Periodic tasks are set up."))
@@ -0,0 +1,165 @@
+"""
+Content-addressed storage for uploaded media.
+
+Files are named by the SHA-256 of their bytes, hashed while streaming from
+the upload's temporary file, so identical uploads are stored once. The
+media_objects collection holds one document per stored file with a
+reference count: every observation photo/audio entry and profile picture
+pointing at the file holds one reference. release() drops a reference, and
+collect_garbage() removes files (and their photo derivatives) once they have
+been unreferenced for MEDIA_GC_GRACE_SECONDS.
+
+collect_garbage() marks a media object with `deleting_at` before removing
+its files and only drops the document afterwards. store() never takes a
+reference on a marked object, so a file cannot be re-referenced while it is
+being deleted; it waits for the collection to finish and saves the upload
+again. A mark older than DELETION_TIMEOUT is left by a collector that died
+part-way and may be taken over.
+"""
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from mimetypes import guess_extension
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from .derivatives import VARIANTS, derivative_name, storage_name
+from .mongo import media_objects_collection
+
+logger = logging.getLogger(__name__)
+
+# How long collect_garbage() may take to delete one object's files
+DELETION_TIMEOUT = timedelta(minutes=5)
+
+# store() retries while the same bytes are being garbage-collected
+STORE_ATTEMPTS = 5
+STORE_RETRY_SECONDS = 0.2
+
+
+def content_hash(file):
+    """Returns the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def store(uploaded_file, prefix):
+    """
+    Saves an upload under its content hash, or reuses the stored copy.
+    Takes one reference and returns the file's media URL.
+    """
+    sha = content_hash(uploaded_file)
+    ext = guess_extension(uploaded_file.content_type) or os.path.splitext(uploaded_file.name)[1] or ".bin"
+    name = f"{prefix}/{sha}{ext}"
+
+    for attempt in range(STORE_ATTEMPTS):
+        try:
+            media = _take_reference(sha, name, uploaded_file)
+            break
+        except DuplicateKeyError:
+            # collect_garbage() is deleting this file; it drops the object when done
+            if attempt == STORE_ATTEMPTS - 1:
+                raise
+            time.sleep(STORE_RETRY_SECONDS)
+
+    try:
+        if not default_storage.exists(media["name"]):
+            saved_name = default_storage.save(media["name"], uploaded_file)
+            if saved_name != media["name"]:
+                # A concurrent upload of the same bytes saved it first
+                default_storage.delete(saved_name)
+    except Exception:
+        # The caller will not record the URL, so the reference taken above is given back
+        release(media["url"])
+        raise
+    return media["url"]
+
+
+def _take_reference(sha, name, uploaded_file):
+    """
+    Increments the media object's refcount, creating it if needed. Raises
+    DuplicateKeyError while the object is marked for deletion.
+    """
+    stale = datetime.utcnow() - DELETION_TIMEOUT
+    return media_objects_collection.find_one_and_update(
+        {"_id": sha, "$or": [{"deleting_at": {"$exists": False}}, {"deleting_at": {"$lt": stale}}]},
+        {
+            "$inc": {"refcount": 1},
+            "$unset": {"released_at": "", "deleting_at": ""},
+            "$setOnInsert": {
+                "name": name,
+                "url": default_storage.url(name),
+                "content_type": uploaded_file.content_type,
+                "size": uploaded_file.size,
+                "created_at": datetime.utcnow()
+            }
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def delete_media_files(name):
+    """Deletes a stored file and any photo derivatives made from it."""
+    for path in [name] + [derivative_name(name, variant) for variant in VARIANTS]:
+        if default_storage.exists(path):
+            default_storage.delete(path)
+            logger.info(f"[MEDIA] Deleted {path}")
+
+
+def release(url):
+    """
+    Drops one reference to a stored file. Files saved before the media store
+    existed have no media object and a single owner, so they are deleted now.
+    """
+    name = storage_name(url)
+    if name is None:
+        return
+
+    media = media_objects_collection.find_one_and_update(
+        {"url": url, "refcount": {"$gt": 0}},
+        {"$inc": {"refcount": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if media is None:
+        if media_objects_collection.find_one({"url": url}, {"_id": 1}) is None:
+            delete_media_files(name)
+        return
+
+    if media["refcount"] <= 0:
+        media_objects_collection.update_one(
+            {"_id": media["_id"], "refcount": {"$lte": 0}},
+            {"$set": {"released_at": datetime.utcnow()}}
+        )
+
+
+def collect_garbage():
+    """Deletes files that have had no references for the grace period. Returns the count."""
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.MEDIA_GC_GRACE_SECONDS)
+    unreferenced = {
+        "refcount": {"$lte": 0},
+        "released_at": {"$lt": cutoff},
+        "$or": [{"deleting_at": {"$exists": False}}, {"deleting_at": {"$lt": now - DELETION_TIMEOUT}}]
+    }
+    removed = 0
+    for media in media_objects_collection.find(unreferenced, {"name": 1}):
+        # Re-checks the count while marking, so a file referenced again meanwhile survives
+        marked = media_objects_collection.update_one(
+            {"_id": media["_id"], **unreferenced},
+            {"$set": {"deleting_at": now}}
+        )
+        if not marked.modified_count:
+            continue
+        delete_media_files(media["name"])
+        media_objects_collection.delete_one({"_id": media["_id"], "deleting_at": now})
+        removed += 1
+    logger.info(f"[MEDIA] Collected {removed} unreferenced files")
+    return removed
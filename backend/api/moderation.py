@@ -0,0 +1,83 @@
+"""
+Observation moderation.
+
+moderate_observations() sets verified/rejected on many observations with one
+bulk_write. Each update is conditional on the status read just before, so an
+observation moderated concurrently is not counted twice, and the counter
+changes for everything that did change go out together through
+ObservationCounters. Every update in one call carries the same
+`moderation_batch` id, which tells this call's writes apart from concurrent
+ones.
+"""
+import logging
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from .counters import COUNTER_FIELDS, ObservationCounters
+
+logger = logging.getLogger(__name__)
+
+MODERATION_STATUSES = ("verified", "rejected")
+
+# Upper bound on ids per bulk moderation request
+MAX_BULK_MODERATION = 500
+
+
+def moderate_observations(db, observation_ids, new_status):
+    """
+    Applies new_status to the given observations (ObjectIds).
+    Returns {"updated": [...], "unchanged": [...], "not_found": [...]} as id strings;
+    unchanged observations already had the status or were moderated concurrently.
+    """
+    now = datetime.utcnow()
+    batch = ObjectId()
+    observation_ids = list(dict.fromkeys(observation_ids))
+    before = {
+        doc["_id"]: doc
+        for doc in db["observations"].find({"_id": {"$in": observation_ids}}, COUNTER_FIELDS)
+    }
+    to_update = [doc for doc in before.values() if doc.get("status") != new_status]
+
+    changed = []
+    if to_update:
+        result = db["observations"].bulk_write([
+            UpdateOne(
+                {"_id": doc["_id"], "status": doc.get("status")},
+                {"$set": {"status": new_status, "updated_at": now, "moderation_batch": batch}}
+            )
+            for doc in to_update
+        ], ordered=False)
+        changed = to_update
+        if result.modified_count < len(to_update):
+            # Some were moderated concurrently; keeps the ones this write changed
+            ours = set(db["observations"].distinct(
+                "_id",
+                {"_id": {"$in": [doc["_id"] for doc in to_update]}, "moderation_batch": batch}
+            ))
+            changed = [doc for doc in to_update if doc["_id"] in ours]
+
+    counters = ObservationCounters()
+    for doc in changed:
+        counters.add(doc, {**doc, "status": new_status})
+    counters.apply(db)
+
+    changed_ids = {doc["_id"] for doc in changed}
+    logger.info(f"[MODERATION] Set {len(changed_ids)} observations to {new_status}")
+    return {
+        "updated": [str(_id) for _id in observation_ids if _id in changed_ids],
+        "unchanged": [str(_id) for _id in observation_ids if _id in before and _id not in changed_ids],
+        "not_found": [str(_id) for _id in observation_ids if _id not in before],
+    }
+
+
+def parse_observation_ids(values):
+    """Converts a list of id strings to ObjectIds. Raises ValueError on bad input."""
+    if not isinstance(values, list) or not values:
+        raise ValueError("observation_ids must be a non-empty list")
+    if len(values) > MAX_BULK_MODERATION:
+        raise ValueError(f"At most {MAX_BULK_MODERATION} observations can be moderated at once")
+    if not all(isinstance(value, str) and ObjectId.is_valid(value) for value in values):
+        raise ValueError("Invalid observation ID")
+    return [ObjectId(value) for value in values]
@@ -0,0 +1,171 @@
+"""
+Lazy, fork-safe access to MongoDB.
+
+Importing this module never opens a connection. The client is created on
+first use in each process, so gunicorn and Celery workers that fork after
+import get their own connection pool instead of sharing the parent's sockets.
+`db` and the collection proxies can be bound at module level and resolve to
+the real pymongo objects only when they are used.
+
+Async views use get_async_db(), backed by an AsyncMongoClient per process
+and event loop.
+"""
+import asyncio
+import logging
+import os
+import threading
+import weakref
+
+from django.conf import settings
+from pymongo import AsyncMongoClient, MongoClient
+
+logger = logging.getLogger(__name__)
+
+
+class MongoClientProvider:
+    """Creates one MongoClient per process, on first use."""
+
+    def __init__(self):
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def client_options(self):
+        return {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connect": False
+        }
+
+    def get_client(self):
+        pid = os.getpid()
+        if self._client is not None and self._pid == pid:
+            return self._client
+
+        with self._lock:
+            if self._client is None or self._pid != pid:
+                # A client inherited across fork is dropped, not closed:
+                # its sockets still belong to the parent process
+                self._client = MongoClient(settings.MONGO_DB_URI, **self.client_options())
+                self._pid = pid
+                logger.info(f"[MongoDB] Created client for process {pid}")
+            return self._client
+
+    def get_database(self):
+        return self.get_client().get_database()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+
+class AsyncMongoClientProvider(MongoClientProvider):
+    """
+    Creates one AsyncMongoClient per process and event loop.
+    Under an ASGI worker there is a single loop; the development server runs
+    each async view in a fresh loop, so clients there are short-lived.
+
+    Each client is paired with a guard task on its loop. asyncio.run()
+    cancels pending tasks before closing the loop, and the guard closes the
+    client when it is cancelled, so a loop's client is closed on the loop's
+    own teardown. close() cancels every guard.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get_client(self):
+        loop = asyncio.get_running_loop()
+        pid = os.getpid()
+        with self._lock:
+            if self._pid != pid:
+                # As with the sync client, clients inherited across fork are dropped, not closed
+                self._clients = weakref.WeakKeyDictionary()
+                self._pid = pid
+            entry = self._clients.get(loop)
+            if entry is None:
+                client = AsyncMongoClient(settings.MONGO_DB_URI, **self.client_options())
+                entry = self._clients[loop] = (client, loop.create_task(self._close_on_teardown(loop, client)))
+            return entry[0]
+
+    async def _close_on_teardown(self, loop, client):
+        try:
+            await loop.create_future()
+        finally:
+            with self._lock:
+                if self._clients.get(loop, (None,))[0] is client:
+                    del self._clients[loop]
+            await client.close()
+
+    def close(self):
+        """Closes every loop's client; each closes on its own loop once that loop runs again."""
+        with self._lock:
+            entries = list(self._clients.items())
+            self._pid = None
+        for loop, (client, guard) in entries:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(guard.cancel)
+
+
+provider = MongoClientProvider()
+async_provider = AsyncMongoClientProvider()
+
+
+def get_client():
+    return provider.get_client()
+
+
+def get_db():
+    return provider.get_database()
+
+
+def get_async_db():
+    """Returns the default database on this event loop's AsyncMongoClient."""
+    return async_provider.get_database()
+
+
+class LazyCollection:
+    """
+    Stands in for a pymongo Collection until it is used.
+    Attributes set on the proxy (e.g. by unittest.mock.patch) take precedence.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
+
+
+class LazyDatabase:
+    """Stands in for the default pymongo Database until it is used."""
+
+    def __getitem__(self, name):
+        return get_db()[name]
+
+    def __getattr__(self, attr):
+        return getattr(get_db(), attr)
+
+    def __repr__(self):
+        return "LazyDatabase()"
+
+
+db = LazyDatabase()
+
+species_collection = LazyCollection("species")
+locations_collection = LazyCollection("locations")
+observations_collection = LazyCollection("observations")
+users_collection = LazyCollection("users")
+comments_collection = LazyCollection("comments")
+meta_collection = LazyCollection("meta")
+media_objects_collection = LazyCollection("media_objects")
+counters_collection = LazyCollection("counters")
+export_jobs_collection = LazyCollection("export_jobs")
@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination helpers for aggregation pipelines.
+
+Cursors are opaque, URL-safe tokens holding the sort key values of the last
+document on a page. Values are serialised with bson's extended JSON so that
+ObjectIds and dates survive the round trip with their types intact.
+"""
+import base64
+
+from bson import json_util
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded."""
+
+
+def encode_cursor(values):
+    """Encodes a list of sort key values into an opaque cursor token."""
+    raw = json_util.dumps(list(values)).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Decodes a cursor token back into its list of sort key values."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise InvalidCursor(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor: expected a list of values")
+    return values
+
+
+def keyset_filter(fields, values, direction=-1):
+    """
+    Builds a $match condition selecting documents strictly after `values`
+    in a sort on `fields` (all in the same direction).
+    """
+    if not values:
+        return {}
+    if len(values) != len(fields):
+        raise InvalidCursor("Invalid cursor: wrong number of values")
+
+    operator = "$lt" if direction < 0 else "$gt"
+    clauses = []
+    for i, field in enumerate(fields):
+        clause = {fields[j]: values[j] for j in range(i)}
+        clause[field] = {operator: values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def parse_limit(value, default=50, maximum=500):
+    """Parses a page size query parameter, clamping it to [1, maximum]."""
+    if value in (None, ""):
+        return default
+    limit = int(value)
+    return max(1, min(limit, maximum))
+
+
+def paginate(docs, limit, fields):
+    """
+    Splits a list fetched with `limit + 1` into the page and the next cursor.
+    Returns (page, next_cursor), where next_cursor is None on the last page.
+    """
+    page = docs[:limit]
+    if len(docs) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor([last.get(field) for field in fields])
@@ -0,0 +1,47 @@
+"""
+JSON responses that serialise MongoDB documents directly.
+
+MongoJSONEncoder converts BSON types while the payload is being encoded, so
+views can return query results without first copying them into
+JSON-friendly structures.
+"""
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from django.http import JsonResponse
+
+
+class MongoJSONEncoder(json.JSONEncoder):
+    """Encodes ObjectId, datetime, Decimal128 and bytes values in a single pass."""
+
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, Decimal128):
+            return str(o.to_decimal())
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if isinstance(o, (bytes, bytearray, memoryview)):
+            return base64.b64encode(bytes(o)).decode("ascii")
+        if isinstance(o, uuid.UUID):
+            return str(o)
+        return super().default(o)
+
+
+def dumps(data, **kwargs):
+    """Serialises data with MongoJSONEncoder."""
+    return json.dumps(data, cls=MongoJSONEncoder, **kwargs)
+
+
+class MongoJsonResponse(JsonResponse):
+    """JsonResponse using MongoJSONEncoder by default."""
+
+    def __init__(self, data, encoder=MongoJSONEncoder, safe=True, json_dumps_params=None, **kwargs):
+        super().__init__(data, encoder=encoder, safe=safe, json_dumps_params=json_dumps_params, **kwargs)
@@ -0,0 +1,58 @@
+"""
+Atomic id allocation for user-created observations.
+
+iNaturalist observations keep their iNaturalist id as source_id, so ids for
+observations uploaded here come from a reserved range starting at
+SOURCE_ID_BASE, well above iNaturalist's. A sequence document in the
+`counters` collection is advanced with $inc to hand each process a block of
+ids, so allocation needs one database round-trip per block rather than a
+probe per upload, and two processes can never receive the same id. Ids left
+in a block when a process exits are simply skipped.
+"""
+import os
+import threading
+
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from .mongo import counters_collection
+
+
+class BlockAllocator:
+    """Hands out ids from blocks reserved on a counters document. Thread- and fork-safe."""
+
+    def __init__(self, name):
+        self.name = name
+        self._next = None
+        self._end = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def reserve_block(self, size):
+        """Advances the sequence by one block and returns its [start, end) range."""
+        counter = counters_collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        end = settings.SOURCE_ID_BASE + counter["value"]
+        return end - size, end
+
+    def allocate(self):
+        with self._lock:
+            # A block inherited across fork is shared with the parent, so it is dropped
+            if self._pid != os.getpid() or self._next is None or self._next >= self._end:
+                self._next, self._end = self.reserve_block(settings.SOURCE_ID_BLOCK_SIZE)
+                self._pid = os.getpid()
+            value = self._next
+            self._next += 1
+            return value
+
+
+source_id_allocator = BlockAllocator("observation_source_id")
+
+
+def allocate_source_id():
+    """Returns a new, never-used source_id for an uploaded observation."""
+    return source_id_allocator.allocate()
@@ -1,6 +1,8 @@
 from celery import shared_task
 import logging
 from .views import fetch_and_store_all
+from .enrichment import EnrichmentIncomplete, enrich_pending
+from .derivatives import generate_derivatives
 
 logger = logging.getLogger(__name__)
 
@@ -13,4 +15,59 @@ def fetch_and_store_all_periodic(self):
         return result.content
     except Exception as e:
         logger.error(f"Sync failed: {str(e)}")
-        raise self.retry(exc=e)
\ No newline at end of file
+        raise self.retry(exc=e)
+
+@shared_task
+def reconcile_stats_periodic():
+    from .counters import reconcile_stats
+    from .mongo import db
+    return reconcile_stats(db)
+
+@shared_task
+def reconcile_species_counts_periodic():
+    from .counters import reconcile_species_counts
+    from .mongo import db
+    return reconcile_species_counts(db)
+
+@shared_task
+def refresh_dashboard_snapshot():
+    from .dashboard import refresh_snapshot
+    from .mongo import db
+    return refresh_snapshot(db)["computed_at"].isoformat()
+
+@shared_task(
+    autoretry_for=(EnrichmentIncomplete,),
+    retry_backoff=30,
+    retry_backoff_max=900,
+    retry_jitter=True,
+    max_retries=5
+)
+def enrich_observations(observation_ids=None):
+    """Enriches the given observations, or sweeps every pending one when called without ids."""
+    return enrich_pending(observation_ids)
+
+@shared_task(
+    autoretry_for=(OSError,),
+    retry_backoff=30,
+    retry_backoff_max=900,
+    retry_jitter=True,
+    max_retries=5
+)
+def generate_photo_derivatives(observation_ids):
+    """Generates thumbnail and medium variants for the given observations' photos."""
+    return generate_derivatives(observation_ids)
+
+@shared_task
+def collect_media_garbage():
+    from .media_store import collect_garbage
+    return collect_garbage()
+
+@shared_task
+def run_export_job(job_id):
+    from .export_jobs import run_job
+    return run_job(job_id)
+
+@shared_task
+def cleanup_export_jobs():
+    from .export_jobs import cleanup_expired
+    return cleanup_expired()
@@ -8,8 +8,40 @@ import jwt
 import datetime
 from bson import ObjectId
 import os
-from unittest.mock import patch, MagicMock, ANY
-from api.views import upload_observation
+from unittest.mock import patch, MagicMock, AsyncMock, ANY
+from api.views import upload_observation, get_all_taxa, recent_users, recent_users_query, pending_content_pipeline
+from api.views import species_observations_pipeline, observation_comments, filter_observations, suggest_species
+from api.views import user_profile, user_profile_observations, pending_content, create_export_job
+from api.fuzzy import SpeciesNameIndex, levenshtein
+from api.responses import MongoJsonResponse
+from api.counters import ObservationCounters, observation_stat_deltas
+from api.timestamps import to_utc_datetime
+from api.indexes import diff_indexes
+from api.checks import check_mongo_indexes
+from django.core.checks.registry import registry as check_registry
+from api.auth import get_principal, invalidate_principal
+from django.core.cache import cache
+from django.test import override_settings
+from api.enrichment import enrich_batch
+from api.uploads import sniff_media_type, upload_errors
+from api.derivatives import generate_photo_variants, storage_name, variant_url
+from api import media_store
+from api.sequences import BlockAllocator
+from api.exports import EXPORT_SCHEMAS, plan_export, stream_export
+from api import export_jobs
+from api import dwca
+from api import dashboard
+from api.moderation import moderate_observations, parse_observation_ids
+from api.mongo import AsyncMongoClientProvider
+import asyncio
+import zipfile
+import tempfile
+import hashlib
+from io import BytesIO
+import requests
+from pymongo import IndexModel
+from bson.decimal128 import Decimal128
+from pymongo.errors import DuplicateKeyError
 
 # Mock the get_location_details function at the class level
 @patch('api.views.get_location_details', return_value={'country': 'MockCountry', 'region': 'MockRegion'})
@@ -25,6 +57,22 @@ class UploadNewObservationTests(TestCase):
         )
         self.auth_headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
 
+        # Counter and taxonomy version writes go straight to the database
+        for target in (
+            'api.views.increment_stats',
+            'api.views.record_observation_change',
+            'api.views.species_name_index.bump_version',
+            'api.views.species_collection.update_one',
+            'api.views.queue_enrichment',
+            'api.views.queue_derivatives'
+        ):
+            patcher = patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch('api.views.allocate_source_id', return_value=10 ** 10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
         # Base data for a valid new observation
         self.base_data = {
             'latitude': '30.04439',
@@ -50,8 +98,9 @@ class UploadNewObservationTests(TestCase):
             # Genus and species are omitted to test default "All" handling
         }
 
-        self.test_image = SimpleUploadedFile("test_image.jpg", b"image_content", "image/jpeg")
-        self.test_audio = SimpleUploadedFile("test_audio.mp3", b"audio_content", "audio/mpeg")
+        # Upload handlers sniff magic bytes, so fixtures start with real signatures
+        self.test_image = SimpleUploadedFile("test_image.jpg", b"\xff\xd8\xff\xe0\x00\x10JFIF\x00image_content", "image/jpeg")
+        self.test_audio = SimpleUploadedFile("test_audio.mp3", b"ID3\x03\x00\x00\x00\x00\x00\x00audio_content", "audio/mpeg")
 
     def tearDown(self):
         """Clean up created files."""
@@ -64,7 +113,7 @@ class UploadNewObservationTests(TestCase):
         """Mock the user lookup."""
         mock_users_find_one.return_value = {'_id': self.user_id, 'username': 'testuser', 'roles': []}
 
-    @patch('api.views.observations_collection.find_one', return_value=None) # for source_id check
+    @patch('api.views.observations_collection.find_one', return_value=None)
     @patch('api.views.locations_collection.find_one', return_value=None)
     @patch('api.views.species_collection.find_one')
     @patch('api.views.species_collection.insert_one')
@@ -95,7 +144,7 @@ class UploadNewObservationTests(TestCase):
         self.assertIn('species_id', inserted_doc)
         self.assertNotIn('raw_taxonomy', inserted_doc)
 
-    @patch('api.views.observations_collection.find_one', return_value=None) # for source_id check
+    @patch('api.views.observations_collection.find_one', return_value=None)
     @patch('api.views.locations_collection.find_one', return_value=None)
     @patch('api.views.species_collection.insert_one')
     @patch('api.views.locations_collection.insert_one')
@@ -134,8 +183,10 @@ class UploadNewObservationTests(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("Family is required", json.loads(response.content)['error'])
 
+    @patch('api.views.species_collection.find_one', return_value=None)
+    @patch('api.views.species_collection.insert_one')
     @patch('api.views.users_collection.find_one')
-    def test_missing_required_field_location(self, mock_users_find, mock_get_loc):
+    def test_missing_required_field_location(self, mock_users_find, mock_species_insert, mock_species_find, mock_get_loc):
         """Test request fails if 'latitude' or 'longitude' is missing for a new observation."""
         self._mock_user(mock_users_find)
         data = self.complete_taxonomy_data.copy()
@@ -153,9 +204,12 @@ class UploadNewObservationTests(TestCase):
     @patch('api.views.locations_collection.insert_one')
     @patch('api.views.observations_collection.insert_one')
     @patch('api.views.users_collection.find_one')
-    @patch('api.views.default_storage.save', return_value='uploads/mock_file.jpg')
-    @patch('api.views.default_storage.url', return_value='http://test.com/uploads/mock_file.jpg')
-    def test_successful_file_upload(self, mock_storage_url, mock_storage_save, mock_users_find, mock_obs_insert, mock_loc_insert, mock_species_insert, mock_species_find, mock_loc_find, mock_obs_find_sid, mock_get_loc):
+    @patch('api.media_store.media_objects_collection.find_one_and_update',
+           side_effect=lambda query, update, **kwargs: {**update["$setOnInsert"], "_id": query["_id"], "refcount": 1})
+    @patch('api.media_store.default_storage.exists', return_value=False)
+    @patch('api.media_store.default_storage.save', side_effect=lambda name, content: name)
+    @patch('api.media_store.default_storage.url', side_effect=lambda name: f'http://test.com/{name}')
+    def test_successful_file_upload(self, mock_storage_url, mock_storage_save, mock_storage_exists, mock_media_upsert, mock_users_find, mock_obs_insert, mock_loc_insert, mock_species_insert, mock_species_find, mock_loc_find, mock_obs_find_sid, mock_get_loc):
         """Test successful creation of an observation with a media file."""
         self._mock_user(mock_users_find)
         mock_loc_insert.return_value.inserted_id = ObjectId()
@@ -173,7 +227,9 @@ class UploadNewObservationTests(TestCase):
         mock_obs_insert.assert_called_once()
         inserted_doc = mock_obs_insert.call_args[0][0]
         self.assertEqual(len(inserted_doc['photo']), 1)
-        self.assertEqual(inserted_doc['photo'][0], 'http://test.com/uploads/mock_file.jpg')
+        # Stored under the SHA-256 of its bytes
+        digest = hashlib.sha256(b"\xff\xd8\xff\xe0\x00\x10JFIF\x00image_content").hexdigest()
+        self.assertEqual(inserted_doc['photo'][0], f'http://test.com/uploads/{digest}.jpg')
 
     def test_authentication_failure_no_token(self, mock_get_loc):
         """Test that a request without a token fails with 401."""
@@ -188,4 +244,1061 @@ class UploadNewObservationTests(TestCase):
         request = self.factory.post('/api/upload/', self.complete_taxonomy_data, **self.auth_headers)
         response = upload_observation(request)
         self.assertEqual(response.status_code, 401)
-        self.assertIn("Invalid token", json.loads(response.content)['error'])
\ No newline at end of file
+        self.assertIn("Invalid token", json.loads(response.content)['error'])
+
+
+class SpeciesNameIndexTests(TestCase):
+    def setUp(self):
+        self.index = SpeciesNameIndex([
+            {"family": "Hesperiidae", "genus": "Hylephila", "species": "Hylephila phyleus", "common_name": "Fiery Skipper"},
+            {"family": "Nymphalidae", "genus": "Danaus", "species": "Danaus plexippus", "common_name": "Monarch"},
+            {"family": "Nymphalidae", "genus": "Vanessa", "species": "Vanessa cardui", "common_name": "Painted Lady"},
+        ])
+
+    def test_levenshtein_respects_max_distance(self):
+        """Test that distances above the cutoff are reported as None."""
+        self.assertEqual(levenshtein("danaus", "danaus"), 0)
+        self.assertEqual(levenshtein("danaus", "danuas"), 2)
+        self.assertIsNone(levenshtein("danaus", "vanessa", max_distance=2))
+
+    def test_misspelled_scientific_name_is_suggested(self):
+        """Test that a typo in a scientific name still finds the species."""
+        suggestions = self.index.suggest("Danaus plexipus")
+        self.assertEqual(suggestions[0][0], 1)
+        self.assertEqual(suggestions[0][1]["species"], "Danaus plexippus")
+
+    def test_common_name_matches_are_deduplicated(self):
+        """Test that a species matched by both names is returned once."""
+        suggestions = self.index.suggest("pianted lady", limit=5)
+        self.assertEqual([s["species"] for _, s in suggestions], ["Vanessa cardui"])
+
+    def test_unrelated_term_returns_nothing(self):
+        """Test that terms far from every name produce no suggestions."""
+        self.assertEqual(self.index.suggest("coleoptera"), [])
+
+    def test_suggest_view_clamps_and_validates_limit(self):
+        """Test that limit is clamped to [1, 20] and a non-integer limit is a 400."""
+        factory = RequestFactory()
+        with patch('api.views.species_name_index.suggest', return_value=[]) as mock_suggest:
+            for value, expected in (("0", 1), ("-3", 1), ("50", 20), ("", 5)):
+                suggest_species(factory.get('/api/suggest_species/', {"q": "danaus", "limit": value}))
+                self.assertEqual(mock_suggest.call_args.kwargs["limit"], expected)
+
+            response = suggest_species(factory.get('/api/suggest_species/', {"q": "danaus", "limit": "many"}))
+        self.assertEqual(response.status_code, 400)
+
+
+class MongoJsonResponseTests(TestCase):
+    def test_bson_types_are_encoded_directly(self):
+        """Test that ObjectId, datetime, Decimal128 and bytes serialise without conversion."""
+        oid = ObjectId()
+        when = datetime.datetime(2025, 6, 22, 20, 45)
+        response = MongoJsonResponse({
+            "_id": oid,
+            "nested": [{"timestamp": when}],
+            "amount": Decimal128("1.50"),
+            "blob": b"\x00\x01"
+        })
+        self.assertEqual(json.loads(response.content), {
+            "_id": str(oid),
+            "nested": [{"timestamp": "2025-06-22T20:45:00"}],
+            "amount": "1.50",
+            "blob": "AAE="
+        })
+
+
+class StatsCounterTests(TestCase):
+    def test_insert_counts_pending_and_complete(self):
+        """Test that a new complete, pending observation bumps every counter."""
+        doc = {"species_id": 1, "location_id": 2, "timestamp": "t", "photo": ["a.jpg"], "status": "pending"}
+        self.assertEqual(observation_stat_deltas(None, doc), {
+            "observations": 1, "pending": 1, "complete_observations": 1
+        })
+
+    def test_moderation_only_moves_pending(self):
+        """Test that approving an observation only decrements pending."""
+        before = {"status": "pending", "photo": []}
+        after = {"status": "approved", "photo": []}
+        self.assertEqual(observation_stat_deltas(before, after), {
+            "observations": 0, "pending": -1, "complete_observations": 0
+        })
+
+    def test_species_change_moves_count_between_species(self):
+        """Test that re-identifying an observation decrements the old species and increments the new one."""
+        db = MagicMock()
+        counters = ObservationCounters()
+        counters.add({"species_id": "old", "status": "pending"}, {"species_id": "new", "status": "pending"})
+
+        counters.apply(db)
+
+        updates = {op._filter["_id"]: op._doc["$inc"] for op in db["species"].bulk_write.call_args[0][0]}
+        self.assertEqual(updates, {
+            "old": {"observations_count": -1, "status_counts.pending": -1},
+            "new": {"observations_count": 1, "status_counts.pending": 1}
+        })
+
+    def test_status_change_only_moves_status_counts(self):
+        """Test that moderation keeps observations_count and shifts status_counts."""
+        db = MagicMock()
+        counters = ObservationCounters()
+        counters.add({"species_id": "s", "status": "pending"}, {"species_id": "s", "status": "rejected"})
+
+        counters.apply(db)
+
+        update = db["species"].bulk_write.call_args[0][0][0]
+        self.assertEqual(update._doc["$inc"], {"status_counts.pending": -1, "status_counts.rejected": 1})
+        db["stats"].update_one.assert_called_once()
+        self.assertEqual(db["stats"].update_one.call_args[0][1]["$inc"], {"pending": -1})
+
+
+class TimestampTests(TestCase):
+    def test_iso_strings_become_naive_utc(self):
+        """Test that legacy upload strings and offsets are converted to UTC."""
+        self.assertEqual(to_utc_datetime("2025-06-22T20:45:00Z"), datetime.datetime(2025, 6, 22, 20, 45))
+        self.assertEqual(to_utc_datetime("2025-06-22T22:45:00+02:00"), datetime.datetime(2025, 6, 22, 20, 45))
+        self.assertEqual(to_utc_datetime("2025/06/22 8:45 PM"), datetime.datetime(2025, 6, 22, 20, 45))
+
+    def test_unparseable_values_return_none(self):
+        """Test that garbage is rejected rather than stored."""
+        self.assertIsNone(to_utc_datetime("yesterday"))
+        self.assertIsNone(to_utc_datetime(None))
+
+
+class IndexRegistryTests(TestCase):
+    def test_diff_reports_missing_changed_and_extra(self):
+        """Test that the registry diff classifies every index."""
+        registry = {"observations": [
+            IndexModel([("source_id", 1)], unique=True),
+            IndexModel([("status", 1)]),
+        ]}
+        db = {"observations": MagicMock()}
+        db["observations"].list_indexes.return_value = [
+            {"name": "_id_", "key": {"_id": 1}},
+            {"name": "source_id_1", "key": {"source_id": 1}},
+            {"name": "legacy_1", "key": {"legacy": 1}},
+        ]
+        self.assertEqual(diff_indexes(db, registry), {
+            "missing": [("observations", "status_1")],
+            "changed": [("observations", "source_id_1")],
+            "extra": [("observations", "legacy_1")]
+        })
+
+    def test_index_check_only_runs_with_deploy_checks(self):
+        """Test that ordinary manage.py commands do not connect to MongoDB for the index check."""
+        self.assertNotIn(check_mongo_indexes, check_registry.get_checks(include_deployment_checks=False))
+        self.assertIn(check_mongo_indexes, check_registry.get_checks(include_deployment_checks=True))
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user_id = ObjectId()
+
+    @patch('api.views.users_collection.find_one')
+    def test_principal_is_cached_until_invalidated(self, mock_users_find):
+        """Test that repeated lookups hit the database once until invalidated."""
+        mock_users_find.return_value = {'_id': self.user_id, 'username': 'testuser', 'roles': ['admin'], 'password': b'x'}
+
+        first = get_principal(self.user_id)
+        second = get_principal(str(self.user_id))
+        self.assertEqual(mock_users_find.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(first, {'_id': self.user_id, 'roles': ['admin'], 'isBlocked': False, 'name': 'testuser'})
+
+        mock_users_find.return_value = {**mock_users_find.return_value, 'isBlocked': True}
+        invalidate_principal(self.user_id)
+        self.assertTrue(get_principal(self.user_id)['isBlocked'])
+        self.assertEqual(mock_users_find.call_count, 2)
+
+    @patch('api.views.create_comment')
+    @patch('api.views.observations_collection.find_one', return_value={"_id": ObjectId()})
+    @patch('api.views.users_collection.find_one')
+    def test_comment_post_checks_the_user(self, mock_users_find, mock_obs_find, mock_create):
+        """Test that posting a comment needs an existing, unblocked user and a well-formed header."""
+        token = jwt.encode({"user_id": str(self.user_id)}, settings.SECRET_KEY, algorithm="HS256")
+        factory = RequestFactory()
+
+        def post(authorization):
+            request = factory.post('/api/observations/1/comments/', {}, content_type='application/json',
+                                   HTTP_AUTHORIZATION=authorization)
+            return observation_comments(request, 1).status_code
+
+        mock_users_find.return_value = None
+        self.assertEqual(post(f"Bearer {token}"), 404)
+        for malformed in ("Bearer", "Bearer  ", f"Token {token}", "Bearer not.a.jwt"):
+            self.assertEqual(post(malformed), 401)
+
+        mock_users_find.return_value = {"_id": self.user_id, "roles": ["user"], "isBlocked": True}
+        self.assertEqual(post(f"Bearer {token}"), 403)
+        mock_create.assert_not_called()
+
+    @patch('api.views.get_async_db')
+    async def test_filter_needs_a_user_only_for_own_observations(self, mock_get_async_db):
+        """Test that anonymous filtering works and "only mine" requires a valid token."""
+        species = MagicMock(distinct=AsyncMock(return_value=[]))
+        observations = MagicMock(aggregate=AsyncMock(return_value=MagicMock(to_list=AsyncMock(return_value=[]))))
+        mock_get_async_db.return_value = {"species": species, "observations": observations}
+        params = {"family": "Apidae", "start_date": "2025-01-01", "end_date": "2025-12-31"}
+
+        response = await filter_observations(RequestFactory().get('/api/filter_observations/', params))
+        self.assertEqual(response.status_code, 200)
+
+        response = await filter_observations(RequestFactory().get(
+            '/api/filter_observations/', {**params, "show_only_my_observations": "true"},
+            HTTP_AUTHORIZATION="Bearer not.a.jwt"
+        ))
+        self.assertEqual(response.status_code, 401)
+        species.distinct.assert_awaited_once()
+
+
+class AsyncTaxaViewTests(TestCase):
+    @patch('api.views.get_async_db')
+    async def test_get_all_taxa_runs_distincts_concurrently(self, mock_get_async_db):
+        """Test that the async taxa view gathers the three distinct queries."""
+        species_coll = MagicMock()
+        species_coll.distinct = AsyncMock(side_effect=[["Nymphalidae", None], ["Vanessa"], ["Vanessa cardui"]])
+        mock_get_async_db.return_value = {"species": species_coll}
+
+        response = await get_all_taxa(RequestFactory().get('/api/taxa/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {
+            "families": ["Nymphalidae"],
+            "genera": ["Vanessa"],
+            "species": ["Vanessa cardui"]
+        })
+        self.assertEqual(species_coll.distinct.await_count, 3)
+
+
+def evaluate_expression(expression, doc):
+    """Evaluates the few aggregation operators the timestamp projection uses against one document."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if not isinstance(expression, dict):
+        return expression
+    (operator, args), = expression.items()
+    if operator == "$cond":
+        branch = "then" if evaluate_expression(args["if"], doc) else "else"
+        return evaluate_expression(args[branch], doc)
+    if operator == "$eq":
+        return evaluate_expression(args[0], doc) == evaluate_expression(args[1], doc)
+    if operator == "$type":
+        value = evaluate_expression(args, doc)
+        return "date" if isinstance(value, datetime.datetime) else "missing" if value is None else "string"
+    if operator == "$ifNull":
+        value = evaluate_expression(args[0], doc)
+        return value if value is not None else evaluate_expression(args[1], doc)
+    if operator == "$dateToString":
+        value = evaluate_expression(args["date"], doc)
+        if not isinstance(value, datetime.datetime):
+            raise TypeError("$dateToString requires a date")
+        return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    raise NotImplementedError(operator)
+
+
+class SpeciesObservationsPipelineTests(TestCase):
+    def test_unconverted_timestamps_do_not_break_the_projection(self):
+        """Test that string and missing timestamps pass through instead of failing $dateToString."""
+        pipeline = species_observations_pipeline({"_id": ObjectId(), "species": "Apis mellifera"})
+        expression = pipeline[-1]["$project"]["properties"]["timestamp"]
+
+        self.assertEqual(
+            evaluate_expression(expression, {"timestamp": datetime.datetime(2025, 5, 1, 9, 30)}),
+            "2025-05-01T09:30:00.000Z"
+        )
+        self.assertEqual(evaluate_expression(expression, {"timestamp": "sometime in May"}), "sometime in May")
+        self.assertIsNone(evaluate_expression(expression, {}))
+
+
+@patch('api.mongo.AsyncMongoClient')
+class AsyncMongoClientProviderTests(TestCase):
+    def test_client_is_closed_when_its_loop_is_torn_down(self, mock_client_class):
+        """Test that each event loop gets its own client, closed when asyncio.run() finishes."""
+        provider = AsyncMongoClientProvider()
+        mock_client_class.side_effect = lambda *args, **kwargs: MagicMock(close=AsyncMock())
+
+        async def use_client():
+            client = provider.get_client()
+            self.assertIs(provider.get_client(), client)
+            return client
+
+        first = asyncio.run(use_client())
+        second = asyncio.run(use_client())
+
+        self.assertIsNot(first, second)
+        first.close.assert_awaited_once()
+        second.close.assert_awaited_once()
+        self.assertEqual(len(provider._clients), 0)
+
+    def test_close_closes_open_clients(self, mock_client_class):
+        """Test that close() closes the client of a loop that is still running."""
+        provider = AsyncMongoClientProvider()
+        mock_client_class.return_value.close = AsyncMock()
+
+        async def close_while_running():
+            provider.get_client()
+            provider.close()
+            for _ in range(3):
+                await asyncio.sleep(0)
+            return mock_client_class.return_value.close.await_count
+
+        self.assertEqual(asyncio.run(close_while_running()), 1)
+
+
+@override_settings(ENRICHMENT_GEOCODE_INTERVAL=0, ENRICHMENT_MAX_ATTEMPTS=2)
+class EnrichmentTests(TestCase):
+    def setUp(self):
+        self.location_id = ObjectId()
+        self.observation = {"_id": ObjectId(), "location_id": self.location_id, "photo": []}
+        self.location = {"_id": self.location_id, "latitude": 48.85, "longitude": 2.35, "name": "Park", "enrichment": "pending"}
+
+    @patch('api.enrichment.reverse_geocode', return_value={'name': 'Paris', 'country': 'France', 'region': 'IDF'})
+    @patch('api.views.observations_collection.update_many')
+    @patch('api.views.locations_collection.update_one')
+    @patch('api.views.locations_collection.find')
+    def test_geocodes_pending_location_and_marks_done(self, mock_loc_find, mock_loc_update, mock_obs_update, mock_geocode):
+        """Test that a pending location is geocoded and its observation marked done."""
+        mock_loc_find.return_value = [self.location]
+
+        enriched, incomplete = enrich_batch([self.observation])
+
+        self.assertEqual((enriched, incomplete), (1, False))
+        location_update = mock_loc_update.call_args[0][1]["$set"]
+        self.assertEqual(location_update["country"], "France")
+        self.assertEqual(location_update["continent"], "Europe")
+        self.assertNotIn("name", location_update)  # keeps the name the uploader typed
+        mock_obs_update.assert_called_once_with(
+            {"_id": {"$in": [self.observation["_id"]]}},
+            {"$set": {"enrichment": "done", "enriched_at": ANY, "updated_at": ANY}}
+        )
+        observation_update = mock_obs_update.call_args[0][1]["$set"]
+        self.assertEqual(observation_update["updated_at"], observation_update["enriched_at"])
+
+    @patch('api.enrichment.reverse_geocode', side_effect=requests.Timeout("slow"))
+    @patch('api.views.observations_collection.update_many')
+    @patch('api.views.locations_collection.update_one')
+    @patch('api.views.locations_collection.find')
+    def test_transient_failure_leaves_observation_pending(self, mock_loc_find, mock_loc_update, mock_obs_update, mock_geocode):
+        """Test that a timeout keeps the observation pending for a retry."""
+        mock_loc_find.return_value = [self.location]
+
+        enriched, incomplete = enrich_batch([self.observation])
+
+        self.assertEqual((enriched, incomplete), (0, True))
+        self.assertEqual(mock_loc_update.call_args[0][1]["$set"]["enrichment"], "pending")
+        self.assertIn("updated_at", mock_loc_update.call_args[0][1]["$set"])
+        mock_obs_update.assert_not_called()
+
+
+class StreamingUploadTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_sniffs_type_from_magic_bytes(self):
+        """Test that media types come from file signatures, not names."""
+        self.assertEqual(sniff_media_type(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8), "image/png")
+        self.assertEqual(sniff_media_type(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "image/webp")
+        self.assertEqual(sniff_media_type(b"OggS" + b"\x00" * 12), "audio/ogg")
+        self.assertIsNone(sniff_media_type(b"<html><body>"))
+
+    def test_rejects_disguised_file(self):
+        """Test that a non-media file with an image name and type is skipped."""
+        fake = SimpleUploadedFile("photo.jpg", b"#!/bin/sh\necho not an image\n", "image/jpeg")
+        request = self.factory.post('/api/upload/', {'photo': fake})
+
+        self.assertNotIn('photo', request.FILES)
+        self.assertEqual(upload_errors(request), [{"file": "photo.jpg", "error": "Unsupported file type"}])
+
+    @override_settings(MEDIA_MAX_IMAGE_BYTES=1024)
+    def test_rejects_oversize_image(self):
+        """Test that an image over the size limit is skipped while streaming."""
+        big = SimpleUploadedFile("big.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096, "image/png")
+        request = self.factory.post('/api/upload/', {'photo': big})
+
+        self.assertNotIn('photo', request.FILES)
+        self.assertEqual(upload_errors(request)[0]["file"], "big.png")
+
+    def test_sets_sniffed_content_type(self):
+        """Test that the stored content type is the sniffed one."""
+        png = SimpleUploadedFile("photo.jpg", b"\x89PNG\r\n\x1a\n" + b"\x00" * 32, "image/jpeg")
+        request = self.factory.post('/api/upload/', {'photo': png})
+
+        self.assertEqual(request.FILES['photo'].content_type, "image/png")
+
+
+class PhotoDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name, IMAGE_DERIVATIVE_FORMAT="WEBP")
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def _save_photo(self, size):
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new("RGB", size, "green").save(buffer, "JPEG")
+        name = default_storage.save("uploads/photo.jpg", SimpleUploadedFile("photo.jpg", buffer.getvalue()))
+        return default_storage.url(name)
+
+    def test_generates_thumb_and_medium(self):
+        """Test that a large photo gets a square thumbnail and a bounded medium variant."""
+        from PIL import Image
+        photo = self._save_photo((3000, 2000))
+
+        entry = generate_photo_variants(photo)
+
+        self.assertEqual(entry["src"], photo)
+        with default_storage.open(entry["thumb"][len(settings.MEDIA_URL):]) as f:
+            self.assertEqual(Image.open(f).size, (320, 320))
+        with default_storage.open(entry["medium"][len(settings.MEDIA_URL):]) as f:
+            image = Image.open(f)
+            self.assertEqual((image.format, image.size), ("WEBP", (1024, 683)))
+
+    def test_undecodable_photo_records_error(self):
+        """Test that an unreadable image is recorded instead of raising."""
+        name = default_storage.save("uploads/broken.jpg", SimpleUploadedFile("broken.jpg", b"\xff\xd8\xffnot really"))
+
+        entry = generate_photo_variants(default_storage.url(name))
+
+        self.assertIn("error", entry)
+        self.assertNotIn("thumb", entry)
+
+    def test_variant_url_selection(self):
+        """Test variant lookup, iNaturalist size rewriting and the original fallback."""
+        variants = [{"src": "/media/uploads/a.jpg", "thumb": "/media/derivatives/a_thumb.webp"}]
+        inat = "https://inaturalist-open-data.s3.amazonaws.com/photos/123/medium.jpg"
+
+        self.assertEqual(variant_url("/media/uploads/a.jpg", variants, "thumb"), "/media/derivatives/a_thumb.webp")
+        self.assertEqual(variant_url("/media/uploads/b.jpg", variants, "thumb"), "/media/uploads/b.jpg")
+        self.assertEqual(variant_url(inat, None, "thumb"), "https://inaturalist-open-data.s3.amazonaws.com/photos/123/small.jpg")
+
+
+class MediaStoreTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        override = override_settings(MEDIA_ROOT=media_root.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.objects = {}
+
+    def _upsert(self, query, update, **kwargs):
+        """Applies store()'s upsert to an in-memory media_objects collection."""
+        doc = self.objects.setdefault(query["_id"], {"_id": query["_id"], **update["$setOnInsert"], "refcount": 0})
+        doc["refcount"] += update["$inc"]["refcount"]
+        return dict(doc)
+
+    def test_identical_uploads_are_stored_once(self):
+        """Test that the same bytes uploaded twice share one file and count two references."""
+        with patch('api.media_store.media_objects_collection.find_one_and_update', side_effect=self._upsert):
+            first = media_store.store(SimpleUploadedFile("a.png", b"\x89PNG same bytes", "image/png"), "uploads")
+            second = media_store.store(SimpleUploadedFile("b.png", b"\x89PNG same bytes", "image/png"), "uploads")
+
+        self.assertEqual(first, second)
+        self.assertEqual(default_storage.listdir("uploads")[1], [os.path.basename(first)])
+        self.assertEqual(list(self.objects.values())[0]["refcount"], 2)
+
+    @patch('api.media_store.media_objects_collection.find_one', return_value=None)
+    @patch('api.media_store.media_objects_collection.find_one_and_update', return_value=None)
+    def test_release_deletes_legacy_file(self, mock_decrement, mock_find):
+        """Test that a file saved before the media store existed is deleted on release."""
+        name = default_storage.save("uploads/legacy.jpg", SimpleUploadedFile("legacy.jpg", b"old"))
+
+        media_store.release(default_storage.url(name))
+
+        self.assertFalse(default_storage.exists(name))
+
+    @patch('api.media_store.media_objects_collection.update_one')
+    @patch('api.media_store.media_objects_collection.find_one_and_update')
+    def test_release_keeps_shared_file(self, mock_decrement, mock_mark):
+        """Test that releasing one of several references keeps the file."""
+        name = default_storage.save("uploads/shared.jpg", SimpleUploadedFile("shared.jpg", b"shared"))
+        mock_decrement.return_value = {"_id": "abc", "name": name, "refcount": 1}
+
+        media_store.release(default_storage.url(name))
+
+        self.assertTrue(default_storage.exists(name))
+        mock_mark.assert_not_called()
+
+    @patch('api.media_store.time.sleep')
+    def test_store_waits_for_a_collection_in_progress(self, mock_sleep):
+        """Test that store() does not reference an object marked for deletion, and saves the file afresh."""
+        attempts = []
+
+        def upsert(query, update, **kwargs):
+            attempts.append(query)
+            if len(attempts) == 1:
+                raise DuplicateKeyError("marked for deletion")
+            return self._upsert(query, update, **kwargs)
+
+        with patch('api.media_store.media_objects_collection.find_one_and_update', side_effect=upsert) as mock_upsert:
+            url = media_store.store(SimpleUploadedFile("a.png", b"\x89PNG bytes", "image/png"), "uploads")
+
+        filter_ = mock_upsert.call_args.args[0]
+        self.assertIn({"deleting_at": {"$exists": False}}, filter_["$or"])
+        self.assertEqual(mock_upsert.call_count, 2)
+        mock_sleep.assert_called_once()
+        self.assertTrue(default_storage.exists(storage_name(url)))
+
+    @patch('api.media_store.release')
+    @patch('api.media_store.default_storage.save', side_effect=OSError("disk full"))
+    def test_failed_save_gives_the_reference_back(self, mock_save, mock_release):
+        """Test that the reference taken before saving is released when the save fails."""
+        with patch('api.media_store.media_objects_collection.find_one_and_update', side_effect=self._upsert):
+            with self.assertRaises(OSError):
+                media_store.store(SimpleUploadedFile("a.png", b"\x89PNG bytes", "image/png"), "uploads")
+
+        mock_release.assert_called_once_with(list(self.objects.values())[0]["url"])
+
+    @patch('api.media_store.media_objects_collection')
+    def test_collection_marks_before_deleting_files(self, mock_objects):
+        """Test that files are only deleted once the object is marked, and are kept if it was re-referenced."""
+        name = default_storage.save("uploads/unused.jpg", SimpleUploadedFile("unused.jpg", b"unused"))
+        mock_objects.find.return_value = [{"_id": "abc", "name": name}]
+        mock_objects.update_one.return_value.modified_count = 0
+
+        self.assertEqual(media_store.collect_garbage(), 0)
+        self.assertTrue(default_storage.exists(name))
+        mock_objects.delete_one.assert_not_called()
+
+        mock_objects.update_one.return_value.modified_count = 1
+        self.assertEqual(media_store.collect_garbage(), 1)
+        self.assertFalse(default_storage.exists(name))
+        marked_at = mock_objects.update_one.call_args.args[1]["$set"]["deleting_at"]
+        mock_objects.delete_one.assert_called_once_with({"_id": "abc", "deleting_at": marked_at})
+
+
+@override_settings(SOURCE_ID_BASE=10 ** 10, SOURCE_ID_BLOCK_SIZE=3)
+class SourceIdAllocatorTests(TestCase):
+    def setUp(self):
+        self.sequence = {"value": 0}
+
+        def advance(query, update, **kwargs):
+            self.sequence["value"] += update["$inc"]["value"]
+            return dict(self.sequence)
+
+        patcher = patch('api.sequences.counters_collection.find_one_and_update', side_effect=advance)
+        self.mock_advance = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_allocates_blocks_from_reserved_range(self):
+        """Test that ids are sequential above the base and reserved one block at a time."""
+        allocator = BlockAllocator("test")
+
+        ids = [allocator.allocate() for _ in range(4)]
+
+        self.assertEqual(ids, [10 ** 10, 10 ** 10 + 1, 10 ** 10 + 2, 10 ** 10 + 3])
+        self.assertEqual(self.mock_advance.call_count, 2)
+
+    def test_allocators_never_share_ids(self):
+        """Test that separate processes (allocators) draw from disjoint blocks."""
+        first, second = BlockAllocator("test"), BlockAllocator("test")
+
+        ids = [first.allocate(), second.allocate(), first.allocate(), second.allocate()]
+
+        self.assertEqual(len(set(ids)), 4)
+
+    def test_block_is_dropped_after_fork(self):
+        """Test that a child process reserves its own block instead of reusing the parent's."""
+        allocator = BlockAllocator("test")
+        parent_id = allocator.allocate()
+
+        with patch('api.sequences.os.getpid', return_value=-1):
+            child_id = allocator.allocate()
+
+        self.assertEqual(child_id, parent_id + 3)
+
+
+class StreamingExportTests(TestCase):
+    def setUp(self):
+        self.user_id = ObjectId()
+        self.docs = {
+            "species": [{"_id": ObjectId(), "species": "Apis mellifera", "status_counts": {"verified": 2}}] * 3,
+            "comments": [{"_id": ObjectId(), "comment_text": "Nice", "timestamp": datetime.datetime(2025, 1, 2)}]
+        }
+
+    def _batches(self, collection, query, batch_size=1000):
+        docs = self.docs.get(collection, [])
+        for start in range(0, len(docs), 2):
+            yield docs[start:start + 2]
+
+    def test_regular_user_only_gets_own_private_documents(self):
+        """Test that a non-admin export filters owned collections and their own user record."""
+        plan = dict(plan_export(str(self.user_id), is_admin=False))
+
+        self.assertEqual(plan["species"], {})
+        self.assertEqual(plan["observations"], {"user_id": self.user_id})
+        self.assertEqual(plan["users"], {"_id": self.user_id})
+        self.assertNotIn("password", EXPORT_SCHEMAS["users"])
+
+    def test_csv_zip_is_streamed_with_fixed_headers(self):
+        """Test that the CSV export is a valid ZIP built from batches, with schema headers."""
+        progress = []
+        with patch('api.exports.iter_batches', side_effect=self._batches):
+            chunks = list(stream_export("csv", [("species", {}), ("comments", {})], lambda *args: progress.append(args)))
+
+        self.assertGreater(len(chunks), 2)
+        archive = zipfile.ZipFile(BytesIO(b"".join(chunks)))
+        rows = archive.read("species.csv").decode().splitlines()
+        self.assertEqual(rows[0].split(","), EXPORT_SCHEMAS["species"])
+        self.assertEqual(len(rows), 4)
+        self.assertIn(("species", 3, True), progress)
+
+    @patch('api.views.authenticate')
+    async def test_export_response_streams_before_cursor_is_exhausted(self, mock_authenticate):
+        """Test that the ASGI response yields chunks while batches are still unread."""
+        mock_authenticate.return_value = {"_id": ObjectId(), "roles": ["admin"]}
+        fetched = []
+
+        def batches(collection, query, batch_size=1000):
+            for index in range(5):
+                fetched.append((collection, index))
+                yield [{"_id": ObjectId(), "comment_text": f"Comment {index}"}]
+
+        with patch('api.exports.iter_batches', side_effect=batches):
+            response = await self.async_client.get('/api/export/ndjson/', HTTP_AUTHORIZATION='Bearer token')
+            self.assertTrue(response.is_async)
+            chunks = response.streaming_content
+            first = await anext(chunks)
+            fetched_at_first_chunk = len(fetched)
+            rest = [chunk async for chunk in chunks]
+
+        self.assertIn(b'"_collection"', first)
+        self.assertEqual(fetched_at_first_chunk, 1)
+        self.assertEqual(len(fetched), 5 * len(EXPORT_SCHEMAS))
+        self.assertEqual(len(rest), 5 * len(EXPORT_SCHEMAS) - 1)
+
+    def test_json_and_ndjson_round_trip(self):
+        """Test that both JSON formats parse back to the exported documents."""
+        plan = [("species", {}), ("comments", {})]
+        with patch('api.exports.iter_batches', side_effect=self._batches):
+            document = json.loads(b"".join(stream_export("json", plan)))
+            lines = b"".join(stream_export("ndjson", plan)).decode().splitlines()
+
+        self.assertEqual(len(document["species"]), 3)
+        self.assertEqual(document["comments"][0]["timestamp"], "2025-01-02T00:00:00")
+        self.assertEqual([json.loads(line)["_collection"] for line in lines], ["species"] * 3 + ["comments"])
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.principal = {"_id": str(ObjectId()), "roles": ["user"]}
+        patcher = patch('api.export_jobs.export_jobs_collection')
+        self.collection = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_identical_request_reuses_recent_job(self):
+        """Test that a repeated export request returns the existing job instead of queueing another."""
+        existing = {"_id": ObjectId(), "status": "running"}
+        self.collection.find_one.return_value = existing
+
+        job, created = export_jobs.create_job(self.principal, "csv")
+
+        self.assertFalse(created)
+        self.assertIs(job, existing)
+        self.collection.insert_one.assert_not_called()
+        query = self.collection.find_one.call_args.args[0]
+        self.assertEqual(query["dedupe_key"], f"{self.principal['_id']}:own:-:csv")
+
+    def test_non_admin_cannot_target_another_user(self):
+        """Test that target_user_id is ignored for regular users."""
+        self.collection.find_one.return_value = None
+        self.collection.insert_one.return_value.inserted_id = ObjectId()
+
+        job, created = export_jobs.create_job(self.principal, "json", target_user_id=str(ObjectId()))
+
+        self.assertTrue(created)
+        self.assertEqual(job["scope"], "own")
+        self.assertIsNone(job["target_user_id"])
+
+    def test_run_job_writes_artifact_and_records_progress(self):
+        """Test that a claimed job streams its export to disk and finishes as done."""
+        job = {
+            "_id": ObjectId(), "format": "ndjson", "status": "running",
+            "plan": [{"collection": "comments", "query": {}}]
+        }
+        self.collection.find_one_and_update.return_value = job
+        docs = [{"_id": ObjectId(), "comment_text": "Nice"}]
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), \
+                patch('api.exports.iter_batches', return_value=iter([docs])):
+            status = export_jobs.run_job(str(job["_id"]))
+            path = export_jobs.artifact_path(job)
+            with open(path) as artifact:
+                lines = artifact.read().splitlines()
+
+        self.assertEqual(status, "done")
+        self.assertEqual(json.loads(lines[0])["comment_text"], "Nice")
+        final = self.collection.update_one.call_args.args[1]["$set"]
+        self.assertEqual(final["status"], "done")
+        self.assertIn("expires_at", final)
+
+    def test_job_claimed_elsewhere_is_skipped(self):
+        """Test that run_job does nothing when the job is no longer queued."""
+        self.collection.find_one_and_update.return_value = None
+
+        self.assertIsNone(export_jobs.run_job(str(ObjectId())))
+        self.collection.update_one.assert_not_called()
+
+    @override_settings(EXPORT_JOB_STALE_SECONDS=60)
+    def test_cleanup_fails_stale_running_jobs(self):
+        """Test that a running job without a recent heartbeat is failed and its partial file removed."""
+        job = {"_id": ObjectId(), "format": "csv", "status": "running"}
+        self.collection.find.side_effect = [[job], []]
+        self.collection.update_one.return_value.modified_count = 1
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            os.makedirs(export_jobs.export_dir())
+            partial = export_jobs.partial_artifact_path(job)
+            open(partial, "wb").close()
+
+            self.assertEqual(export_jobs.cleanup_expired(), 0)
+            self.assertFalse(os.path.exists(partial))
+
+        query, update = self.collection.update_one.call_args.args
+        running, queued = query["$or"]
+        self.assertEqual(running["status"], "running")
+        self.assertIn("$lt", running["heartbeat_at"])
+        self.assertEqual(queued["status"], "queued")
+        self.assertIn("$lt", queued["created_at"])
+        self.assertEqual(update["$set"]["status"], "failed")
+        self.assertIn("expires_at", update["$set"])
+
+    @patch('api.tasks.run_export_job.delay', side_effect=ConnectionError("broker down"))
+    @patch('api.views.authenticate')
+    def test_job_that_cannot_be_queued_is_failed(self, mock_authenticate, mock_delay):
+        """Test that a failed dispatch marks the still-queued job failed instead of leaving it queued."""
+        mock_authenticate.return_value = self.principal
+        self.collection.find_one.return_value = None
+        self.collection.insert_one.return_value.inserted_id = ObjectId()
+
+        request = RequestFactory().post('/api/export/jobs/', {"format": "csv"}, content_type='application/json')
+        response = create_export_job(request)
+
+        self.assertEqual(response.status_code, 503)
+        query, update = self.collection.update_one.call_args.args
+        self.assertEqual(query["status"], "queued")
+        self.assertEqual(update["$set"]["status"], "failed")
+        self.assertIn("expires_at", update["$set"])
+
+
+class DarwinCoreArchiveTests(TestCase):
+    def setUp(self):
+        self.observation = {
+            "_id": ObjectId(), "catalogNumber": 42, "eventDate": datetime.datetime(2025, 5, 1, 9, 30),
+            "scientificName": "Apis mellifera", "genus": "Apis", "family": "Apidae",
+            "decimalLatitude": 51.5, "decimalLongitude": -0.12, "locality": "Hyde\tPark",
+            "status": "verified", "photo": ["/media/a.jpg"], "audio": [],
+            "occurrenceRemarks": "Two lines\nof notes"
+        }
+
+    def test_raw_taxonomy_placeholders_fall_back_to_known_rank(self):
+        """Test that an unresolved observation is named at its most specific known rank."""
+        row = dict(zip(dwca.OCCURRENCE_COLUMNS, dwca.occurrence_row(
+            {"_id": ObjectId(), "scientificName": "All", "genus": "Apis", "family": "Apidae"}
+        )))
+
+        self.assertEqual(row["scientificName"], "Apis")
+        self.assertEqual(row["taxonRank"], "genus")
+        self.assertEqual(row["geodeticDatum"], "")
+
+    def test_filters_are_validated_and_pushed_into_the_match(self):
+        """Test that filters reject bad values and observation filters precede the joins."""
+        with self.assertRaises(dwca.InvalidFilter):
+            dwca.parse_filters({"status": "deleted"})
+
+        since = datetime.datetime(2025, 1, 1)
+        filters = dwca.parse_filters({"status": "verified", "country": "UK", "start_date": "2025-01-01"})
+        pipeline = dwca.occurrence_pipeline(filters, since=since, species_ids=[1])
+
+        self.assertEqual(pipeline[0]["$match"]["status"], "verified")
+        self.assertEqual(pipeline[0]["$match"]["species_id"], {"$in": [1]})
+        self.assertEqual(len(pipeline[0]["$match"]["$or"]), 2)
+        self.assertEqual(pipeline[-1], {"$match": {"country": "UK"}})
+
+    @patch('api.dwca.taxon_species_ids', return_value=None)
+    @patch('api.dwca.db')
+    def test_archive_is_streamed_with_descriptor(self, mock_db, mock_species_ids):
+        """Test that the archive holds tab-separated occurrences, meta.xml and eml.xml."""
+        mock_db.__getitem__.return_value.aggregate.return_value = iter([self.observation] * 3)
+        completed = []
+
+        chunks = list(dwca.stream_archive({}, on_complete=lambda at, rows: completed.append(rows), batch_size=2))
+
+        self.assertGreater(len(chunks), 2)
+        archive = zipfile.ZipFile(BytesIO(b"".join(chunks)))
+        lines = archive.read("occurrence.txt").decode().split("\n")
+        self.assertEqual(lines[0].split("\t"), dwca.OCCURRENCE_COLUMNS)
+        row = dict(zip(dwca.OCCURRENCE_COLUMNS, lines[1].split("\t")))
+        self.assertEqual(row["eventDate"], "2025-05-01T09:30:00Z")
+        self.assertEqual(row["locality"], "Hyde Park")
+        self.assertEqual(row["occurrenceRemarks"], "Two lines of notes")
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(archive.read("meta.xml").decode().count("<field "), len(dwca.OCCURRENCE_COLUMNS))
+        self.assertIn("eml.xml", archive.namelist())
+        self.assertEqual(completed, [3])
+
+    @patch('api.dwca.meta_collection')
+    @patch('api.dwca.taxon_species_ids', return_value=None)
+    @patch('api.dwca.db')
+    @patch('api.views.authenticate')
+    async def test_archive_response_streams_before_cursor_is_exhausted(
+        self, mock_authenticate, mock_db, mock_species_ids, mock_meta
+    ):
+        """Test that the ASGI response yields archive chunks while rows are still unread."""
+        mock_authenticate.return_value = {"_id": ObjectId(), "roles": ["admin"]}
+        total = dwca.BATCH_SIZE * 3
+        read = []
+
+        def rows():
+            for _ in range(total):
+                read.append(1)
+                yield self.observation
+
+        mock_db.__getitem__.return_value.aggregate.return_value = rows()
+
+        response = await self.async_client.get('/api/export/dwca/', HTTP_AUTHORIZATION='Bearer token')
+        self.assertTrue(response.is_async)
+        chunks = response.streaming_content
+        await anext(chunks)
+        read_at_first_chunk = len(read)
+        [chunk async for chunk in chunks]
+
+        self.assertLess(read_at_first_chunk, total)
+        self.assertEqual(len(read), total)
+        mock_meta.update_one.assert_called_once()
+
+
+class DashboardSnapshotTests(TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.collections = {"observations": MagicMock(), "users": MagicMock(), "stats": MagicMock()}
+        self.db.__getitem__.side_effect = self.collections.__getitem__
+
+    def test_snapshot_is_built_from_one_facet_pass(self):
+        """Test that totals, completeness and breakdowns come from the facet result."""
+        self.collections["observations"].aggregate.return_value = iter([{
+            "totals": [{"_id": None, "observations": 8, "pending": 3, "complete_observations": 6}],
+            "by_status": [{"_id": "pending", "count": 3}, {"_id": "verified", "count": 5}],
+            "by_source": [{"_id": "upload", "count": 2}, {"_id": "inaturalist", "count": 6}]
+        }])
+        self.collections["users"].aggregate.return_value = iter([{"_id": "inaturalist", "count": 4}, {"_id": "manual", "count": 1}])
+
+        snapshot = dashboard.compute_snapshot(self.db)
+
+        self.collections["observations"].aggregate.assert_called_once()
+        self.collections["observations"].count_documents.assert_not_called()
+        self.assertEqual(snapshot["data_completeness"], 75.0)
+        self.assertEqual(snapshot["users"], 5)
+        self.assertEqual(snapshot["observations_by_status"], {"pending": 3, "verified": 5})
+
+    def test_empty_database_has_zero_completeness(self):
+        """Test that an empty facet result does not divide by zero."""
+        self.collections["observations"].aggregate.return_value = iter([{"totals": [], "by_status": [], "by_source": []}])
+        self.collections["users"].aggregate.return_value = iter([])
+
+        snapshot = dashboard.compute_snapshot(self.db)
+
+        self.assertEqual(snapshot["observations"], 0)
+        self.assertEqual(snapshot["data_completeness"], 0)
+
+    @override_settings(DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS=60)
+    @patch('api.dashboard.queue_refresh')
+    @patch('api.dashboard.refresh_snapshot')
+    def test_stale_snapshot_is_served_while_refresh_is_queued(self, mock_refresh, mock_queue):
+        """Test that reads never recompute an existing snapshot inline."""
+        stale = {"observations": 1, "computed_at": datetime.datetime.utcnow() - datetime.timedelta(minutes=5)}
+        self.collections["stats"].find_one.return_value = stale
+
+        self.assertIs(dashboard.read_snapshot(self.db), stale)
+        mock_queue.assert_called_once()
+        mock_refresh.assert_not_called()
+
+        self.collections["stats"].find_one.return_value = {**stale, "computed_at": datetime.datetime.utcnow()}
+        dashboard.read_snapshot(self.db)
+        mock_queue.assert_called_once()
+
+
+class RecentUsersTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        patcher = patch('api.views.authenticate', return_value={"_id": str(ObjectId()), "roles": ["admin"]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_filters_are_translated_to_the_query(self):
+        """Test that role, blocked and source filters become MongoDB conditions."""
+        query = recent_users_query({"role": "editor", "blocked": "false", "source": "manual"})
+
+        self.assertEqual(query["roles"], {"$eq": "editor", "$ne": "admin"})
+        self.assertEqual(query["isBlocked"], {"$ne": True})
+        self.assertEqual(query["source"], {"$ne": "inaturalist"})
+        with self.assertRaises(ValueError):
+            recent_users_query({"source": "elsewhere"})
+
+    @patch('api.views.db')
+    def test_listing_returns_one_page_and_a_cursor(self, mock_db):
+        """Test that only limit + 1 users are fetched and display fields are derived for the page."""
+        users = [
+            {"_id": ObjectId(), "username": f"user{i}", "roles": ["user", "admin"],
+             "created_at": datetime.datetime(2025, 1, 3 - i), "profile_picture": "profile_pictures/a.png"}
+            for i in range(3)
+        ]
+        find = mock_db.__getitem__.return_value.find
+        find.return_value.sort.return_value.limit.return_value = users
+
+        request = self.factory.get('/api/admin/recent-users/', {"limit": "2", "source": "inaturalist"})
+        response = recent_users(request)
+        data = json.loads(response.content)
+
+        self.assertEqual(find.call_args.args[0], {"source": "inaturalist"})
+        find.return_value.sort.return_value.limit.assert_called_once_with(3)
+        self.assertEqual(len(data["users"]), 2)
+        self.assertEqual(data["users"][0]["role"], "admin")
+        self.assertTrue(data["users"][0]["profile_picture"].startswith("http://testserver/media/"))
+        self.assertIsNotNone(data["next_cursor"])
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test that a malformed cursor returns 400."""
+        response = recent_users(self.factory.get('/api/admin/recent-users/', {"cursor": "not-a-cursor"}))
+        self.assertEqual(response.status_code, 400)
+
+
+class ModerationTests(TestCase):
+    def setUp(self):
+        self.db = MagicMock()
+        self.observations = MagicMock()
+        self.db.__getitem__.side_effect = lambda name: self.observations if name == "observations" else MagicMock()
+        self.species_id = ObjectId()
+        self.docs = [
+            {"_id": ObjectId(), "status": "pending", "species_id": self.species_id},
+            {"_id": ObjectId(), "status": "pending", "species_id": self.species_id},
+            {"_id": ObjectId(), "status": "verified", "species_id": self.species_id},
+        ]
+
+    @patch('api.moderation.ObservationCounters')
+    def test_bulk_moderation_writes_once_and_counts_changes(self, mock_counters):
+        """Test that many observations are moderated in one bulk_write with one counter apply."""
+        self.observations.find.return_value = self.docs
+        self.observations.bulk_write.return_value.modified_count = 2
+        missing = ObjectId()
+
+        result = moderate_observations(self.db, [doc["_id"] for doc in self.docs] + [missing], "verified")
+
+        self.observations.bulk_write.assert_called_once()
+        operations = self.observations.bulk_write.call_args.args[0]
+        self.assertEqual(len(operations), 2)
+        self.assertEqual(operations[0]._filter["status"], "pending")
+        self.assertEqual(mock_counters.return_value.add.call_count, 2)
+        mock_counters.return_value.apply.assert_called_once_with(self.db)
+        self.assertEqual(result["updated"], [str(self.docs[0]["_id"]), str(self.docs[1]["_id"])])
+        self.assertEqual(result["unchanged"], [str(self.docs[2]["_id"])])
+        self.assertEqual(result["not_found"], [str(missing)])
+
+    @patch('api.moderation.ObservationCounters')
+    def test_concurrently_moderated_observations_are_not_counted(self, mock_counters):
+        """Test that counters only include the updates this write applied."""
+        self.observations.find.return_value = self.docs[:2]
+        self.observations.bulk_write.return_value.modified_count = 1
+        self.observations.distinct.return_value = [self.docs[1]["_id"]]
+
+        result = moderate_observations(self.db, [doc["_id"] for doc in self.docs[:2]], "rejected")
+
+        batch = self.observations.bulk_write.call_args.args[0][0]._doc["$set"]["moderation_batch"]
+        self.assertIsInstance(batch, ObjectId)
+        self.assertEqual(self.observations.distinct.call_args.args[1]["moderation_batch"], batch)
+        self.assertEqual(mock_counters.return_value.add.call_count, 1)
+        self.assertEqual(result["updated"], [str(self.docs[1]["_id"])])
+        self.assertEqual(result["unchanged"], [str(self.docs[0]["_id"])])
+
+    def test_observation_ids_are_validated(self):
+        """Test that bulk requests need a bounded list of valid ids."""
+        for bad in ([], "abc", ["not-an-id"], [str(ObjectId())] * 501):
+            with self.assertRaises(ValueError):
+                parse_observation_ids(bad)
+
+    def test_queue_page_is_limited_before_the_joins(self):
+        """Test that the moderation queue limits to the page before running lookups."""
+        pipeline = pending_content_pipeline(None, 20)
+        stages = [next(iter(stage)) for stage in pipeline]
+
+        self.assertEqual(stages[:3], ["$match", "$sort", "$limit"])
+        self.assertEqual(pipeline[2]["$limit"], 21)
+        self.assertEqual(stages.count("$lookup"), 3)
+
+    @patch('api.views.db')
+    @patch('api.views.authenticate')
+    def test_queue_tolerates_unconverted_timestamps(self, mock_authenticate, mock_db):
+        """Test that timestamps the migration left as strings are shown rather than raising."""
+        mock_authenticate.return_value = {"_id": str(ObjectId()), "roles": ["admin"]}
+        mock_db.__getitem__.return_value.aggregate.return_value = [
+            {"_id": ObjectId(), "created_at": datetime.datetime(2025, 5, 2), "timestamp": datetime.datetime(2025, 5, 1)},
+            {"_id": ObjectId(), "created_at": datetime.datetime(2025, 5, 1), "timestamp": "sometime in May"},
+            {"_id": ObjectId(), "created_at": datetime.datetime(2025, 4, 30)},
+        ]
+
+        response = pending_content(RequestFactory().get('/api/admin/pending-content/'))
+        dates = [item["date"] for item in json.loads(response.content)["content"]]
+
+        self.assertEqual(dates, ["May 01, 2025", "sometime in May", "Unknown"])
+
+
+class UserProfileTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user_id = ObjectId()
+        patcher = patch('api.views.authenticate', return_value={"_id": self.user_id, "roles": ["user"]})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('api.views.db')
+    def test_header_comes_from_one_aggregation(self, mock_db):
+        """Test that stats and latest activity are read from the single header aggregation."""
+        mock_db.observations.aggregate.return_value = iter([{
+            "by_status": [{"_id": "verified", "count": 4}, {"_id": "pending", "count": 2}],
+            "latest_observation": [{"_id": ObjectId(), "source_id": 7, "species": "Apis mellifera"}],
+            "user": [{"_id": self.user_id, "username": "bee", "profile_picture": "profile_pictures/b.png"}],
+            "comments": [{
+                "count": [{"total": 3}],
+                "latest": [{"timestamp": datetime.datetime(2025, 3, 1), "species": {"species": "Apis mellifera", "common_name": "Honey bee"}}]
+            }]
+        }])
+
+        response = user_profile(self.factory.get('/api/profile/'))
+        data = json.loads(response.content)
+
+        mock_db.observations.aggregate.assert_called_once()
+        mock_db.observations.count_documents.assert_not_called()
+        self.assertEqual(data["stats"], {"total_observations": 6, "verified_entries": 4, "comments_count": 3})
+        self.assertEqual(data["recent_activity"]["text"], "Commented on Honey bee observation")
+        self.assertEqual(data["latest_observation"]["source_id"], 7)
+        self.assertTrue(data["user"]["is_current_user"])
+
+    @patch('api.views.db')
+    def test_missing_user_returns_404(self, mock_db):
+        """Test that a header without a user document is a 404."""
+        mock_db.observations.aggregate.return_value = iter([
+            {"by_status": [], "latest_observation": [], "user": [], "comments": []}
+        ])
+
+        response = user_profile(self.factory.get('/api/profile/'), str(ObjectId()))
+        self.assertEqual(response.status_code, 404)
+
+    @patch('api.views.db')
+    def test_observation_feed_is_paginated(self, mock_db):
+        """Test that the feed limits before the joins and returns a cursor."""
+        observations = [
+            {"_id": ObjectId(), "source_id": i, "timestamp": datetime.datetime(2025, 1, 10 - i), "photo": []}
+            for i in range(3)
+        ]
+        mock_db.observations.aggregate.return_value = iter(observations)
+
+        response = user_profile_observations(self.factory.get('/api/profile/observations/', {"limit": "2"}))
+        data = json.loads(response.content)
+
+        pipeline = mock_db.observations.aggregate.call_args.args[0]
+        self.assertEqual(pipeline[0]["$match"], {"user_id": self.user_id})
+        self.assertEqual(pipeline[2], {"$limit": 3})
+        self.assertEqual([obs["source_id"] for obs in data["observations"]], [0, 1])
+        self.assertIsNotNone(data["next_cursor"])
@@ -0,0 +1,39 @@
+"""
+Observation timestamps are stored as BSON dates (naive UTC datetimes).
+
+Every writer goes through to_utc_datetime so that range queries and sorts on
+`timestamp` never see a mix of strings and dates.
+"""
+from datetime import datetime, timezone
+
+# Formats accepted in addition to ISO 8601 (iNaturalist's observed_on_string)
+EXTRA_FORMATS = ("%Y/%m/%d %I:%M %p", "%Y/%m/%d")
+
+
+def to_utc_datetime(value):
+    """
+    Converts an ISO string or datetime into a naive UTC datetime.
+    Returns None when the value cannot be parsed.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        text = value.strip()
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            parsed = None
+            for fmt in EXTRA_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+            if parsed is None:
+                return None
+    else:
+        return None
+
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
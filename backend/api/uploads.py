@@ -0,0 +1,109 @@
+"""
+Streaming upload handling for observation media and profile pictures.
+
+StreamingMediaUploadHandler writes every uploaded file to a temporary file
+chunk by chunk, so a request holds at most one chunk of each file in
+memory. While streaming it identifies the real media type from the file's
+magic bytes (the client's Content-Type is ignored) and enforces per-type
+size limits. Rejected files are skipped and their errors are listed in
+request.upload_errors.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+
+# Bytes needed from the start of a file to recognise every signature below
+SNIFF_BYTES = 16
+
+
+def sniff_media_type(head):
+    """Returns the MIME type for a file's leading bytes, or None if unsupported."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "image/heic"
+        if brand in (b"M4A ", b"M4B "):
+            return "audio/mp4"
+        return None
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "audio/webm"
+    return None
+
+
+def max_size_for(media_type):
+    if media_type.startswith("image/"):
+        return settings.MEDIA_MAX_IMAGE_BYTES
+    return settings.MEDIA_MAX_AUDIO_BYTES
+
+
+def upload_errors(request):
+    """Returns the list of files rejected while streaming this request."""
+    return getattr(request, "upload_errors", [])
+
+
+class StreamingMediaUploadHandler(TemporaryFileUploadHandler):
+    """Streams uploads to disk while sniffing their type and enforcing size limits."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        if request is not None and not hasattr(request, "upload_errors"):
+            request.upload_errors = []
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.head = b""
+        self.media_type = None
+        self.received = 0
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+
+    def record_error(self, message):
+        if self.request is not None:
+            self.request.upload_errors.append({"file": self.file_name, "error": message})
+        self.file.close()
+
+    def reject(self, message):
+        self.record_error(message)
+        raise SkipFile(message)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+
+        if self.media_type is None:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) < SNIFF_BYTES and len(raw_data) > 0:
+                # Tiny first chunk: wait for more before deciding
+                return super().receive_data_chunk(raw_data, start)
+            self.media_type = sniff_media_type(self.head)
+            if self.media_type is None:
+                self.reject("Unsupported file type")
+
+        if self.received > max_size_for(self.media_type):
+            self.reject(f"File exceeds the {max_size_for(self.media_type) // (1024 * 1024)} MB limit")
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if self.media_type is None:
+            # Files shorter than SNIFF_BYTES never filled the buffer
+            self.media_type = sniff_media_type(self.head)
+            if self.media_type is None:
+                # SkipFile is not handled here; returning None drops the file
+                self.record_error("Unsupported file type")
+                return None
+        uploaded = super().file_complete(file_size)
+        uploaded.content_type = self.media_type
+        return uploaded
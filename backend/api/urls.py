@@ -3,6 +3,8 @@ from django.urls import path
 from .views import (
     get_species_detail, 
     observation_detail, 
+    observation_comments,
+    observation_enrichment,
     fetch_and_store_all, 
     homepage_stats, 
     recent_uploads, 
@@ -17,6 +19,7 @@ from .views import (
     filter_observations,
     get_continent,
     search_species_by_name,
+    suggest_species,
     get_continent_options,
     get_species_observations,
     register,
@@ -26,11 +29,17 @@ from .views import (
     reset_password,
     upload_observation,
     user_profile,
+    user_profile_observations,
     edit_profile,
     dashboard_stats,
     recent_users,
     pending_content,
+    pending_content_bulk,
     export_data,
+    export_dwca,
+    create_export_job,
+    export_job_detail,
+    download_export_job,
     search_species_and_users
 )
 
@@ -40,6 +49,12 @@ urlpatterns = [
     path('admin/stats/', dashboard_stats, name='dashboard_stats'),
     path('admin/recent-users/', recent_users, name='recent_users'),
     path('admin/pending-content/', pending_content, name='pending_content'),
+    path('admin/pending-content/bulk/', pending_content_bulk, name='pending_content_bulk'),
+    # exact export routes come before the format catch-all
+    path('export/dwca/', export_dwca, name='export_dwca'),
+    path('export/jobs/', create_export_job, name='create_export_job'),
+    path('export/jobs/<str:job_id>/', export_job_detail, name='export_job_detail'),
+    path('export/jobs/<str:job_id>/download/', download_export_job, name='download_export_job'),
     path('export/<str:format_type>/', export_data, name='export_data'),
     
     path("auth/register/", register, name='register'),
@@ -52,8 +67,13 @@ urlpatterns = [
     path('species/<str:species_name>/', get_species_detail, name='get_species_detail'),
     path('species/<str:species_name>/observations/',get_species_observations, name='species_observations'),
     path('observations/<int:source_id>/', observation_detail, name='observation_detail'),
+    path('observations/<int:source_id>/comments/', observation_comments, name='observation_comments'),
+    path('observations/<int:source_id>/enrichment/', observation_enrichment, name='observation_enrichment'),
     path('profile/', user_profile, name='user_profile'),
+    # exact route comes before the user id catch-all
+    path('profile/observations/', user_profile_observations, name='user_profile_observations'),
     path('profile/<str:user_id>/', user_profile),
+    path('profile/<str:user_id>/observations/', user_profile_observations),
     # exact match comes before dynamic
     path('editprofile/', edit_profile, name='edit_own_profile'),
     path('editprofile/<str:user_id>/', edit_profile, name='edit_profile_by_id'),
@@ -75,6 +95,7 @@ urlpatterns = [
     path('get_all_taxa/', get_all_taxa, name='get_all_taxa'),
     path('filter-options/', filter_taxa_options, name='filter_taxa_options'),
     path('search_species_by_name/', search_species_by_name, name='search_species_by_name'),
+    path('suggest_species/', suggest_species, name='suggest_species'),
     path('search_species_and_users/', search_species_and_users, name='search_species_and_users'),
 
     # Map + Filters
@@ -1,26 +1,19 @@
+import asyncio
 import json
 import jwt
 import smtplib
 import os
-import zipfile
-import io
-import uuid
-from bson.json_util import dumps
 from django.http.multipartparser import MultiPartParser
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from urllib.parse import urljoin
-from mimetypes import guess_extension
 from bcrypt import hashpw, gensalt, checkpw
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from django.views.decorators.http import require_GET, require_POST, require_http_methods
-from django.http import HttpResponse, JsonResponse, HttpResponseServerError
-from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
+from django.http import FileResponse, HttpResponseServerError, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from pymongo import MongoClient, errors
-from pyinaturalist import get_observations, get_taxa
+from asgiref.sync import sync_to_async
+from pymongo import errors
 from bson import ObjectId
 import datetime as dt
 from bson.errors import InvalidId
@@ -32,26 +25,45 @@ import time
 import logging
 import traceback
 from shapely.geometry import Point, Polygon
+from .auth import AuthenticationError, authenticate, invalidate_principal, optional_principal
+from .fuzzy import SpeciesIndexProvider, normalize_name
+from .counters import COUNTER_FIELDS, ObservationCounters, aread_stats, increment_stats, record_observation_change
+from .responses import MongoJsonResponse
+from .timestamps import to_utc_datetime
+from .uploads import upload_errors
+from .derivatives import variant_url
+from . import media_store
+from .sequences import allocate_source_id
+from .exports import EXPORT_FORMATS, aiterate, plan_export, stream_export
+from . import export_jobs
+from . import dwca
+from .dashboard import read_snapshot
+from .moderation import MODERATION_STATUSES, moderate_observations, parse_observation_ids
+from .pagination import InvalidCursor, decode_cursor, keyset_filter, paginate, parse_limit
 
 # Sets up logging for error tracking
 logger = logging.getLogger(__name__)
 SECRET = settings.SECRET_KEY
 
-# MongoDB connection
-try:
-    client = MongoClient(settings.MONGO_DB_URI, serverSelectionTimeoutMS=5000)
-    client.server_info()  
-    db = client.get_database()
-except Exception as e:
-    logger.error(f"[MongoDB] Connection failed: {e}")
-    db = None
-
-# Define collections we'll be working with
-species_collection = db["species"]
-locations_collection = db["locations"]
-observations_collection = db["observations"]
-users_collection = db["users"]
-comments_collection = db["comments"]
+# MongoDB database and collections, connected lazily on first use per process
+from .mongo import (
+    db,
+    species_collection,
+    locations_collection,
+    observations_collection,
+    users_collection,
+    comments_collection,
+    meta_collection,
+    export_jobs_collection,
+    get_async_db
+)
+
+# Per-process fuzzy index over species names, built on first use
+species_name_index = SpeciesIndexProvider(
+    species_collection,
+    meta_collection,
+    refresh_seconds=settings.SPECIES_INDEX_REFRESH_SECONDS
+)
 
 def admin_required(view_func):
     """
@@ -60,40 +72,23 @@ def admin_required(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        # Gets authorization header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return JsonResponse({"error": "Authorization header missing or invalid"}, status=401)
-        
-        # Extracts and verifies JWT token
-        token = auth_header.split(' ')[1]
         try:
-            payload = jwt.decode(token, SECRET, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            if not user_id:
-                return JsonResponse({"error": "Invalid token payload"}, status=401)
+            # Resolves the token to a cached principal (id, roles, blocked flag)
+            user = authenticate(request)
 
-            # Checks if user exists
-            user = users_collection.find_one({"_id": ObjectId(user_id)})
-            if not user:
-                return JsonResponse({"error": "User not found"}, status=404)
-            
-            if user.get("isBlocked", False):
-                return JsonResponse({"error": "User account is blocked"}, status=403)
-            
             # Verifies admin role
-            if "admin" not in user.get("roles", []):
-                return JsonResponse({"error": "Admin access required"}, status=403)
-            
+            if "admin" not in user["roles"]:
+                return MongoJsonResponse({"error": "Admin access required"}, status=403)
+
             # Attaches user info to request for use in view
             request.user_info = user
             return view_func(request, *args, **kwargs)
 
-        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, InvalidId):
-            return JsonResponse({"error": "Invalid or expired token"}, status=401)
+        except AuthenticationError as e:
+            return MongoJsonResponse({"error": e.message}, status=e.status)
         except Exception as e:
             logger.error(f"Error in admin_required decorator: {e}")
-            return JsonResponse({"error": "An internal server error occurred"}, status=500)
+            return MongoJsonResponse({"error": "An internal server error occurred"}, status=500)
     return _wrapped_view
 
 def user_required(view_func):
@@ -103,37 +98,39 @@ def user_required(view_func):
     """
     @wraps(view_func)
     def _wrapped_view(request, *args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return JsonResponse({"error": "Authorization header missing or invalid"}, status=401)
-
-        # Extracts and verifies token
-        token = auth_header.split(' ')[1]
         try:
-            payload = jwt.decode(token, SECRET, algorithms=["HS256"])
-            user_id = payload.get("user_id")
-            if not user_id:
-                return JsonResponse({"error": "Invalid token payload"}, status=401)
-
-            # Verifies user exists
-            user = users_collection.find_one({"_id": ObjectId(user_id)})
-            if not user:
-                return JsonResponse({"error": "User not found"}, status=404)
-            
-            if user.get("isBlocked", False):
-                return JsonResponse({"error": "User account is blocked"}, status=403)
-
-            # Attaches user to request
-            request.user_info = user
+            # Attaches the cached principal to request
+            request.user_info = authenticate(request)
             return view_func(request, *args, **kwargs)
 
-        except (ExpiredSignatureError, InvalidTokenError):
-            return JsonResponse({"error": "Invalid or expired token"}, status=401)
+        except AuthenticationError as e:
+            return MongoJsonResponse({"error": e.message}, status=e.status)
         except Exception as e:
             logger.error(f"Error in user_required decorator: {e}")
-            return JsonResponse({"error": "An internal server error occurred"}, status=500)
+            return MongoJsonResponse({"error": "An internal server error occurred"}, status=500)
     return _wrapped_view
 
+def species_key(name):
+    """
+    Normalised lookup key for a species name (lowercased, whitespace collapsed).
+    Backed by a unique index so case-insensitive lookups stay indexed.
+    """
+    return normalize_name(name)
+
+def find_species_by_name(name, projection=None):
+    """Finds a species document by name, ignoring case and extra whitespace."""
+    key = species_key(name)
+    if not key:
+        return None
+    return species_collection.find_one({"species_key": key}, projection)
+
+async def afind_species_by_name(adb, name, projection=None):
+    """Async find_species_by_name for the ASGI read views."""
+    key = species_key(name)
+    if not key:
+        return None
+    return await adb["species"].find_one({"species_key": key}, projection)
+
 # Defines polygon boundaries for each continent for geospatial queries
 CONTINENT_POLYGONS = {
     "North America": Polygon([(-170, 5), (-170, 85), (-50, 85), (-50, 5)]),
@@ -149,7 +146,7 @@ CONTINENT_POLYGONS = {
 def register(request):
     """Handles new user registration with email verification."""
     if request.method != "POST":
-        return JsonResponse({"error": "POST only"}, status=405)
+        return MongoJsonResponse({"error": "POST only"}, status=405)
 
     # Parses registration data
     data = json.loads(request.body)
@@ -160,7 +157,7 @@ def register(request):
 
     # Checks for existing email
     if users_collection.find_one({"email": email}):
-        return JsonResponse({"error": "Email already in use"}, status=409)
+        return MongoJsonResponse({"error": "Email already in use"}, status=409)
 
     # Hashes password securely
     hashed_pw = hashpw(password.encode('utf-8'), gensalt())
@@ -173,11 +170,13 @@ def register(request):
         "is_verified": False,
         "name": name,
         "roles": ["user"],
+        "source": "manual",
         "created_at": datetime.utcnow()
     }
 
     # Inserts user and generates verification token
     inserted = users_collection.insert_one(user)
+    increment_stats(db, users=1)
     user_id = str(inserted.inserted_id)
 
     # Creates verification link with 1-hour expiry
@@ -187,9 +186,9 @@ def register(request):
     try:
         # Sends verification email
         send_email(email, verify_link)
-        return JsonResponse({"message": "User registered. Check your email to verify."}, status=201)
+        return MongoJsonResponse({"message": "User registered. Check your email to verify."}, status=201)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return MongoJsonResponse({"error": str(e)}, status=500)
 
 def send_email(to_email, link, purpose="verify"):
     """
@@ -244,15 +243,15 @@ def verify_email(request):
         # Redirects to frontend after successful verification
         return redirect("http://localhost:5173/")
     except jwt.ExpiredSignatureError:
-        return JsonResponse({"error": "Token expired"}, status=400)
+        return MongoJsonResponse({"error": "Token expired"}, status=400)
     except Exception:
-        return JsonResponse({"error": "Invalid token"}, status=400)
+        return MongoJsonResponse({"error": "Invalid token"}, status=400)
 
 @csrf_exempt
 def login(request):
     """Handles user login and returns JWT token."""
     if request.method != "POST":
-        return JsonResponse({"error": "POST only"}, status=405)
+        return MongoJsonResponse({"error": "POST only"}, status=405)
 
     # Parses login credentials
     data = json.loads(request.body)
@@ -264,15 +263,15 @@ def login(request):
 
     # Verifies credentials
     if not user or not checkpw(password.encode('utf-8'), user["password"]):
-        return JsonResponse({"error": "Invalid credentials"}, status=401)
+        return MongoJsonResponse({"error": "Invalid credentials"}, status=401)
 
     # Checks email verification status
     if not user.get("is_verified", False):
-        return JsonResponse({"error": "Email not verified"}, status=403)
+        return MongoJsonResponse({"error": "Email not verified"}, status=403)
     
     # Blocks login if user is blocked
     if user.get("isBlocked", False):
-        return JsonResponse({"error": "Account blocked. Contact support for assistance."}, status=403)
+        return MongoJsonResponse({"error": "Account blocked. Contact support for assistance."}, status=403)
 
     # Generates JWT token
     token = jwt.encode({"user_id": str(user["_id"])}, SECRET, algorithm="HS256")
@@ -281,7 +280,7 @@ def login(request):
     user_roles = user.get("roles", ["user"])
     is_admin = "admin" in user_roles
     
-    return JsonResponse({
+    return MongoJsonResponse({
         "token": token,
         "username": user["username"],
         "roles": user_roles,
@@ -295,7 +294,7 @@ def forgot_password(request):
     Generates reset token and sends email if user exists.
     """
     if request.method != "POST":
-        return JsonResponse({"error": "POST only"}, status=405)
+        return MongoJsonResponse({"error": "POST only"}, status=405)
 
     # Parses email from request
     data = json.loads(request.body)
@@ -305,7 +304,7 @@ def forgot_password(request):
     user = users_collection.find_one({"email": email})
     if not user:
         # Returns generic response to prevent email enumeration
-        return JsonResponse({"message": "If the email exists, a reset link has been sent."}, status=200) 
+        return MongoJsonResponse({"message": "If the email exists, a reset link has been sent."}, status=200) 
 
     # Generates reset token with 15 minute expiry
     token = jwt.encode({"user_id": str(user["_id"]), "exp": datetime.utcnow() + timedelta(minutes=15)}, SECRET, algorithm="HS256")
@@ -314,9 +313,9 @@ def forgot_password(request):
     try:
         # Sends password reset email
         send_email(email, reset_link, purpose="reset")
-        return JsonResponse({"message": "Check your email for the reset link."})
+        return MongoJsonResponse({"message": "Check your email for the reset link."})
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return MongoJsonResponse({"error": str(e)}, status=500)
 
 @csrf_exempt
 def reset_password(request):
@@ -325,7 +324,7 @@ def reset_password(request):
     Validates token and updates password in database.
     """
     if request.method != "POST":
-        return JsonResponse({"error": "POST only"}, status=405)
+        return MongoJsonResponse({"error": "POST only"}, status=405)
 
     # Parses token and new password from request
     data = json.loads(request.body)
@@ -337,27 +336,39 @@ def reset_password(request):
         payload = jwt.decode(token, SECRET, algorithms=["HS256"])
         user_id = payload["user_id"]
     except jwt.ExpiredSignatureError:
-        return JsonResponse({"error": "Reset link expired"}, status=400)
+        return MongoJsonResponse({"error": "Reset link expired"}, status=400)
     except Exception:
-        return JsonResponse({"error": "Invalid token"}, status=400)
+        return MongoJsonResponse({"error": "Invalid token"}, status=400)
 
     # Hashes new password before storage
     hashed_pw = hashpw(new_password.encode('utf-8'), gensalt())
     # Updates user password in database
     users_collection.update_one({"_id": ObjectId(user_id)}, {"$set": {"password": hashed_pw}})
-    return JsonResponse({"message": "Password updated successfully"})
+    return MongoJsonResponse({"message": "Password updated successfully"})
+
+# Formats an observation timestamp in a $project. Timestamps the migration
+# could not parse are still strings and pass through; $dateToString would fail on them
+TIMESTAMP_ISO_STRING = {
+    "$cond": {
+        "if": {"$eq": [{"$type": "$timestamp"}, "date"]},
+        "then": {"$dateToString": {"format": "%Y-%m-%dT%H:%M:%S.%LZ", "date": "$timestamp"}},
+        "else": {"$ifNull": ["$timestamp", None]}
+    }
+}
 
 @require_GET
-def get_species_detail(request, species_name):
+async def get_species_detail(request, species_name):
     """
     Retrieves detailed information about a species including recent observations.
     Returns taxonomy data and geospatial observation information.
     """
     try:
+        adb = get_async_db()
+
         # Gets species details from database (case-insensitive)
-        species = db["species"].find_one({"species": {"$regex": f"^{species_name}$", "$options": "i"}})
+        species = await afind_species_by_name(adb, species_name)
         if not species:
-            return JsonResponse({"error": "Species not found"}, status=404)
+            return MongoJsonResponse({"error": "Species not found"}, status=404)
         
         # Build aggregation pipeline for recent observations
         pipeline = [
@@ -392,14 +403,10 @@ def get_species_detail(request, species_name):
                 "$project": {
                     "_id": 1,
                     "source_id": 1,
-                    "timestamp": {
-                        "$dateToString": {
-                            "format": "%Y-%m-%dT%H:%M:%S.%LZ",
-                            "date": "$timestamp"
-                        }
-                    },
+                    "timestamp": TIMESTAMP_ISO_STRING,
                     "status": 1,
                     "photo": 1,
+                    "photo_variants": 1,
                     "external_link": 1,
                     "location": {
                         "type": "Point",
@@ -433,148 +440,173 @@ def get_species_detail(request, species_name):
         ]
 
         # Executes aggregation pipeline
-        observations = list(db["observations"].aggregate(pipeline))
-
-        # Converts BSON to JSON for response
-        species_data = convert_bson(species)
-        observations_data = convert_bson(observations)
+        cursor = await adb["observations"].aggregate(pipeline)
+        observations = await cursor.to_list()
 
         # Builds absolute URLs for media files
         media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
 
-        # Processes profile picture URLs to ensure absolute paths
-        for obs in observations_data:
-            pic = obs.get("properties", {}).get("user_profile_picture", "")
-            if pic:
-                if pic.startswith("http://") or pic.startswith("https://"):
-                    profile_picture_url = pic
-                elif pic.startswith("/media/"):
-                    profile_picture_url = request.build_absolute_uri(pic)
-                else:
-                    profile_picture_url = urljoin(media_root_url, pic.lstrip("/"))
-                obs["properties"]["user_profile_picture"] = profile_picture_url
-            else:
-                obs["properties"]["user_profile_picture"] = None
+        # Processes profile picture URLs and serves medium photo variants
+        for obs in observations:
+            obs["photo"] = build_photo_urls(obs, "medium", request, media_root_url)
+            obs.pop("photo_variants", None)
+            properties = obs.get("properties", {})
+            properties["photo"] = obs["photo"]
+            properties["user_profile_picture"] = build_media_url(
+                properties.get("user_profile_picture"), request, media_root_url
+            )
 
-        return JsonResponse({
-            "species": species_data,
-            "recent_observations": observations_data
+        return MongoJsonResponse({
+            "species": species,
+            "recent_observations": observations
         })
 
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return MongoJsonResponse({"error": str(e)}, status=500)
+
+def build_media_url(value, request, media_root_url):
+    """Resolves a stored media path or URL to an absolute URL."""
+    if not value:
+        return None
+    value = str(value)
+    if value.startswith("http://") or value.startswith("https://"):
+        return value
+    if value.startswith("/media/"):
+        return request.build_absolute_uri(value)
+    return urljoin(media_root_url, value.lstrip("/"))
+
+def build_photo_urls(observation, variant, request, media_root_url):
+    """Resolves an observation's photos to absolute URLs of the given size variant."""
+    photos = observation.get("photo")
+    if not isinstance(photos, list):
+        return []
+    variants = observation.get("photo_variants")
+    return [build_media_url(variant_url(p, variants, variant), request, media_root_url) or "" for p in photos]
+
+# Sort key for paginated observation listings (newest first)
+OBSERVATION_PAGE_FIELDS = ["timestamp", "_id"]
+
+def species_observations_pipeline(species, after=None, limit=100):
+    """
+    Builds the paginated observation pipeline for a species.
+    Sorts and limits on the (species_id, timestamp, _id) index before joining
+    locations and users, so joins only run for the returned page.
+    """
+    match = {"species_id": species["_id"]}
+    if after:
+        match.update(keyset_filter(OBSERVATION_PAGE_FIELDS, after))
+
+    return [
+        {"$match": match},
+        {"$sort": {"timestamp": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {
+            "$lookup": {
+                "from": "locations",
+                "localField": "location_id",
+                "foreignField": "_id",
+                "as": "location"
+            }
+        },
+        {"$unwind": {"path": "$location", "preserveNullAndEmptyArrays": True}},
+        {
+            "$lookup": {
+                "from": "users",
+                "localField": "user_id",
+                "foreignField": "_id",
+                "as": "user"
+            }
+        },
+        {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
+        {
+            "$project": {
+                "_id": 1,
+                "timestamp": 1,
+                "source_id": 1,
+                "photo_variants": 1,
+                "type": "Feature",
+                "location": {
+                    "type": "Point",
+                    "coordinates": "$location.geojson.coordinates",
+                    "latitude": "$location.latitude",
+                    "longitude": "$location.longitude"
+                },
+                "properties": {
+                    "species": species["species"],
+                    "genus": species.get("genus", ""),
+                    "family": species.get("family", ""),
+                    "timestamp": TIMESTAMP_ISO_STRING,
+                    "location_name": "$location.name",
+                    "region": "$location.region",
+                    "country": "$location.country",
+                    "status": "$status",
+                    "photo": "$photo",
+                    "external_link": "$external_link",
+                    "user_name": {
+                        "$cond": [
+                            {"$or": [
+                                {"$eq": ["$user.name", ""]},
+                                {"$eq": ["$user.name", None]}
+                            ]},
+                            "$user.username",
+                            "$user.name"
+                        ]
+                    },
+                    "user_profile_picture": "$user.profile_picture"
+                }
+            }
+        }
+    ]
 
 @require_GET
-def get_species_observations(request, species_name):
+async def get_species_observations(request, species_name):
     """
-    Retrieves all observations for a specific species.
-    Returns GeoJSON FeatureCollection of observation locations.
+    Retrieves one page of observations for a specific species.
+    Returns a GeoJSON FeatureCollection plus a cursor for the next page.
     """
     try:
-        # Finds species by exact name match
-        species = db["species"].find_one({"species": species_name})
+        adb = get_async_db()
+
+        # Finds species by normalised name
+        species = await afind_species_by_name(adb, species_name)
         if not species:
-            return JsonResponse({"error": "Species not found"}, status=404)
-        
-        # Builds aggregation pipeline for species observations
-        pipeline = [
-            {
-                "$match": {"species_id": species["_id"]}
-            },
-            {
-                "$lookup": {
-                    "from": "locations",
-                    "localField": "location_id",
-                    "foreignField": "_id",
-                    "as": "location"
-                }
-            },
-            {"$unwind": {"path": "$location", "preserveNullAndEmptyArrays": True}},
-            {
-                "$lookup": {
-                    "from": "users",
-                    "localField": "user_id",
-                    "foreignField": "_id",
-                    "as": "user"
-                }
-            },
-            {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
-            {
-                "$project": {
-                    "_id": 0,
-                    "source_id": 1,
-                    "type": "Feature",
-                    "location": {
-                        "type": "Point",
-                        "coordinates": "$location.geojson.coordinates",
-                        "latitude": "$location.latitude",
-                        "longitude": "$location.longitude"
-                    },
-                    "properties": {
-                        "species": species["species"],
-                        "genus": species.get("genus", ""),
-                        "family": species.get("family", ""),
-                        "timestamp": {
-                            "$cond": {
-                                "if": { "$eq": [{ "$type": "$timestamp" }, "date"] },
-                                "then": {
-                                    "$dateToString": {
-                                        "format": "%Y-%m-%dT%H:%M:%S.%LZ",
-                                        "date": "$timestamp"
-                                    }
-                                },
-                                "else": "$timestamp"
-                            }
-                        },
-                        "location_name": "$location.name",
-                        "region": "$location.region",
-                        "country": "$location.country",
-                        "status": "$status",
-                        "photo": "$photo",
-                        "external_link": "$external_link",
-                        "user_name": {
-                            "$cond": [
-                                {"$or": [
-                                    {"$eq": ["$user.name", ""]},
-                                    {"$eq": ["$user.name", None]}
-                                ]},
-                                "$user.username",
-                                "$user.name"
-                            ]
-                        },
-                        "user_profile_picture": "$user.profile_picture"
-                    }
-                }
-            }
-        ]
+            return MongoJsonResponse({"error": "Species not found"}, status=404)
+
+        try:
+            limit = parse_limit(request.GET.get("limit"), default=100, maximum=500)
+            after = decode_cursor(request.GET.get("cursor"))
+            pipeline = species_observations_pipeline(species, after, limit)
+        except (ValueError, InvalidCursor) as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
 
-        # Executes pipeline and process results
-        observations = list(db["observations"].aggregate(pipeline))
-        observations_data = convert_bson(observations)
+        # Executes pipeline and splits off the look-ahead document
+        cursor = await adb["observations"].aggregate(pipeline)
+        observations = await cursor.to_list()
+        observations, next_cursor = paginate(observations, limit, OBSERVATION_PAGE_FIELDS)
 
         # Builds absolute media URLs
         media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
 
-        # Processes profile picture URLs
-        for obs in observations_data:
-            pic = obs.get("properties", {}).get("user_profile_picture", "")
-            if pic:
-                if pic.startswith("http://") or pic.startswith("https://"):
-                    profile_picture_url = pic
-                elif pic.startswith("/media/"):
-                    profile_picture_url = request.build_absolute_uri(pic)
-                else:
-                    profile_picture_url = urljoin(media_root_url, pic.lstrip("/"))
-                obs["properties"]["user_profile_picture"] = profile_picture_url
-            else:
-                obs["properties"]["user_profile_picture"] = None
+        # Processes profile picture URLs, serves medium photo variants and drops the raw sort keys
+        for obs in observations:
+            obs.pop("_id", None)
+            obs.pop("timestamp", None)
+            properties = obs.get("properties", {})
+            properties["photo"] = build_photo_urls(
+                {"photo": properties.get("photo"), "photo_variants": obs.pop("photo_variants", None)},
+                "medium", request, media_root_url
+            )
+            properties["user_profile_picture"] = build_media_url(
+                properties.get("user_profile_picture"), request, media_root_url
+            )
 
-        return JsonResponse({
+        return MongoJsonResponse({
             "type": "FeatureCollection",
-            "features": observations_data
+            "features": observations,
+            "next_cursor": next_cursor
         })
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return MongoJsonResponse({"error": str(e)}, status=500)
     
 def get_continent(lat: float, lon: float) -> str:
     """
@@ -593,91 +625,94 @@ def get_continent(lat: float, lon: float) -> str:
 @require_GET
 def get_continent_options(request):
     """Return list of available continent choices for filtering"""
-    return JsonResponse({
+    return MongoJsonResponse({
         "continents": ["All Continents"] + sorted(CONTINENT_POLYGONS.keys())
     }, safe=False)
 
 @require_GET
-def get_genus_by_family(request):
+async def get_genus_by_family(request):
     """Retrieve all genesus belonging to a specified family"""
     family = request.GET.get("family")
     if not family:
-        return JsonResponse({"error": "Family not provided"}, status=400)
+        return MongoJsonResponse({"error": "Family not provided"}, status=400)
 
-    genus_list = db["species"].distinct("genus", {"family": family})
-    return JsonResponse(genus_list, safe=False)
+    genus_list = await get_async_db()["species"].distinct("genus", {"family": family})
+    return MongoJsonResponse(genus_list, safe=False)
 
 @require_GET
-def get_species_by_genus(request):
+async def get_species_by_genus(request):
     """Retrieves all species belonging to a specified genus"""
     genus = request.GET.get("genus")
     if not genus:
-        return JsonResponse({"error": "Genus not provided"}, status=400)
+        return MongoJsonResponse({"error": "Genus not provided"}, status=400)
 
-    species_list = db["species"].distinct("species", {"genus": genus})
-    return JsonResponse(species_list, safe=False)
+    species_list = await get_async_db()["species"].distinct("species", {"genus": genus})
+    return MongoJsonResponse(species_list, safe=False)
 
 @require_GET
-def get_family_by_genus(request):
+async def get_family_by_genus(request):
     """Retrieves family name for a specified genus"""
     genus = request.GET.get("genus")
     if not genus:
-        return JsonResponse({"error": "Genus not provided"}, status=400)
+        return MongoJsonResponse({"error": "Genus not provided"}, status=400)
 
-    families = db["species"].distinct("family", {"genus": genus})
-    return JsonResponse(families, safe=False)
+    families = await get_async_db()["species"].distinct("family", {"genus": genus})
+    return MongoJsonResponse(families, safe=False)
 
 @require_GET
-def get_family_by_species(request):
+async def get_family_by_species(request):
     """Retrieves family name for a specified species"""
     species = request.GET.get("species")
     if not species:
-        return JsonResponse({"error": "Species not provided"}, status=400)
+        return MongoJsonResponse({"error": "Species not provided"}, status=400)
 
-    families = db["species"].distinct("family", {"species": species})
-    return JsonResponse(families, safe=False)
+    families = await get_async_db()["species"].distinct("family", {"species_key": species_key(species)})
+    return MongoJsonResponse(families, safe=False)
 
 @require_GET
-def get_genus_by_species(request):
+async def get_genus_by_species(request):
     """Retrieves genus name for a specified species"""
     species = request.GET.get("species")
     if not species:
-        return JsonResponse({"error": "Species not provided"}, status=400)
+        return MongoJsonResponse({"error": "Species not provided"}, status=400)
 
-    genera = db["species"].distinct("genus", {"species": species})
-    return JsonResponse(genera, safe=False)
+    genera = await get_async_db()["species"].distinct("genus", {"species_key": species_key(species)})
+    return MongoJsonResponse(genera, safe=False)
 
 @require_GET
-def get_all_taxa(request):
+async def get_all_taxa(request):
     """
     Retrieves complete taxonomy hierarchy.
     Returns distinct families, genera, and species from database.
     """
     try:
-        # Fetches distinct values for each taxonomic level
-        families_raw = db["species"].distinct("family")
-        genera_raw = db["species"].distinct("genus")
-        species_raw = db["species"].distinct("species")
+        # Fetches distinct values for each taxonomic level concurrently
+        species_coll = get_async_db()["species"]
+        families_raw, genera_raw, species_raw = await asyncio.gather(
+            species_coll.distinct("family"),
+            species_coll.distinct("genus"),
+            species_coll.distinct("species")
+        )
 
         # Filters out None values and then sorts alphabetically
         families = sorted([f for f in families_raw if f is not None])
         genera = sorted([g for g in genera_raw if g is not None])
         species_names = sorted([s for s in species_raw if s is not None]) 
 
-        return JsonResponse({
+        return MongoJsonResponse({
             "families": families,
             "genera": genera,
             "species": species_names,
         })
     except Exception as e:
         print(f"Error in get_all_taxa: {e}")
-        return JsonResponse(
+        return MongoJsonResponse(
             {"error": "An internal server error occurred while fetching taxa.", "details": str(e)},
             status=500
         )
 
 @require_GET
-def filter_taxa_options(request):
+async def filter_taxa_options(request):
     """
     Filters taxonomy options based on selected family/genus/species.
     Returns available options at each taxonomic level.
@@ -689,7 +724,7 @@ def filter_taxa_options(request):
     if (genus := request.GET.get("genus")) and genus != "All":
         query["genus"] = genus
     if (species := request.GET.get("species")) and species != "All":
-        query["species"] = species
+        query["species_key"] = species_key(species)
 
     # Aggregation pipeline to get available options
     pipeline = [
@@ -713,8 +748,9 @@ def filter_taxa_options(request):
     ]
 
     # Executes pipeline and return results
-    result = list(db["species"].aggregate(pipeline))
-    return JsonResponse(result[0] if result else {
+    cursor = await get_async_db()["species"].aggregate(pipeline)
+    result = await cursor.to_list()
+    return MongoJsonResponse(result[0] if result else {
         "families": [],
         "genera": [],
         "species": []
@@ -755,28 +791,17 @@ def get_continent_js_function():
     """
 
 @require_GET
-def filter_observations(request):
+async def filter_observations(request):
     """
     Filters observations based on taxonomy, date range, and continent.
     Returns GeoJSON FeatureCollection of matching observations.
     """
 
-    # Validates Authorization header and decode JWT token
-    auth_header = request.headers.get("Authorization", "")
-    if not auth_header.startswith("Bearer "):
-        return JsonResponse({"error": "Authorization token required"}, status=401)
-
-    token = auth_header[len("Bearer "):]
-
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id_from_token = payload.get("user_id")
-        if not user_id_from_token:
-            return JsonResponse({"error": "Invalid token: no user_id"}, status=401)
-    except jwt.ExpiredSignatureError:
-        return JsonResponse({"error": "Token expired"}, status=401)
-    except jwt.InvalidTokenError:
-        return JsonResponse({"error": "Invalid token"}, status=401)
+    # The signed-in user, if any; only needed to show just their own observations
+    current_user = await sync_to_async(optional_principal)(request)
+    show_only_my_observations = request.GET.get("show_only_my_observations", "false").lower() == "true"
+    if show_only_my_observations and current_user is None:
+        return MongoJsonResponse({"error": "Authorization token required"}, status=401)
 
     # Parses and validates filter parameters
     try:
@@ -785,17 +810,19 @@ def filter_observations(request):
         species = request.GET.get("species")
         continent_filter = request.GET.get("continent", "All Continents")
 
-        start_date = datetime.fromisoformat(request.GET["start_date"])
-        end_date = datetime.fromisoformat(request.GET["end_date"])
+        start_date = to_utc_datetime(request.GET["start_date"])
+        end_date = to_utc_datetime(request.GET["end_date"])
+        if start_date is None or end_date is None:
+            raise ValueError("unparseable date")
     except (KeyError, ValueError) as e:
         logger.error(f"Invalid date format or missing date param: {e}")
-        return JsonResponse(
+        return MongoJsonResponse(
             {"error": "Valid start_date and end_date (ISO format) are required"},
             status=400
         )
 
     if not (family or genus or species):
-        return JsonResponse(
+        return MongoJsonResponse(
             {"error": "At least one of family, genus or species must be provided"},
             status=400
         )
@@ -807,19 +834,12 @@ def filter_observations(request):
     if genus and genus != "All":
         species_query["genus"] = genus
     if species and species != "All":
-        species_query["species"] = species
+        species_query["species_key"] = species_key(species)
 
     # Queries species collection to get matching species IDs
-    matching_species_ids = db["species"].distinct("_id", species_query)
+    adb = get_async_db()
+    matching_species_ids = await adb["species"].distinct("_id", species_query)
 
-    # Validates user_id from token as ObjectId
-    try:
-        user_object_id = ObjectId(user_id_from_token)
-    except Exception:
-        return JsonResponse({"error": "Invalid user_id in token"}, status=400)
-
-    show_only_my_observations = request.GET.get("show_only_my_observations", "false").lower() == "true"
-    
     # Builds MongoDB aggregation match stage including user_id filter
     match_stage = {
         "species_id": {"$in": matching_species_ids},
@@ -827,7 +847,7 @@ def filter_observations(request):
     }
 
     if show_only_my_observations:
-        match_stage["user_id"] = user_object_id
+        match_stage["user_id"] = current_user["_id"]
 
     # Builds aggregation pipeline
     pipeline = [
@@ -869,10 +889,11 @@ def filter_observations(request):
     ]
 
     try:
-        observations = list(db["observations"].aggregate(pipeline))
+        cursor = await adb["observations"].aggregate(pipeline)
+        observations = await cursor.to_list()
     except Exception as e:
         logger.error(f"Error running aggregation: {e}")
-        return JsonResponse({"error": "Error fetching observations"}, status=500)
+        return MongoJsonResponse({"error": "Error fetching observations"}, status=500)
 
     # Processes observations, filters by continent if needed, builds GeoJSON features
     features = []
@@ -898,69 +919,105 @@ def filter_observations(request):
                 "species": obs.get("species_name", ""),
                 "genus": obs.get("genus", ""),
                 "family": obs.get("family", ""),
-                "timestamp": obs.get("timestamp", "").isoformat() if obs.get("timestamp") else "",
+                "timestamp": obs["timestamp"].isoformat() if isinstance(obs.get("timestamp"), datetime) else obs.get("timestamp") or "",
                 "location_name": obs.get("location_name", ""),
                 "country": obs.get("country", ""),
-                "photo": obs.get("photo", []),
+                "photo": [variant_url(p, obs.get("photo_variants"), "medium") for p in obs.get("photo", [])],
                 "external_link": obs.get("external_link", "")
             }
         }
         features.append(feature)
 
-    return JsonResponse({
+    return MongoJsonResponse({
         "type": "FeatureCollection",
         "features": features
     }, safe=False)
 
 
-def convert_bson(value):
+def observation_detail_pipeline(source_id):
     """
-    Converts BSON objects to JSON-serializable formats.
-    Handles ObjectId, datetime, and nested structures.
+    Builds a single-round-trip pipeline fetching an observation together with
+    its species, submitter and location.
     """
-    if isinstance(value, dict):
-        return {k: convert_bson(v) for k, v in value.items()}
-    elif isinstance(value, (list, tuple)):
-        return [convert_bson(v) for v in value]
-    elif isinstance(value, datetime):  
-        return value.isoformat()
-    elif isinstance(value, ObjectId):
-        return str(value)
-    return value
+    return [
+        {"$match": {"source_id": source_id}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "species",
+            "localField": "species_id",
+            "foreignField": "_id",
+            "as": "species_doc"
+        }},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"username": 1, "profile_picture": 1}}],
+            "as": "user_doc"
+        }},
+        {"$lookup": {
+            "from": "locations",
+            "localField": "location_id",
+            "foreignField": "_id",
+            "as": "location_doc"
+        }}
+    ]
 
+def attach_commenter_info(comments, request, media_root_url):
+    """
+    Adds user_name and user_profile_picture to each comment.
+    Resolves all distinct commenters with a single $in query.
+    """
+    user_ids = {c["user_id"] for c in comments if c.get("user_id")}
+    commenters = {}
+    if user_ids:
+        commenters = {
+            u["_id"]: u
+            for u in users_collection.find(
+                {"_id": {"$in": list(user_ids)}},
+                {"username": 1, "profile_picture": 1}
+            )
+        }
+
+    for comment in comments:
+        commenter = commenters.get(comment.get("user_id"))
+        if commenter:
+            comment["user_name"] = commenter.get("username", "Anonymous")
+            comment["user_profile_picture"] = build_media_url(
+                commenter.get("profile_picture"), request, media_root_url
+            ) or ""
+        else:
+            comment["user_name"] = "Anonymous"
+            comment["user_profile_picture"] = ""
+    return comments
 
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def observation_detail(request, source_id):
     """
     Handles observation detail view (GET) and comment submission (POST).
-    Returns complete observation data including taxonomy, location, and comments.
+    Returns observation data including taxonomy and location; comments are
+    served separately by observation_comments.
     """
     try:
-        auth_header = request.headers.get('Authorization')
         current_user_oid = None
         is_admin = False
         is_current_user = False
         current_user = None
 
         # Checks authentication if header exists
-        if auth_header and len(auth_header.split(' ')) == 2:
-            token = auth_header.split(' ')[1]
-            try:
-                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-                user_id = payload.get("user_id")
-                if user_id:
-                    current_user_oid = ObjectId(user_id)
-                    current_user = users_collection.find_one({"_id": current_user_oid})
-                    if current_user:
-                        is_admin = "admin" in current_user.get("roles", [])
-            except (jwt.ExpiredSignatureError, jwt.InvalidTokenError) as e:
-                logger.warning(f"Invalid or expired token in observation_detail: {e}")
-
-        # Gets observation by source_id
-        observation = observations_collection.find_one({"source_id": int(source_id)})
+        current_user = optional_principal(request)
+        if current_user:
+            current_user_oid = current_user["_id"]
+            is_admin = "admin" in current_user["roles"]
+
+        # Gets observation by source_id, joined with its species, user and location for GET
+        if request.method == "POST":
+            observation = observations_collection.find_one({"source_id": int(source_id)}, {"_id": 1, "user_id": 1})
+        else:
+            observation = next(observations_collection.aggregate(observation_detail_pipeline(int(source_id))), None)
         if not observation:
-            return JsonResponse({"error": "Observation not found"}, status=404)
+            return MongoJsonResponse({"error": "Observation not found"}, status=404)
 
         observation_id = observation["_id"]
         observation_user_id = observation.get("user_id")
@@ -970,53 +1027,15 @@ def observation_detail(request, source_id):
         # --- Handles POST: Add comment ---
         if request.method == "POST":
             if not current_user_oid:
-                return JsonResponse({"error": "Authentication required to post comments"}, status=401)
-            
-            try:
-                body = json.loads(request.body)
-                comment_text = body.get("comment_text", "").strip()
-                parent_comment_id = body.get("parent_comment_id")
-
-                if not comment_text:
-                    return JsonResponse({"error": "Comment cannot be empty"}, status=400)
-
-                comment_doc = {
-                    "user_id": current_user_oid,
-                    "observation_id": observation_id,
-                    "comment_text": comment_text,
-                    "timestamp": datetime.utcnow()
-                }
-
-                # Handles reply comments
-                if parent_comment_id:
-                    try:
-                        parent_oid = ObjectId(parent_comment_id)
-                        if comments_collection.find_one({"_id": parent_oid}):
-                            comment_doc["parent_comment_id"] = parent_oid
-                        else:
-                            return JsonResponse({"error": "Parent comment not found"}, status=400)
-                    except Exception:
-                        return JsonResponse({"error": "Invalid parent_comment_id"}, status=400)
-
-                # Inserts comment and updates count
-                inserted = comments_collection.insert_one(comment_doc)
-                observations_collection.update_one({"_id": observation_id}, {"$inc": {"comments_count": 1}})
-
-                return JsonResponse({
-                    "success": True,
-                    "message": "Comment added successfully.",
-                    "comment": convert_bson(comment_doc)
-                }, status=201)
-
-            except json.JSONDecodeError:
-                return JsonResponse({"error": "Invalid JSON"}, status=400)
+                return MongoJsonResponse({"error": "Authentication required to post comments"}, status=401)
+            return create_comment(request, observation_id, current_user_oid)
 
         # --- Handles GET: Observation detail view ---
 
         # Gets taxonomy information from either species_id or raw_taxonomy
         species_data = {}
         if "species_id" in observation:
-            species = species_collection.find_one({"_id": observation["species_id"]}) or {}
+            species = observation["species_doc"][0] if observation.get("species_doc") else {}
             species_data = {
                 "species": species.get("species", ""),
                 "common_name": species.get("common_name", ""),
@@ -1042,8 +1061,9 @@ def observation_detail(request, source_id):
                 "taxonomy_source": "none"
             }
 
-        user = users_collection.find_one({"_id": observation.get("user_id")}) or {}
-        location = locations_collection.find_one({"_id": observation.get("location_id")}) or {}
+        user = observation["user_doc"][0] if observation.get("user_doc") else {}
+        location = observation["location_doc"][0] if observation.get("location_doc") else {}
+        media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
 
         # Handles coordinates from either geojson or direct fields
         coords = location.get("geojson", {}).get("coordinates", [])
@@ -1057,84 +1077,12 @@ def observation_detail(request, source_id):
 
         longitude, latitude = coords[0], coords[1]
 
-        # Gets all comments for this observation
-        comments_cursor = comments_collection.find({"observation_id": observation_id}).sort("timestamp", 1)
-        all_comments = []
-        for comment in comments_cursor:
-            comment = convert_bson(comment)
-            comment["_id"] = str(comment["_id"])
-            if "parent_comment_id" in comment:
-                comment["parent_comment_id"] = str(comment["parent_comment_id"])
-            all_comments.append(comment)
-
-        # Builds comment tree structure
-        comment_dict = {c["_id"]: c for c in all_comments}
-        for comment in all_comments:
-            comment["replies"] = []
-            comment["user_name"] = "Anonymous"
-            comment["user_profile_picture"] = ""
-
-            # Adds commenter info if available
-            commenter = users_collection.find_one({"_id": ObjectId(comment["user_id"])}) if comment.get("user_id") else None
-            if commenter:
-                pic = commenter.get("profile_picture") or ""
-                if pic.startswith("http"):
-                    profile_picture_url = pic
-                elif pic.startswith("/media/"):
-                    profile_picture_url = request.build_absolute_uri(pic)
-                else:
-                    profile_picture_url = urljoin(request.build_absolute_uri(settings.MEDIA_URL), pic.lstrip("/"))
-
-                comment["user_name"] = commenter.get("username", "Anonymous")
-                comment["user_profile_picture"] = profile_picture_url
-
-        # Builds hierarchical comment structure
-        top_level_comments = []
-        for comment in all_comments:
-            parent_id = comment.get("parent_comment_id")
-            if parent_id and parent_id in comment_dict:
-                comment_dict[parent_id]["replies"].append(comment)
-            else:
-                top_level_comments.append(comment)
-            
-        # Sorts replies chronologically
-        for comment in all_comments:
-            if 'replies' in comment:
-                comment['replies'].sort(key=lambda x: x['timestamp'])
-        
-        # Sorts top-level comments
-        top_level_comments.sort(key=lambda x: x['timestamp']) # Sort top-level comments
-
         # Processes user profile picture URL
-        user_pic = user.get("profile_picture") or ""
-        if not user_pic:
-            user_profile_picture_url = ""
-        elif user_pic.startswith("http"):
-            user_profile_picture_url = user_pic
-        elif user_pic.startswith("/media/"):
-            user_profile_picture_url = request.build_absolute_uri(user_pic)
-        else:
-            user_profile_picture_url = urljoin(request.build_absolute_uri(settings.MEDIA_URL), user_pic.lstrip("/"))
-
-        # Helper function to build full media URLs
-        def get_full_media_url(relative_path, request, settings):
-            if not relative_path:
-                return ""
-            relative_path = str(relative_path)
-            if relative_path.startswith(("http://", "https://")):
-                return relative_path
-            elif relative_path.startswith("/media/"):
-                return request.build_absolute_uri(relative_path)
-            else:
-                return urljoin(request.build_absolute_uri(settings.MEDIA_URL), relative_path.lstrip("/"))
-
-        # Processes observation photos
-        photos_from_db = observation.get("photo", [])
-        processed_photos = [get_full_media_url(p, request, settings) for p in photos_from_db]
+        user_profile_picture_url = build_media_url(user.get("profile_picture"), request, media_root_url) or ""
 
-        # Processes observation audio
-        audio_from_db = observation.get("audio", [])
-        processed_audio = [get_full_media_url(a, request, settings) for a in audio_from_db]
+        # Processes observation photos and audio
+        processed_photos = [build_media_url(p, request, media_root_url) or "" for p in observation.get("photo", [])]
+        processed_audio = [build_media_url(a, request, media_root_url) or "" for a in observation.get("audio", [])]
 
         # Generates user-friendly title based on available taxonomy
         user_title = ""
@@ -1182,19 +1130,163 @@ def observation_detail(request, source_id):
             "user_profile_picture": user_profile_picture_url,
             "user_title": user_title,
             "status": observation.get("status", ""),
-            "comments_count": len(all_comments),
-            "comments": top_level_comments,
+            "comments_count": observation.get("comments_count", 0),
             "is_admin": is_admin,
             "is_current_user": is_current_user,
             "needs_taxonomy": observation.get("status") == "pending"
         }
 
-        return JsonResponse(convert_bson(data), safe=False)
+        return MongoJsonResponse(data, safe=False)
 
     except Exception as e:
         logger.error(f"Error in observation_detail: {str(e)}", exc_info=True)
-        return JsonResponse({"error": "An error occurred while processing your request", "details": str(e)}, status=500)
+        return MongoJsonResponse({"error": "An error occurred while processing your request", "details": str(e)}, status=500)
+
+
+
+def serialize_comment(comment):
+    """Converts a comment document (with commenter info attached) for the API."""
+    data = {
+        "_id": str(comment["_id"]),
+        "user_id": str(comment["user_id"]) if comment.get("user_id") else None,
+        "comment_text": comment.get("comment_text", ""),
+        "timestamp": comment.get("timestamp"),
+        "user_name": comment.get("user_name", "Anonymous"),
+        "user_profile_picture": comment.get("user_profile_picture", "")
+    }
+    if comment.get("parent_comment_id"):
+        data["parent_comment_id"] = str(comment["parent_comment_id"])
+    if "reply_count" in comment:
+        data["reply_count"] = comment["reply_count"]
+    return data
 
+def create_comment(request, observation_id, current_user_oid):
+    """
+    Inserts a comment or reply and returns only the new comment.
+    Replies to replies are attached to the root comment of the thread.
+    """
+    try:
+        body = json.loads(request.body)
+    except json.JSONDecodeError:
+        return MongoJsonResponse({"error": "Invalid JSON"}, status=400)
+
+    comment_text = (body.get("comment_text") or "").strip()
+    parent_comment_id = body.get("parent_comment_id")
+
+    if not comment_text:
+        return MongoJsonResponse({"error": "Comment cannot be empty"}, status=400)
+
+    comment_doc = {
+        "user_id": current_user_oid,
+        "observation_id": observation_id,
+        "comment_text": comment_text,
+        "timestamp": datetime.utcnow()
+    }
+
+    # Handles reply comments
+    if parent_comment_id:
+        try:
+            parent_oid = ObjectId(parent_comment_id)
+        except Exception:
+            return MongoJsonResponse({"error": "Invalid parent_comment_id"}, status=400)
+        parent = comments_collection.find_one(
+            {"_id": parent_oid, "observation_id": observation_id},
+            {"parent_comment_id": 1}
+        )
+        if not parent:
+            return MongoJsonResponse({"error": "Parent comment not found"}, status=400)
+        comment_doc["parent_comment_id"] = parent.get("parent_comment_id") or parent_oid
+
+    # Inserts comment and updates count
+    comment_doc["_id"] = comments_collection.insert_one(comment_doc).inserted_id
+    observations_collection.update_one({"_id": observation_id}, {"$inc": {"comments_count": 1}})
+
+    media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
+    attach_commenter_info([comment_doc], request, media_root_url)
+
+    return MongoJsonResponse({
+        "success": True,
+        "message": "Comment added successfully.",
+        "comment": serialize_comment(comment_doc)
+    }, status=201)
+
+# Comments are listed oldest first within a thread
+COMMENT_PAGE_FIELDS = ["timestamp", "_id"]
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def observation_comments(request, source_id):
+    """
+    Paginated, threaded comments for an observation.
+    GET lists top-level comments (or the replies of `parent_id`) with a
+    cursor, or only comments newer than `since` when polling.
+    POST adds a comment and returns just that comment.
+    """
+    try:
+        observation = observations_collection.find_one({"source_id": int(source_id)}, {"_id": 1})
+        if not observation:
+            return MongoJsonResponse({"error": "Observation not found"}, status=404)
+        observation_id = observation["_id"]
+
+        if request.method == "POST":
+            try:
+                principal = authenticate(request)
+            except AuthenticationError as e:
+                return MongoJsonResponse({"error": e.message}, status=e.status)
+            return create_comment(request, observation_id, principal["_id"])
+
+        query = {"observation_id": observation_id}
+        server_time = datetime.utcnow()
+
+        try:
+            limit = parse_limit(request.GET.get("limit"), default=20, maximum=100)
+
+            # Polling mode: every comment newer than `since`, in any thread
+            if request.GET.get("since"):
+                since = datetime.fromisoformat(request.GET["since"].replace("Z", "+00:00"))
+                if since.tzinfo:
+                    since = since.astimezone(dt.timezone.utc).replace(tzinfo=None)
+                query["timestamp"] = {"$gt": since}
+            else:
+                parent_id = request.GET.get("parent_id")
+                query["parent_comment_id"] = ObjectId(parent_id) if parent_id else None
+            query.update(keyset_filter(COMMENT_PAGE_FIELDS, decode_cursor(request.GET.get("cursor")), direction=1))
+        except (ValueError, InvalidId, InvalidCursor) as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
+
+        comments = list(
+            comments_collection.find(query)
+            .sort([("timestamp", 1), ("_id", 1)])
+            .limit(limit + 1)
+        )
+        comments, next_cursor = paginate(comments, limit, COMMENT_PAGE_FIELDS)
+
+        # Counts replies for the top-level comments on this page in one query
+        top_level_ids = [c["_id"] for c in comments if not c.get("parent_comment_id")]
+        if top_level_ids:
+            reply_counts = {
+                row["_id"]: row["count"]
+                for row in comments_collection.aggregate([
+                    {"$match": {"observation_id": observation_id, "parent_comment_id": {"$in": top_level_ids}}},
+                    {"$group": {"_id": "$parent_comment_id", "count": {"$sum": 1}}}
+                ])
+            }
+            for comment in comments:
+                if not comment.get("parent_comment_id"):
+                    comment["reply_count"] = reply_counts.get(comment["_id"], 0)
+
+        media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
+        attach_commenter_info(comments, request, media_root_url)
+
+        return MongoJsonResponse({
+            "comments": [serialize_comment(c) for c in comments],
+            "next_cursor": next_cursor,
+            "server_time": server_time.isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"Error in observation_comments: {str(e)}", exc_info=True)
+        return MongoJsonResponse({"error": "An error occurred while processing your request", "details": str(e)}, status=500)
     
 @require_GET
 def search_species_by_name(request):
@@ -1204,7 +1296,7 @@ def search_species_by_name(request):
     """
     term = request.GET.get("q", "").strip()
     if not term:
-        return JsonResponse([], safe=False)
+        return MongoJsonResponse([], safe=False)
 
     # Case-insensitive search on species name or common name
     query = {
@@ -1214,14 +1306,39 @@ def search_species_by_name(request):
         ]
     }
 
-    results = db["species"].find(query, {
+    results = list(db["species"].find(query, {
         "_id": 0, 
         "family": 1, 
         "genus": 1, 
         "species": 1, 
         "common_name": 1
-        })
-    return JsonResponse(list(results), safe=False)
+        }))
+
+    # Falls back to typo-tolerant matches when nothing contains the term
+    if not results:
+        results = [species for _, species in species_name_index.suggest(term)]
+    return MongoJsonResponse(results, safe=False)
+
+@require_GET
+def suggest_species(request):
+    """
+    Returns "did you mean" suggestions for a possibly misspelled name.
+    Ranked by edit distance against scientific and common names.
+    """
+    term = request.GET.get("q", "").strip()
+    if not term:
+        return MongoJsonResponse([], safe=False)
+
+    try:
+        limit = parse_limit(request.GET.get("limit"), default=5, maximum=20)
+    except ValueError:
+        return MongoJsonResponse({"error": "limit must be an integer"}, status=400)
+
+    suggestions = [
+        {**species, "distance": distance}
+        for distance, species in species_name_index.suggest(term, limit=limit)
+    ]
+    return MongoJsonResponse(suggestions, safe=False)
 
 @require_GET
 def search_species_and_users(request):
@@ -1231,7 +1348,7 @@ def search_species_and_users(request):
     """
     term = request.GET.get("q", "").strip()
     if not term:
-        return JsonResponse([], safe=False)
+        return MongoJsonResponse([], safe=False)
 
     # Species search query
     species_query = {
@@ -1283,22 +1400,20 @@ def search_species_and_users(request):
     # Combines and returns results
     results = [format_species(s) for s in species_results] + [format_user(u) for u in users_results]
 
-    return JsonResponse(results, safe=False)
+    return MongoJsonResponse(results, safe=False)
 
 @require_GET
-def homepage_stats(request):
-    """Returns basic statistics for homepage display"""
-    species_count = db["species"].count_documents({})
-    user_count = db["users"].count_documents({})
-    obs_count = db["observations"].count_documents({})
-    return JsonResponse({
-        "speciesCount": species_count,
-        "contributorCount": user_count,
-        "observationCount": obs_count
+async def homepage_stats(request):
+    """Returns basic statistics for homepage display from the maintained counters"""
+    stats = await aread_stats(get_async_db())
+    return MongoJsonResponse({
+        "speciesCount": stats["species"],
+        "contributorCount": stats["users"],
+        "observationCount": stats["observations"]
     })
 
 @require_GET
-def recent_uploads(request):
+async def recent_uploads(request):
     """Gets most recent observations for display on homepage"""
     try:
         # Base media URL for building absolute paths
@@ -1365,68 +1480,36 @@ def recent_uploads(request):
                 "description": "$additional_details",
                 "timestamp": 1,
                 "photo": 1,
+                "photo_variants": 1,
                 "comments": 1,
                 "source_id": 1,
                 "species_image_url": {"$arrayElemAt": ["$species_doc.image_url", 0]}
             }}
         ]
 
-        uploads = list(db["observations"].aggregate(pipeline))
+        cursor = await get_async_db()["observations"].aggregate(pipeline)
+        uploads = await cursor.to_list()
         processed_uploads = []
 
         for u in uploads:
             # Formats timestamp for display
             ts = u.get("timestamp")
-            if isinstance(ts, datetime):
-                date_str = ts.strftime("%d %b %Y")
-            elif isinstance(ts, str):
-                try:
-                    date_str = datetime.fromisoformat(ts).strftime("%d %b %Y")
-                except ValueError:
-                    date_str = ts
-            else:
-                date_str = ""
+            # Timestamps the migration could not parse are still strings
+            date_str = ts.strftime("%d %b %Y") if isinstance(ts, datetime) else ts or ""
 
             # Gets submitter name (prefers full name, fallbacks to username)
             submitter_name = u.get("user_name") or u.get("user") or "Anonymous"
 
-            # Processes photo URLs
-            processed_photos = []
-            photo_list = u.get("photo", [])
-            if not isinstance(photo_list, list):
-                photo_list = []
-
-            for photo in photo_list:
-                if photo.startswith("http://") or photo.startswith("https://"):
-                    processed_photos.append(photo)
-                elif photo.startswith("/media/"):
-                    processed_photos.append(request.build_absolute_uri(photo))
-                else:
-                    processed_photos.append(urljoin(media_root_url, photo.lstrip("/")))
+            # Processes photo URLs (medium variants for display, thumb for the card)
+            processed_photos = build_photo_urls(u, "medium", request, media_root_url)
 
             # Gets thumbnail (first photo or species image)
             thumbnail = None
             if processed_photos:
-                thumbnail = processed_photos[0]
+                thumbnail = build_photo_urls(u, "thumb", request, media_root_url)[0]
             elif u.get("species_image_url"):
                 thumbnail = u["species_image_url"]
 
-            # Processes comments
-            processed_comments = []
-            for c in u.get("comments", []):
-                ts = c.get("timestamp")
-                if isinstance(ts, datetime):
-                    comment_ts = ts.isoformat()
-                elif isinstance(ts, str):
-                    comment_ts = ts
-                else:
-                    comment_ts = ""
-
-                processed_comments.append({
-                    **c,
-                    "timestamp": comment_ts
-                })
-
             processed_uploads.append({
                 "species": u.get("species", "Unknown species"),
                 "common_name": u.get("common_name", ""),
@@ -1436,12 +1519,12 @@ def recent_uploads(request):
                 "date": date_str,
                 "photos": processed_photos,
                 "thumbnail": thumbnail,
-                "comments": processed_comments,
+                "comments": u.get("comments", []),
                 "source_id": u.get("source_id", ""),
-                "timestamp": ts.isoformat() if isinstance(ts, datetime) else ts
+                "timestamp": ts
             })
 
-        return JsonResponse(convert_bson(processed_uploads), safe=False)
+        return MongoJsonResponse(processed_uploads, safe=False)
 
     except Exception as e:
         print(" ERROR in recent_uploads view:", e)
@@ -1449,34 +1532,57 @@ def recent_uploads(request):
         return HttpResponseServerError("Internal Server Error: " + str(e))
 
 
-# Creates database indexes for performance
-species_collection.create_index("species", unique=True)
-locations_collection.create_index([("geojson", "2dsphere")])
+def reverse_geocode(latitude, longitude):
+    """
+    Reverses geocode coordinates using OpenStreetMap.
+    Returns name, country, and region; raises requests.RequestException on
+    network errors so callers can retry.
+    """
+    url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={latitude}&lon={longitude}"
+    headers = {'User-Agent': 'BiodiversityTracker/1.0 (RuthMary.Kurian@autonoma.cat)'}
+    response = requests.get(url, headers=headers, timeout=settings.GEOCODER_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    data = response.json()
+    if not data or "address" not in data:
+        logger.warning("[LOCATION] Malformed response from API. Skipping.")
+        return {"name": "", "country": "", "region": ""}
+    return {
+        "name": data.get("address", {}).get("city", ""),
+        "country": data.get("address", {}).get("country", ""),
+        "region": data.get("address", {}).get("state", "")
+    }
 
 def get_location_details(latitude, longitude):
     """
     Reverses geocode coordinates to get location details using OpenStreetMap.
     Returns name, country, and region if available.
     """
-
-    url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={latitude}&lon={longitude}"
-    headers = {'User-Agent': 'BiodiversityTracker/1.0 (RuthMary.Kurian@autonoma.cat)'}
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        if not data or "address" not in data:
-            logger.warning("[LOCATION] Malformed response from API. Skipping.")
-            return {"name": "", "country": "", "region": ""}
-        return {
-            "name": data.get("address", {}).get("city", ""),
-            "country": data.get("address", {}).get("country", ""),
-            "region": data.get("address", {}).get("state", "")
-        }
+        return reverse_geocode(latitude, longitude)
     except requests.RequestException as e:
         logger.error(f"[LOCATION] Error fetching location details: {e}")
         return {"name": "", "country": "", "region": ""}
 
+def queue_enrichment(observation_id):
+    """
+    Schedules background enrichment for an observation.
+    A failed dispatch is only logged; the periodic sweep picks it up later.
+    """
+    # Imported here because tasks.py imports this module
+    from .tasks import enrich_observations
+    try:
+        enrich_observations.delay([str(observation_id)])
+    except Exception as e:
+        logger.warning(f"[ENRICH] Could not queue enrichment for {observation_id}: {e}")
+
+def queue_derivatives(observation_id):
+    """Schedules thumbnail/medium variant generation for an observation's photos."""
+    from .tasks import generate_photo_derivatives
+    try:
+        generate_photo_derivatives.delay([str(observation_id)])
+    except Exception as e:
+        logger.warning(f"[DERIVATIVES] Could not queue derivatives for {observation_id}: {e}")
+
 @csrf_exempt
 @require_http_methods(["POST", "PATCH"])
 def upload_observation(request):
@@ -1488,30 +1594,16 @@ def upload_observation(request):
         logger.debug(f"Received {request.method} request to /api/upload/")
 
         # --- Authenticates user ---
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            logger.warning("Authorization header missing or invalid.")
-            return JsonResponse({"error": "Authorization header missing or invalid"}, status=401)
-
-        token = auth_header.split(' ')[1]
-        user_id = None
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = payload["user_id"]
-            user = users_collection.find_one({"_id": ObjectId(user_id)})
-            if not user:
-                logger.warning(f"User not found for ID: {user_id}")
-                return JsonResponse({"error": "User not found"}, status=404)
-            logger.debug(f"User authenticated: {user_id}")
-        except jwt.ExpiredSignatureError:
-            logger.warning("Token expired.")
-            return JsonResponse({"error": "Token expired"}, status=401)
-        except jwt.InvalidTokenError:
-            logger.warning("Invalid token provided.")
-            return JsonResponse({"error": "Invalid token"}, status=401)
+            user = authenticate(request, allow_blocked=True)
+        except AuthenticationError as e:
+            logger.warning(f"Authentication failed: {e.message}")
+            return MongoJsonResponse({"error": e.message}, status=e.status)
         except Exception as e:
             logger.error(f"JWT decoding error or user lookup: {e}", exc_info=True)
-            return JsonResponse({"error": "Authentication failed"}, status=401)
+            return MongoJsonResponse({"error": "Authentication failed"}, status=401)
+        user_id = str(user["_id"])
+        logger.debug(f"User authenticated: {user_id}")
 
         # --- Parses multipart data for PATCH requests ---
         if request.method == "PATCH":
@@ -1519,7 +1611,7 @@ def upload_observation(request):
                 data, files = MultiPartParser(request.META, request, request.upload_handlers).parse()
             except Exception as e:
                 logger.error(f"Failed to parse multipart/form-data for PATCH request: {e}", exc_info=True)
-                return JsonResponse({"error": "Invalid multipart/form-data for PATCH request"}, status=400)
+                return MongoJsonResponse({"error": "Invalid multipart/form-data for PATCH request"}, status=400)
         else:
             data = request.POST
             files = request.FILES
@@ -1527,6 +1619,10 @@ def upload_observation(request):
         logger.debug(f"Request POST data (form fields): {data.dict()}")
         logger.debug(f"Request FILES data (uploaded files): {[f.name for f in files.values()]}")
 
+        # Files rejected while streaming (unsupported type or too large)
+        if upload_errors(request):
+            return MongoJsonResponse({"error": "Some files were rejected", "files": upload_errors(request)}, status=400)
+
         is_editing = request.method == "PATCH"
         current_observation = None
         source_id = None
@@ -1537,18 +1633,18 @@ def upload_observation(request):
             
             if not source_id_str:
                 logger.error("PATCH request to /api/upload/ missing 'source_id' in URL query parameters.")
-                return JsonResponse({"error": "Missing source_id for edit (expected in URL query)"}, status=400)
+                return MongoJsonResponse({"error": "Missing source_id for edit (expected in URL query)"}, status=400)
             
             try:
                 source_id = int(source_id_str)
             except ValueError:
                 logger.error(f"Invalid source_id format: {source_id_str}")
-                return JsonResponse({"error": "Invalid source_id format (must be an integer)"}, status=400)
+                return MongoJsonResponse({"error": "Invalid source_id format (must be an integer)"}, status=400)
 
             current_observation = observations_collection.find_one({"source_id": source_id})
             if not current_observation:
                 logger.warning(f"Observation not found for source_id: {source_id}")
-                return JsonResponse({"error": "Observation not found"}, status=404)
+                return MongoJsonResponse({"error": "Observation not found"}, status=404)
             logger.debug(f"Current observation fetched for PATCH: _id={current_observation['_id']}, source_id={current_observation['source_id']}")
             
             # Authorization check for editing
@@ -1556,7 +1652,7 @@ def upload_observation(request):
             is_admin = "admin" in user.get('roles', [])
             if not (is_owner or is_admin):
                 logger.warning(f"User {user_id} not authorized to edit observation {source_id}. Owner: {current_observation['user_id']}, Admin: {is_admin}")
-                return JsonResponse({"error": "Not authorized to edit this observation"}, status=403)
+                return MongoJsonResponse({"error": "Not authorized to edit this observation"}, status=403)
 
         update_fields = {}
         
@@ -1568,7 +1664,7 @@ def upload_observation(request):
         if not is_editing:  # For new observations
             if not raw_family:
                 logger.warning("Missing required family field for new observation")
-                return JsonResponse({"error": "Family is required"}, status=400)
+                return MongoJsonResponse({"error": "Family is required"}, status=400)
 
         # Checks if taxonomy is complete (no "All" values)
         is_complete_taxonomy = (raw_genus != "All" and raw_species != "All")
@@ -1576,26 +1672,26 @@ def upload_observation(request):
         species_id_to_use = None
         if is_complete_taxonomy:
             # Only interacts with species collection for complete taxonomy
-            species_doc = species_collection.find_one({
-                "species": raw_species,
-                "genus": raw_genus,
-                "family": raw_family
-            })
+            species_doc = find_species_by_name(raw_species)
             
             if not species_doc:
                 logger.info(f"Creating new species: {raw_family}, {raw_genus}, {raw_species}")
                 species_doc = {
                     "species": raw_species,
+                    "species_key": species_key(raw_species),
                     "genus": raw_genus,
                     "family": raw_family,
                     "common_name": data.get("common_name", raw_species),
                     "image_url": "",
                     "audio_url": "",
                     "observations_count": 0,
+                    "status_counts": {},
                     "created_at": datetime.utcnow(),
                     "updated_at": datetime.utcnow()
                 }
                 species_id_to_use = species_collection.insert_one(species_doc).inserted_id
+                species_name_index.bump_version()
+                increment_stats(db, species=1)
             else:
                 species_id_to_use = species_doc["_id"]
             
@@ -1635,17 +1731,9 @@ def upload_observation(request):
                 longitude = float(data['longitude'])
             except (ValueError, TypeError):
                 logger.warning(f"Invalid coordinates: lat={data.get('latitude')} lon={data.get('longitude')}")
-                return JsonResponse({"error": "Invalid coordinates (must be real numbers)"}, status=400)
+                return MongoJsonResponse({"error": "Invalid coordinates (must be real numbers)"}, status=400)
             
             location_name = data.get('location_name', 'Unnamed Location')
-            try:
-                location_info = get_location_details(latitude, longitude) 
-                country = location_info.get('country', 'Unknown')
-                region = location_info.get('region', 'Unknown')
-                logger.debug(f"Location details fetched: country={country}, region={region}")
-            except Exception as e:
-                logger.error(f"Location fetch error: {e}", exc_info=True)
-                country = region = 'Unknown'
 
             # Checks for existing nearby location (within 10 meters)
             existing_location = locations_collection.find_one({
@@ -1675,8 +1763,10 @@ def upload_observation(request):
                     "latitude": latitude,
                     "longitude": longitude,
                     "name": location_name,
-                    "country": country,
-                    "region": region,
+                    # Country, region and continent are filled in by the enrichment task
+                    "country": "",
+                    "region": "",
+                    "enrichment": "pending",
                     "geojson": {
                         "type": "Point",
                         "coordinates": [longitude, latitude]
@@ -1700,30 +1790,32 @@ def upload_observation(request):
 
         elif not is_editing: # Required for new observations
             logger.warning("Missing latitude or longitude for new observation.")
-            return JsonResponse({"error": "Missing latitude or longitude for new observation"}, status=400)
+            return MongoJsonResponse({"error": "Missing latitude or longitude for new observation"}, status=400)
         elif is_editing and current_observation:
             logger.debug("Coordinates not provided or empty in PATCH. Location ID won't be explicitly updated unless changed.")
 
         # --- Date/Timestamp ---
         if 'date' in data:
             try:
-                observation_date = datetime.fromisoformat(data['date'])
-                observation_date_str = observation_date.isoformat() + 'Z'
+                # Stored as a BSON date (naive UTC) so range queries and sorts work
+                observation_date = to_utc_datetime(data['date'])
+                if observation_date is None:
+                    raise ValueError(data['date'])
                 # Only updates if the value has genuinely changed
-                if is_editing and observation_date_str != current_observation.get("timestamp"):
-                    update_fields["timestamp"] = observation_date_str
-                    logger.debug(f"Timestamp changed from '{current_observation.get('timestamp')}' to '{observation_date_str}'. Adding to update_fields.")
+                if is_editing and observation_date != to_utc_datetime(current_observation.get("timestamp")):
+                    update_fields["timestamp"] = observation_date
+                    logger.debug(f"Timestamp changed from '{current_observation.get('timestamp')}' to '{observation_date}'. Adding to update_fields.")
                 elif not is_editing: 
-                    update_fields["timestamp"] = observation_date_str
-                    logger.debug(f"Setting timestamp for new observation: {observation_date_str}. Adding to update_fields.")
+                    update_fields["timestamp"] = observation_date
+                    logger.debug(f"Setting timestamp for new observation: {observation_date}. Adding to update_fields.")
                 else: 
-                    logger.debug(f"Timestamp provided is identical to current: {observation_date_str}. Not adding to update_fields.")
+                    logger.debug(f"Timestamp provided is identical to current: {observation_date}. Not adding to update_fields.")
             except ValueError:
                 logger.warning(f"Invalid date format: {data.get('date')}")
-                return JsonResponse({"error": "Invalid date format. Use ISO format (YYYY-MM-DD)"}, status=400)
+                return MongoJsonResponse({"error": "Invalid date format. Use ISO format (YYYY-MM-DD)"}, status=400)
         elif not is_editing: # Required for new observations
             logger.warning("Missing required field: date for new observation.")
-            return JsonResponse({"error": "Missing required field: date for new observation"}, status=400)
+            return MongoJsonResponse({"error": "Missing required field: date for new observation"}, status=400)
         elif is_editing and current_observation:
             logger.debug("Date not provided in PATCH. Timestamp won't be explicitly updated unless changed.")
 
@@ -1733,7 +1825,7 @@ def upload_observation(request):
                 quantity = int(data['quantity'])
                 if quantity < 1:
                     logger.warning(f"Invalid quantity: {quantity}")
-                    return JsonResponse({"error": "Quantity must be positive"}, status=400)
+                    return MongoJsonResponse({"error": "Quantity must be positive"}, status=400)
                 # Only updates if the value has genuinely changed
                 if is_editing and quantity != current_observation.get("quantity"):
                     update_fields["quantity"] = quantity
@@ -1745,18 +1837,18 @@ def upload_observation(request):
                     logger.debug(f"Quantity provided is identical to current: {quantity}. Not adding to update_fields.")
             except ValueError:
                 logger.warning(f"Invalid quantity format: {data.get('quantity')}")
-                return JsonResponse({"error": "Invalid quantity (must be a number)"}, status=400)
+                return MongoJsonResponse({"error": "Invalid quantity (must be a number)"}, status=400)
         elif not is_editing: # For new observations, sets a default if not provided
             try:
                 quantity = int(data.get('quantity', 1))
                 if quantity < 1: 
                     logger.warning(f"Invalid quantity for default: {quantity}")
-                    return JsonResponse({"error": "Quantity must be positive"}, status=400)
+                    return MongoJsonResponse({"error": "Quantity must be positive"}, status=400)
                 update_fields["quantity"] = quantity
                 logger.debug(f"Setting default quantity to: {quantity}. Adding to update_fields.")
             except ValueError: 
                 logger.warning(f"Invalid quantity format for default: {data.get('quantity')}")
-                return JsonResponse({"error": "Invalid quantity (must be a number)"}, status=400)
+                return MongoJsonResponse({"error": "Invalid quantity (must be a number)"}, status=400)
         elif is_editing and current_observation:
             logger.debug("Quantity not provided in PATCH. Quantity won't be explicitly updated unless changed.")
 
@@ -1783,40 +1875,23 @@ def upload_observation(request):
         desired_photo_urls = data.getlist("existing_photos[]")
         desired_audio_urls = data.getlist("existing_audio[]")
         
+        # Dropped files lose their reference once the update is saved
+        media_to_release = []
         if is_editing:
-            photos_to_delete = [url for url in current_photo_urls if url not in desired_photo_urls]
-            audios_to_delete = [url for url in current_audio_urls if url not in desired_audio_urls]
-
-            for url in photos_to_delete + audios_to_delete:
-                try:
-                    path_in_storage = url.replace(settings.MEDIA_URL, '', 1)
-                    if default_storage.exists(path_in_storage):
-                        default_storage.delete(path_in_storage)
-                        logger.info(f"Deleted old file from storage: {path_in_storage}")
-                except Exception as e:
-                    logger.error(f"Error deleting old file {url}: {e}", exc_info=True)
+            media_to_release = [url for url in current_photo_urls if url not in desired_photo_urls]
+            media_to_release += [url for url in current_audio_urls if url not in desired_audio_urls]
         
         photo_urls = list(desired_photo_urls)
         audio_urls = list(desired_audio_urls)
 
         for uploaded_file in files.getlist("media_files"):
             try:
-                ext = guess_extension(uploaded_file.content_type) or os.path.splitext(uploaded_file.name)[1] or '.bin'
-                filename = f"{uuid.uuid4()}{ext}"
-                target_path = f"uploads/{filename}"
-                
-                saved_name = default_storage.save(target_path, ContentFile(uploaded_file.read()))
-                file_url = default_storage.url(saved_name)
+                # Stored once per distinct content; content_type was sniffed by the upload handler
+                file_url = media_store.store(uploaded_file, "uploads")
                 
                 if uploaded_file.content_type.startswith('image/'):
+                    # Species images are filled in by the enrichment task
                     photo_urls.append(file_url)
-                    if update_fields.get("species_id"):
-                        species_doc = species_collection.find_one({"_id": update_fields["species_id"]})
-                        if species_doc and not species_doc.get("image_url"):
-                            species_collection.update_one(
-                                {"_id": update_fields["species_id"]},
-                                {"$set": {"image_url": file_url, "updated_at": datetime.utcnow()}}
-                            )
                 elif uploaded_file.content_type.startswith('audio/'):
                     audio_urls.append(file_url)
                     if update_fields.get("species_id"):
@@ -1828,36 +1903,62 @@ def upload_observation(request):
                             )
             except Exception as e:
                 logger.error(f"Error saving new file: {e}", exc_info=True)
-                return JsonResponse({'error': 'Failed to save file.'}, status=500)
+                return MongoJsonResponse({'error': 'Failed to save file.'}, status=500)
         
         if photo_urls != current_photo_urls:
             update_fields["photo"] = photo_urls
+            # Keeps variants of retained photos; the derivative task adds the rest
+            current_variants = current_observation.get("photo_variants", []) if is_editing else []
+            update_fields["photo_variants"] = [v for v in current_variants if v.get("src") in photo_urls]
         if audio_urls != current_audio_urls:
             update_fields["audio"] = audio_urls
         
         if is_editing and update_fields:
             update_fields["updated_at"] = datetime.utcnow()
+            # A new location or new photos need geocoding / species images
+            if "location_id" in update_fields or "photo" in update_fields:
+                update_fields["enrichment"] = "pending"
 
         # --- Final Update/Insert ---
         if is_editing:
             meaningful_update_fields = {k: v for k, v in update_fields.items() if k != "updated_at"}
             if not meaningful_update_fields:
-                return JsonResponse({
+                return MongoJsonResponse({
                     "success": True,
                     "message": "No changes detected to update.",
                     "observation_id": str(current_observation["_id"]),
                     "source_id": current_observation["source_id"]
                 })
             
-            result = observations_collection.update_one(
+            unset_fields = update_fields.pop("$unset", {})
+            update_doc = {"$set": update_fields}
+            if unset_fields:
+                update_doc["$unset"] = unset_fields
+
+            # Returns the document as it was just before this write, so counters
+            # move from its real previous species/status even under concurrent edits
+            previous_observation = observations_collection.find_one_and_update(
                 {"_id": current_observation["_id"]},
-                {"$set": update_fields}
+                update_doc,
+                projection=COUNTER_FIELDS
             )
 
-            if result.matched_count == 0:
-                return JsonResponse({"error": "Failed to update observation: not found"}, status=404)
+            if previous_observation is None:
+                return MongoJsonResponse({"error": "Failed to update observation: not found"}, status=404)
+
+            for url in media_to_release:
+                media_store.release(url)
+
+            # Adjusts global and species counters for the edited observation
+            updated_observation = {k: v for k, v in {**previous_observation, **update_fields}.items() if k not in unset_fields}
+            record_observation_change(db, previous_observation, updated_observation)
+
+            if update_fields.get("enrichment") == "pending":
+                queue_enrichment(current_observation["_id"])
+            if "photo" in update_fields:
+                queue_derivatives(current_observation["_id"])
             
-            return JsonResponse({
+            return MongoJsonResponse({
                 "success": True,
                 "message": "Observation updated successfully.",
                 "observation_id": str(current_observation["_id"]),
@@ -1865,9 +1966,7 @@ def upload_observation(request):
             })
 
         # --- New Observation Creation ---
-        new_source_id = int(str(uuid.uuid4().int)[:9])
-        while observations_collection.find_one({"source_id": new_source_id}):
-            new_source_id = int(str(uuid.uuid4().int)[:9])
+        new_source_id = allocate_source_id()
 
         observation_doc = {
             "location_id": update_fields["location_id"],
@@ -1881,7 +1980,8 @@ def upload_observation(request):
             "user_id": ObjectId(user_id),
             "created_at": datetime.utcnow(),
             "source_id": new_source_id,
-            "comments_count": 0
+            "comments_count": 0,
+            "enrichment": "pending"
         }
 
         if "species_id" in update_fields:
@@ -1890,14 +1990,12 @@ def upload_observation(request):
             observation_doc["raw_taxonomy"] = update_fields["raw_taxonomy"]
 
         inserted = observations_collection.insert_one(observation_doc)
-        
-        if "species_id" in observation_doc:
-            species_collection.update_one(
-                {"_id": observation_doc["species_id"]},
-                {"$inc": {"observations_count": 1}}
-            )
+        record_observation_change(db, None, observation_doc)
+        queue_enrichment(inserted.inserted_id)
+        if observation_doc["photo"]:
+            queue_derivatives(inserted.inserted_id)
 
-        return JsonResponse({
+        return MongoJsonResponse({
             "success": True,
             "message": "Observation submitted successfully.",
             "observation_id": str(inserted.inserted_id),
@@ -1906,142 +2004,244 @@ def upload_observation(request):
 
     except Exception as e:
         logger.exception("Error in upload_observation:")
-        return JsonResponse({"error": "An internal server error occurred", "details": str(e)}, status=500)
+        return MongoJsonResponse({"error": "An internal server error occurred", "details": str(e)}, status=500)
+
+@require_GET
+def observation_enrichment(request, source_id):
+    """
+    Reports background enrichment status for an observation:
+    pending, done or failed, plus the enriched location fields.
+    """
+    observation = observations_collection.find_one(
+        {"source_id": source_id},
+        {"enrichment": 1, "enriched_at": 1, "location_id": 1}
+    )
+    if not observation:
+        return MongoJsonResponse({"error": "Observation not found"}, status=404)
+
+    location = None
+    if observation.get("location_id"):
+        location = locations_collection.find_one(
+            {"_id": observation["location_id"]},
+            {"_id": 0, "name": 1, "country": 1, "region": 1, "continent": 1, "enrichment": 1, "enrichment_attempts": 1}
+        )
+
+    return MongoJsonResponse({
+        "source_id": source_id,
+        # Observations saved before enrichment existed have no marker
+        "enrichment": observation.get("enrichment", "done"),
+        "enriched_at": observation.get("enriched_at"),
+        "location": location
+    })
+
+PROFILE_SPECIES_LOOKUP = {"$lookup": {
+    "from": "species",
+    "localField": "species_id",
+    "foreignField": "_id",
+    "pipeline": [{"$project": {"species": 1, "common_name": 1}}],
+    "as": "species"
+}}
+
+def profile_header_pipeline(user_oid):
+    """
+    Builds the single-round-trip profile header, run on observations: a
+    $facet yields the per-status counts and the latest observation, then
+    lookups add the user document and a comments $facet (count and latest
+    comment with its species).
+    """
+    return [
+        {"$match": {"user_id": user_oid}},
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "latest_observation": [
+                {"$sort": {"timestamp": -1, "_id": -1}},
+                {"$limit": 1},
+                PROFILE_SPECIES_LOOKUP,
+                {"$project": {
+                    "_id": 1,
+                    "source_id": 1,
+                    "timestamp": 1,
+                    "species": {"$arrayElemAt": ["$species.species", 0]},
+                    "common_name": {"$arrayElemAt": ["$species.common_name", 0]}
+                }}
+            ]
+        }},
+        {"$lookup": {
+            "from": "users",
+            "pipeline": [
+                {"$match": {"_id": user_oid}},
+                {"$project": {"username": 1, "name": 1, "profile_picture": 1, "created_at": 1}}
+            ],
+            "as": "user"
+        }},
+        {"$lookup": {
+            "from": "comments",
+            "pipeline": [
+                {"$match": {"user_id": user_oid}},
+                {"$facet": {
+                    "count": [{"$count": "total"}],
+                    "latest": [
+                        {"$sort": {"timestamp": -1}},
+                        {"$limit": 1},
+                        {"$lookup": {
+                            "from": "observations",
+                            "localField": "observation_id",
+                            "foreignField": "_id",
+                            "pipeline": [{"$project": {"species_id": 1}}, PROFILE_SPECIES_LOOKUP],
+                            "as": "observation"
+                        }},
+                        {"$project": {
+                            "timestamp": 1,
+                            "species": {"$arrayElemAt": [{"$arrayElemAt": ["$observation.species", 0]}, 0]}
+                        }}
+                    ]
+                }}
+            ],
+            "as": "comments"
+        }}
+    ]
+
+def profile_observations_pipeline(user_oid, after, limit):
+    """
+    Builds one page of a user's observations, newest first, read through the
+    (user_id, timestamp, _id) index; the joins run only for the page.
+    """
+    match = {"user_id": user_oid}
+    match.update(keyset_filter(OBSERVATION_PAGE_FIELDS, after))
+    return [
+        {"$match": match},
+        {"$sort": {"timestamp": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        PROFILE_SPECIES_LOOKUP,
+        {"$lookup": {
+            "from": "locations",
+            "localField": "location_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1, "region": 1, "country": 1}}],
+            "as": "location"
+        }},
+        {"$project": {
+            "_id": 1,
+            "source_id": 1,
+            "timestamp": 1,
+            "status": 1,
+            "species": {"$arrayElemAt": ["$species.species", 0]},
+            "common_name": {"$arrayElemAt": ["$species.common_name", 0]},
+            "location_name": {"$arrayElemAt": ["$location.name", 0]},
+            "region": {"$arrayElemAt": ["$location.region", 0]},
+            "country": {"$arrayElemAt": ["$location.country", 0]},
+            "photo": {"$slice": ["$photo", 1]},
+            "photo_variants": {"$slice": ["$photo_variants", 1]}
+        }}
+    ]
 
 @require_GET
 @csrf_exempt
 def user_profile(request, user_id=None):
     """
-    Gets user profile data including statistics and recent observations.
-    Requires authentication and checks authorization.
+    Gets the user profile header: user data, statistics and latest activity.
+    Observations are paged separately by user_profile_observations.
+    Requires authentication.
     """
     try:
-        # Checks for JWT and get current user ID
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or len(auth_header.split(' ')) != 2:
-            return JsonResponse({"error": "Authorization header missing or malformed"}, status=401)
-
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        current_user_id = payload.get("user_id")
-        if not current_user_id:
-            return JsonResponse({"error": "Invalid token payload"}, status=401)
-
-        current_user_oid = ObjectId(current_user_id)
+        # Resolves the current user from the JWT (cached principal)
+        try:
+            current_user = authenticate(request, allow_blocked=True)
+        except AuthenticationError as e:
+            return MongoJsonResponse({"error": e.message}, status=e.status)
+        current_user_oid = current_user["_id"]
 
         # If user_id not provided in URL, uses current user's ID
         target_user_oid = ObjectId(user_id) if user_id else current_user_oid
 
-        # Fetches current user (for admin check)
-        current_user = db.users.find_one({"_id": current_user_oid})
-        if not current_user:
-            return JsonResponse({"error": "Current user not found"}, status=404)
-
-        is_admin = "admin" in current_user.get("roles", [])
+        is_admin = "admin" in current_user["roles"]
         is_current_user = current_user_oid == target_user_oid
 
-        # Fetches target user data
-        user = db.users.find_one({"_id": target_user_oid})
-        if not user:
-            return JsonResponse({"error": "User not found"}, status=404)
+        # Fetches the user, statistics and latest activity in one aggregation
+        header = next(db.observations.aggregate(profile_header_pipeline(target_user_oid)), None)
+        if not header or not header["user"]:
+            return MongoJsonResponse({"error": "User not found"}, status=404)
+        user = header["user"][0]
 
-        # Builds absolute media URL root
         media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
 
-        # Applies profile picture URL logic
-        pic = user.get("profile_picture", "")
-        if pic:
-            if pic.startswith("http://") or pic.startswith("https://"):
-                profile_picture_url = pic
-            elif pic.startswith("/media/"):
-                profile_picture_url = request.build_absolute_uri(pic)
-            else:
-                profile_picture_url = urljoin(media_root_url, pic.lstrip("/"))
-        else:
-            profile_picture_url = None
-        
-        # Fetches user's observations with species and location data
-        observations = list(db.observations.aggregate([
-            {"$match": {"user_id": target_user_oid}},
-            {"$sort": {"timestamp": -1}},
-            {"$lookup": {
-                "from": "species",
-                "localField": "species_id",
-                "foreignField": "_id",
-                "as": "species"
-            }},
-            {"$lookup": {
-                "from": "locations",
-                "localField": "location_id",
-                "foreignField": "_id",
-                "as": "location"
-            }},
-            {"$project": {
-                "_id": 1,
-                "source_id": 1,
-                "timestamp": 1,
-                "status": 1,
-                "species": {"$arrayElemAt": ["$species.species", 0]},
-                "common_name": {"$arrayElemAt": ["$species.common_name", 0]},
-                "location_name": {"$arrayElemAt": ["$location.name", 0]},
-                "region": {"$arrayElemAt": ["$location.region", 0]},
-                "country": {"$arrayElemAt": ["$location.country", 0]},
-                "photo": {"$arrayElemAt": ["$photo", 0]}
-            }}
-        ]))
-
-        # Fetches latest comment and related observation for activity section
-        latest_comment = db.comments.find_one(
-            {"user_id": target_user_oid},
-            sort=[("timestamp", -1)]
-        )
-
-        recent_activity = None
-        if latest_comment:
-            obs = db.observations.find_one({"_id": latest_comment["observation_id"]})
-            if obs:
-                species = db.species.find_one({"_id": obs["species_id"]})
-                if species:
-                    species_name = species.get("common_name") or species.get("species")
-                    recent_activity = {
-                        "text": f"Commented on {species_name} observation",
-                        "timestamp": latest_comment.get("timestamp")
-                    }
-
-        # Counts statistics
+        status_counts = {row["_id"]: row["count"] for row in header["by_status"]}
+        comments = header["comments"][0] if header["comments"] else {"count": [], "latest": []}
         stats = {
-            "total_observations": db.observations.count_documents({"user_id": target_user_oid}),
-            "verified_entries": db.observations.count_documents({
-                "user_id": target_user_oid,
-                "status": "verified"
-            }),
-            "comments_count": db.comments.count_documents({"user_id": target_user_oid})
+            "total_observations": sum(status_counts.values()),
+            "verified_entries": status_counts.get("verified", 0),
+            "comments_count": comments["count"][0]["total"] if comments["count"] else 0
         }
 
-        # Cleans BSON types for JSON response
-        user_clean = convert_bson(user)
-        observations_clean = convert_bson(observations)
+        # Latest comment for the activity section, when its observation has a species
+        recent_activity = None
+        latest_comment = comments["latest"][0] if comments["latest"] else None
+        if latest_comment and latest_comment.get("species"):
+            species = latest_comment["species"]
+            species_name = species.get("common_name") or species.get("species")
+            recent_activity = {
+                "text": f"Commented on {species_name} observation",
+                "timestamp": latest_comment.get("timestamp")
+            }
 
-        return JsonResponse({
+        return MongoJsonResponse({
             "user": {
-                "username": user_clean.get("username"),
-                "name": user_clean.get("name", ""),
-                "profile_picture": profile_picture_url,
-                "created_at": user_clean.get("created_at"),
+                "username": user.get("username"),
+                "name": user.get("name", ""),
+                "profile_picture": build_media_url(user.get("profile_picture"), request, media_root_url),
+                "created_at": user.get("created_at"),
                 "is_current_user": is_current_user,
                 "is_admin": is_admin
             },
-            "observations": observations_clean,
+            "latest_observation": header["latest_observation"][0] if header["latest_observation"] else None,
             "stats": stats,
             "recent_activity": recent_activity
         })
 
     except InvalidId:
-        return JsonResponse({"error": "Invalid user ID format"}, status=400)
+        return MongoJsonResponse({"error": "Invalid user ID format"}, status=400)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
-        return JsonResponse({"error": "Invalid or expired token"}, status=401)
+        return MongoJsonResponse({"error": "Invalid or expired token"}, status=401)
+    except Exception as e:
+        return MongoJsonResponse({"error": str(e)}, status=500)
+
+@require_GET
+@csrf_exempt
+def user_profile_observations(request, user_id=None):
+    """
+    Gets one page of a user's observations, newest first, plus a cursor for
+    the next page. Requires authentication.
+    """
+    try:
+        try:
+            current_user = authenticate(request, allow_blocked=True)
+        except AuthenticationError as e:
+            return MongoJsonResponse({"error": e.message}, status=e.status)
+
+        target_user_oid = ObjectId(user_id) if user_id else current_user["_id"]
+
+        try:
+            limit = parse_limit(request.GET.get("limit"), default=20, maximum=100)
+            pipeline = profile_observations_pipeline(target_user_oid, decode_cursor(request.GET.get("cursor")), limit)
+        except (ValueError, InvalidCursor) as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
+
+        observations = list(db.observations.aggregate(pipeline))
+        observations, next_cursor = paginate(observations, limit, OBSERVATION_PAGE_FIELDS)
+
+        # Serves the thumbnail variant of each observation's first photo
+        media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
+        for obs in observations:
+            thumbnails = build_photo_urls(obs, "thumb", request, media_root_url)
+            obs["photo"] = thumbnails[0] if thumbnails else None
+            obs.pop("photo_variants", None)
+
+        return MongoJsonResponse({"observations": observations, "next_cursor": next_cursor})
+
+    except InvalidId:
+        return MongoJsonResponse({"error": "Invalid user ID format"}, status=400)
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return MongoJsonResponse({"error": str(e)}, status=500)
 
 @require_http_methods(["GET", "PUT", "PATCH", "DELETE"])
 @csrf_exempt
@@ -2051,26 +2251,21 @@ def edit_profile(request, user_id=None):
     Supports GET (view), PUT/PATCH (update), and DELETE operations.
     """
     try:
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or len(auth_header.split(' ')) != 2:
-            return JsonResponse({"error": "Authorization header missing or malformed"}, status=401)
-
-        token = auth_header.split(' ')[1]
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        current_user_id = payload.get("user_id")
-        if not current_user_id:
-            return JsonResponse({"error": "Invalid token payload"}, status=401)
+        # Resolves the current user from the JWT (cached principal)
+        try:
+            principal = authenticate(request, allow_blocked=True)
+        except AuthenticationError as e:
+            return MongoJsonResponse({"error": e.message}, status=e.status)
 
-        current_user_oid = ObjectId(current_user_id)
+        current_user_oid = principal["_id"]
         target_user_oid = ObjectId(user_id) if user_id else current_user_oid
 
         # Checks if current user is admin
-        current_user = db.users.find_one({"_id": current_user_oid})
-        is_admin = "admin" in current_user.get("roles", [])
+        is_admin = "admin" in principal["roles"]
 
         # Authorization check
         if not is_admin and target_user_oid != current_user_oid:
-            return JsonResponse({"error": "Unauthorized to edit this profile"}, status=403)
+            return MongoJsonResponse({"error": "Unauthorized to edit this profile"}, status=403)
 
         media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
 
@@ -2087,7 +2282,7 @@ def edit_profile(request, user_id=None):
             # Gets profile data for viewing
             user = db.users.find_one({"_id": target_user_oid})
             if not user:
-                return JsonResponse({"error": "User not found"}, status=404)
+                return MongoJsonResponse({"error": "User not found"}, status=404)
 
             observations_count = db.observations.count_documents({"user_id": target_user_oid})
             species_count = len(db.observations.distinct("species_id", {"user_id": target_user_oid}))
@@ -2103,7 +2298,7 @@ def edit_profile(request, user_id=None):
 
             profile_picture = process_profile_picture(user.get("profile_picture", ""))
             
-            return JsonResponse({
+            return MongoJsonResponse({
                 "name": user.get("name", ""),
                 "description": user.get("description", ""),
                 "profile_picture": profile_picture,
@@ -2117,16 +2312,18 @@ def edit_profile(request, user_id=None):
         elif request.method in ["PUT", "PATCH"]:
             # Updates profile data
             if not is_admin and target_user_oid != current_user_oid:
-                return JsonResponse({"error": "Cannot edit other users' profiles"}, status=403)
+                return MongoJsonResponse({"error": "Cannot edit other users' profiles"}, status=403)
 
             current_user = db.users.find_one({"_id": current_user_oid})
             if not current_user:
-                return JsonResponse({"error": "User not found"}, status=404)
+                return MongoJsonResponse({"error": "User not found"}, status=404)
 
             update_fields = {}
 
             if request.content_type and "multipart/form-data" in request.content_type:
                 post_data, files_data = MultiPartParser(request.META, request, request.upload_handlers).parse()
+                if upload_errors(request):
+                    return MongoJsonResponse({"error": "Some files were rejected", "files": upload_errors(request)}, status=400)
 
                 if 'name' in post_data:
                     update_fields['name'] = post_data.get('name', '').strip()
@@ -2136,11 +2333,9 @@ def edit_profile(request, user_id=None):
 
                 if 'profile_picture' in files_data:
                     file = files_data['profile_picture']
-                    ext = os.path.splitext(file.name)[1]
-                    filename = f"{uuid.uuid4().hex}{ext}"
-                    save_path = os.path.join("profile_pictures", filename)
-                    saved_path = default_storage.save(save_path, ContentFile(file.read()))
-                    update_fields['profile_picture'] = settings.MEDIA_URL + saved_path
+                    if not file.content_type.startswith("image/"):
+                        return MongoJsonResponse({"error": "Profile picture must be an image"}, status=400)
+                    update_fields['profile_picture'] = media_store.store(file, "profile_pictures")
                 elif post_data.get('profile_picture') == 'true':
                     update_fields['profile_picture'] = ""
 
@@ -2154,18 +2349,24 @@ def edit_profile(request, user_id=None):
                     if 'profile_picture' in data:
                         update_fields['profile_picture'] = "" if data['profile_picture'] is None else data['profile_picture'].strip()
                 except (json.JSONDecodeError, UnicodeDecodeError):
-                    return JsonResponse({"error": "Invalid JSON body"}, status=400)
+                    return MongoJsonResponse({"error": "Invalid JSON body"}, status=400)
 
             if update_fields:
                 db.users.update_one(
                     {"_id": current_user_oid},
                     {"$set": update_fields}
                 )
+                # The cached principal carries the display name
+                invalidate_principal(current_user_oid)
+
+                previous_picture = current_user.get("profile_picture")
+                if 'profile_picture' in update_fields and update_fields['profile_picture'] != previous_picture:
+                    media_store.release(previous_picture)
 
                 updated_user = db.users.find_one({"_id": current_user_oid})
                 profile_picture = process_profile_picture(updated_user.get("profile_picture", ""))
 
-                return JsonResponse({
+                return MongoJsonResponse({
                     "message": "Profile updated successfully",
                     "user": {
                         "name": updated_user.get("name", ""),
@@ -2176,7 +2377,7 @@ def edit_profile(request, user_id=None):
             else:
                 profile_picture = process_profile_picture(current_user.get("profile_picture", ""))
 
-                return JsonResponse({
+                return MongoJsonResponse({
                     "message": "No fields provided for update",
                     "user": {
                         "name": current_user.get("name", ""),
@@ -2187,16 +2388,16 @@ def edit_profile(request, user_id=None):
 
         elif request.method == "DELETE":
             # Deletes user account and anonymizes their data
-            requesting_user = users_collection.find_one({"_id": current_user_oid})
-            is_admin = "admin" in requesting_user.get("roles", [])
-
             if not is_admin and target_user_oid != current_user_oid:
-                return JsonResponse({"error": "Cannot delete other users' profiles"}, status=403)
+                return MongoJsonResponse({"error": "Cannot delete other users' profiles"}, status=403)
 
             # Deletes user
-            result = db.users.delete_one({"_id": target_user_oid})
-            if result.deleted_count == 0:
-                return JsonResponse({"error": "User not found"}, status=404)
+            deleted_user = db.users.find_one_and_delete({"_id": target_user_oid}, {"profile_picture": 1})
+            if deleted_user is None:
+                return MongoJsonResponse({"error": "User not found"}, status=404)
+            increment_stats(db, users=-1)
+            invalidate_principal(target_user_oid)
+            media_store.release(deleted_user.get("profile_picture"))
 
             # Anonymizes observations
             db.observations.update_many(
@@ -2210,23 +2411,28 @@ def edit_profile(request, user_id=None):
                 {"$set": {"user_id": None}} 
             )
 
-            return JsonResponse({"message": "Account deleted and observations anonymized"}, status=204)
+            return MongoJsonResponse({"message": "Account deleted and observations anonymized"}, status=204)
 
     except InvalidId:
-        return JsonResponse({"error": "Invalid User ID format."}, status=400)
+        return MongoJsonResponse({"error": "Invalid User ID format."}, status=400)
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
-        return JsonResponse({"error": "Invalid or expired token"}, status=401)
+        return MongoJsonResponse({"error": "Invalid or expired token"}, status=401)
     except Exception as e:
         logger.error(f"Error in edit_profile: {str(e)}", exc_info=True)
-        return JsonResponse({"error": f"Server error: {str(e)}"}, status=500)
+        return MongoJsonResponse({"error": f"Server error: {str(e)}"}, status=500)
 
             
 def fetch_and_store_all(request=None):
+    # Imported here: pyinaturalist is slow to import and only the sync needs it
+    from pyinaturalist import get_observations, get_taxa
+
     logger.info("[DEBUG] Starting fetch_and_store_all...")
     
     inserted_species_count = 0
     inserted_observations = 0
     inserted_comments = 0
+    inserted_users = 0
+    observation_counters = ObservationCounters()
     max_pages = 50  
     per_page = 200 
     iconic_insecta_id = 47158  # Taxa ID for insects
@@ -2248,7 +2454,7 @@ def fetch_and_store_all(request=None):
             logger.info(f"[TAXA] Total expected species: {total_species_expected}")
         except Exception as e:
             logger.error(f"[TAXA] Failed to fetch total species count: {e}")
-            return JsonResponse({"error": "Failed to fetch species count"}, status=500)
+            return MongoJsonResponse({"error": "Failed to fetch species count"}, status=500)
 
         # Inserts species
         for page in range(1, max_pages + 1):
@@ -2273,7 +2479,7 @@ def fetch_and_store_all(request=None):
                 species_name = taxon.get("name", "")
                 if not species_name:
                     continue
-                if species_collection.find_one({"species": species_name}):
+                if find_species_by_name(species_name, {"_id": 1}):
                     logger.info(f"[TAXA] Skipping existing species: {species_name}")
                     continue
                 if iconic_insecta_id not in taxon.get("ancestor_ids", []):
@@ -2302,12 +2508,14 @@ def fetch_and_store_all(request=None):
 
                 species_to_insert.append({
                     "species": species_name,
+                    "species_key": species_key(species_name),
                     "family": family,
                     "genus": genus,
                     "common_name": taxon.get("preferred_common_name", ""),
                     "image_url": taxon.get("default_photo", {}).get("medium_url", ""),
                     "audio_url": "",
-                    "observations_count": 0
+                    "observations_count": 0,
+                    "status_counts": {}
                 })
 
             if species_to_insert:
@@ -2316,6 +2524,7 @@ def fetch_and_store_all(request=None):
                     inserted_species_count += len(species_to_insert)
                     logger.info(f"[TAXA] Inserted {len(species_to_insert)} species for page {page}.")
                 except errors.BulkWriteError as bwe:
+                    inserted_species_count += bwe.details.get("nInserted", 0)
                     logger.warning(f"[TAXA] Bulk insert error: {bwe.details}")
                 except Exception as e:
                     logger.error(f"[TAXA] Error during bulk insert: {e}")
@@ -2324,6 +2533,9 @@ def fetch_and_store_all(request=None):
 
             time.sleep(1)
 
+        if inserted_species_count:
+            species_name_index.bump_version()
+
         # Inserts observations
         for page in range(1, max_pages + 1):
             logger.info(f"[OBS] Fetching observations (Page: {page})...")
@@ -2340,7 +2552,7 @@ def fetch_and_store_all(request=None):
                     logger.info("[OBS] Skipping observation with no species.")
                     continue
 
-                species_doc = species_collection.find_one({"species": species_name})
+                species_doc = find_species_by_name(species_name, {"_id": 1})
                 if not species_doc:
                     logger.info(f"[OBS] Species not in taxonomy: {species_name}")
                     continue
@@ -2368,6 +2580,7 @@ def fetch_and_store_all(request=None):
                             ) if user.get("created_at") else datetime.utcnow(),
                             "roles": ["user"]
                         }).inserted_id
+                        inserted_users += 1
                         logger.info(f"[USER] Inserted new user: {username}")
                     except Exception as e:
                         logger.error(f"[USER] Failed to insert: {username}, error: {e}")
@@ -2410,11 +2623,11 @@ def fetch_and_store_all(request=None):
                     continue
 
                 # Parses timestamp and inserts observation
-                observed_on = obs.get("observed_on")
-                try:
-                    timestamp = datetime.strptime(obs.get("observed_on_string", ""), "%Y/%m/%d %I:%M %p")
-                except Exception:
-                    timestamp = observed_on or datetime.utcnow()
+                timestamp = (
+                    to_utc_datetime(obs.get("observed_on_string"))
+                    or to_utc_datetime(obs.get("observed_on"))
+                    or datetime.utcnow()
+                )
 
                 obs_doc = {
                     "user_id": user_id,
@@ -2431,18 +2644,22 @@ def fetch_and_store_all(request=None):
                     "status": "verified" if obs.get("quality_grade") == "research" else "pending",
                     "source_id": obs.get("id"),
                     "external_link": obs.get("uri"),
-                    "comments_count": 1
+                    "comments_count": 0,
+                    "created_at": datetime.utcnow(),
+                    "updated_at": datetime.utcnow()
                 }
 
                 try:
                     obs_id = observations_collection.insert_one(obs_doc).inserted_id
                     inserted_observations += 1
+                    observation_counters.add(None, obs_doc)
                     logger.info(f"[OBS] Inserted observation {obs.get('id')} for species {species_name}.")
                 except Exception as e:
                     logger.error(f"[OBS] Insert failed: {e}")
                     continue
 
                 # Inserts comments associated with the observation
+                observation_comments_inserted = 0
                 for c in obs.get("comments", []):
                     try:
                         comments_collection.insert_one({
@@ -2452,27 +2669,17 @@ def fetch_and_store_all(request=None):
                             "timestamp": datetime.strptime(c.get("created_at"), "%Y-%m-%dT%H:%M:%S%z")
                         })
                         inserted_comments += 1
+                        observation_comments_inserted += 1
                         logger.info(f"[COMMENT] Inserted comment on observation {obs.get('id')}")
                     except Exception as e:
                         logger.error(f"[COMMENT] Comment insert failed for observation {obs.get('id')}: {e}")
+                if observation_comments_inserted:
+                    observations_collection.update_one({"_id": obs_id}, {"$inc": {"comments_count": observation_comments_inserted}})
 
             time.sleep(1)
 
-        # Finalizing: Updates counts for species and comments
-        logger.info("[COUNT] Updating species observation counts...")
-        for sp in species_collection.find({}, {"_id": 1}):
-            count = observations_collection.count_documents({"species_id": sp["_id"]})
-            species_collection.update_one({"_id": sp["_id"]}, {"$set": {"observations_count": count}})
-            logger.debug(f"[COUNT] Updated species {"_id"} with {count} observations.")
-
-        logger.info("[COUNT] Updating observation comment counts...")
-        for obs in observations_collection.find({}, {"_id": 1}):
-            count = comments_collection.count_documents({"observation_id": obs["_id"]})
-            observations_collection.update_one({"_id": obs["_id"]}, {"$set": {"comments_count": count}})
-            logger.debug(f"[COUNT] Updated observation {"_id"} with {count} comments.")
-
         logger.info(f"[DONE] Fetch and store completed. Species: {inserted_species_count}, Observations: {inserted_observations}, Comments: {inserted_comments}")
-        return JsonResponse({
+        return MongoJsonResponse({
             "species_inserted": inserted_species_count,
             "observations_inserted": inserted_observations,
             "comments_inserted": inserted_comments
@@ -2480,12 +2687,19 @@ def fetch_and_store_all(request=None):
 
     except Exception as e:
         logger.error(f"[FATAL ERROR] Unexpected error in fetch_and_store_all: {e}", exc_info=True)
-        return JsonResponse({"error": "An internal error occurred while processing data."}, status=500)
+        return MongoJsonResponse({"error": "An internal error occurred while processing data."}, status=500)
+
+    finally:
+        # Species and stats counters move with the inserted observations, so nothing is recounted.
+        # Applied even when the sync fails part-way, so the rows already inserted are counted
+        try:
+            observation_counters.apply(db, species=inserted_species_count, users=inserted_users)
+        except Exception as e:
+            logger.error(f"[STATS] Failed to apply sync counters: {e}")
 
 import re
 from django.contrib.admin.views.decorators import staff_member_required
 from functools import wraps
-import csv
 
 @staff_member_required
 def upgrade_observation_photos(request):
@@ -2518,7 +2732,7 @@ def upgrade_observation_photos(request):
 
         total_checked += 1
 
-    return JsonResponse({
+    return MongoJsonResponse({
         "message": f"{updated_count} observations updated out of {total_checked} checked."
     })
 
@@ -2526,32 +2740,66 @@ def upgrade_observation_photos(request):
 def dashboard_stats(request):
     """
     Gets statistics for admin dashboard.
-    Includes counts of contributions, users, and data quality metrics.
+    Includes counts of contributions, users, and data quality metrics,
+    per-status and per-source breakdowns, and when they were computed.
     """
 
-    # Gets counts from your database
-    total_contributions = db["observations"].count_documents({})
-    active_users = db["users"].count_documents({})  
-    pending_reviews = db["observations"].count_documents({"status": "pending"})
-    
-    # Data quality calculation - checks for required fields
-    complete_obs = db["observations"].count_documents({
-        "species_id": {"$exists": True},
-        "location_id": {"$exists": True},
-        "timestamp": {"$exists": True},
-        "photo": {"$exists": True, "$ne": []}
-    })
-    data_quality = round((complete_obs / total_contributions) * 100, 1) if total_contributions > 0 else 0
-    
-    return JsonResponse({
+    # Reads the background-refreshed snapshot in a single fetch
+    snapshot = read_snapshot(db)
+
+    return MongoJsonResponse({
         "stats": [
-            {"id": 1, "label": "Total Contributions", "value": total_contributions},
-            {"id": 2, "label": "Active Users", "value": active_users},
-            {"id": 3, "label": "Pending Reviews", "value": pending_reviews},
-            {"id": 4, "label": "Data Completeness", "value": data_quality},
-        ]
+            {"id": 1, "label": "Total Contributions", "value": snapshot["observations"]},
+            {"id": 2, "label": "Active Users", "value": snapshot["users"]},
+            {"id": 3, "label": "Pending Reviews", "value": snapshot["pending"]},
+            {"id": 4, "label": "Data Completeness", "value": snapshot["data_completeness"]},
+        ],
+        "breakdowns": {
+            "observations_by_status": snapshot["observations_by_status"],
+            "observations_by_source": snapshot["observations_by_source"],
+            "users_by_source": snapshot["users_by_source"],
+        },
+        "computed_at": snapshot["computed_at"]
     })
 
+USER_PAGE_FIELDS = ["created_at", "_id"]
+
+# Role priority (higher index = lower priority); a user is shown with their highest role
+ROLE_PRIORITY = ["admin", "editor", "user"]
+
+# Matches users by their highest role
+ROLE_FILTERS = {
+    "admin": {"roles": "admin"},
+    "editor": {"roles": {"$eq": "editor", "$ne": "admin"}},
+    "user": {"roles": {"$nin": ["admin", "editor"]}},
+}
+
+def recent_users_query(params):
+    """
+    Builds the user listing filter from the role, blocked and source query
+    parameters. Raises ValueError for unknown values.
+    """
+    query = {}
+    role = params.get("role")
+    if role:
+        if role not in ROLE_FILTERS:
+            raise ValueError("Invalid role")
+        query.update(ROLE_FILTERS[role])
+
+    blocked = params.get("blocked")
+    if blocked:
+        if blocked not in ("true", "false"):
+            raise ValueError("Invalid blocked value")
+        query["isBlocked"] = True if blocked == "true" else {"$ne": True}
+
+    source = params.get("source")
+    if source:
+        if source not in ("manual", "inaturalist"):
+            raise ValueError("Invalid source")
+        # Accounts registered before sources were recorded have none
+        query["source"] = "inaturalist" if source == "inaturalist" else {"$ne": "inaturalist"}
+    return query
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 @admin_required
@@ -2567,29 +2815,36 @@ def recent_users(request):
             user_id = body.get('user_id')
 
             if not user_id:
-                return JsonResponse({'error': 'User ID not provided'}, status=400)
+                return MongoJsonResponse({'error': 'User ID not provided'}, status=400)
 
             user = db["users"].find_one({"_id": ObjectId(user_id)})
             if not user:
-                return JsonResponse({'error': 'User not found'}, status=404)
+                return MongoJsonResponse({'error': 'User not found'}, status=404)
 
             new_status = not user.get("isBlocked", False)
             db["users"].update_one(
                 {"_id": ObjectId(user_id)},
                 {"$set": {"isBlocked": new_status}}
             )
-            return JsonResponse({'message': f'User status updated to {"Blocked" if new_status else "Unblocked"}', 'isBlocked': new_status})
+            invalidate_principal(user_id)
+            return MongoJsonResponse({'message': f'User status updated to {"Blocked" if new_status else "Unblocked"}', 'isBlocked': new_status})
         
-        # Defines role priority (higher index = lower priority)
-        role_priority = ["admin", "editor", "user"]
+        try:
+            query = recent_users_query(request.GET)
+            limit = parse_limit(request.GET.get("limit"), default=20, maximum=100)
+            query.update(keyset_filter(USER_PAGE_FIELDS, decode_cursor(request.GET.get("cursor"))))
+        except (ValueError, InvalidCursor) as e:
+            return MongoJsonResponse({"error": str(e)}, status=400)
 
         users = list(db["users"].find(
-            {},
-            {"_id": 1, "username": 1, "name": 1, "roles": 1, "created_at": 1, "profile_picture": 1, "isBlocked": 1}
-        ).sort("created_at", -1))
+            query,
+            {"_id": 1, "username": 1, "name": 1, "roles": 1, "created_at": 1, "profile_picture": 1, "isBlocked": 1, "source": 1}
+        ).sort([("created_at", -1), ("_id", -1)]).limit(limit + 1))
+        users, next_cursor = paginate(users, limit, USER_PAGE_FIELDS)
 
         media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
 
+        # Derives display fields for the returned page only
         for user in users:
             user["id"] = str(user.pop("_id"))
 
@@ -2599,91 +2854,100 @@ def recent_users(request):
             else:
                 user["activeDate"] = "N/A"
 
-            # Determines the highest role based on role_priority
+            # Determines the highest role based on ROLE_PRIORITY
             roles = user.get("roles", [])
             if roles:
-                user["role"] = sorted(roles, key=lambda r: role_priority.index(r) if r in role_priority else len(role_priority))[0]
+                user["role"] = sorted(roles, key=lambda r: ROLE_PRIORITY.index(r) if r in ROLE_PRIORITY else len(ROLE_PRIORITY))[0]
             else:
                 user["role"] = "user"
 
             user["name"] = user.get("name") or user["username"]
-
-
-            # Profile picture logic to obtain the complete path
-            pic = user.get("profile_picture", "")
-            if pic:
-                if pic.startswith("http://") or pic.startswith("https://"):
-                    user["profile_picture"] = pic
-                elif pic.startswith("/media/"):
-                    user["profile_picture"] = request.build_absolute_uri(pic)
-                else:
-                    user["profile_picture"] = urljoin(media_root_url, pic.lstrip("/"))
-            else:
-                user["profile_picture"] = None
-
+            user["profile_picture"] = build_media_url(user.get("profile_picture"), request, media_root_url)
             user["isBlocked"] = user.get("isBlocked", False)
+            user["source"] = "inaturalist" if user.get("source") == "inaturalist" else "manual"
 
-        return JsonResponse({"users": users})
+        return MongoJsonResponse({"users": users, "next_cursor": next_cursor})
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return JsonResponse({"error": str(e)}, status=500)
+        return MongoJsonResponse({"error": str(e)}, status=500)
     
-@csrf_exempt
-@require_http_methods(["GET", "POST"])
-@admin_required
-def pending_content(request):
+PENDING_PAGE_FIELDS = ["created_at", "_id"]
+
+def pending_content_pipeline(after, limit):
     """
-    Admin view for managing pending content.
-    Supports listing pending observations and updating their status.
+    Builds the moderation queue page: the oldest pending observations first,
+    read through the (status, created_at, _id) index, with the joins run
+    only for the page (plus one look-ahead document).
     """
-
-    if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            observation_id = data.get('observation_id')
-            new_status = data.get('status')
-
-            if not observation_id or not new_status:
-                return JsonResponse({'error': 'Observation ID and status are required'}, status=400)
-
-            if new_status not in ['verified', 'rejected']:
-                return JsonResponse({'error': 'Invalid status provided'}, status=400)
-            
-            result = db.observations.update_one(
-                {"_id": ObjectId(observation_id)},
-                {"$set": {"status": new_status}}
-            )
-
-            if result.matched_count == 0:
-                return JsonResponse({'error': 'Observation not found'}, status=404)
-
-            return JsonResponse({'message': f'Observation status updated to {new_status}'})
-        
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
-        
-    observations = list(db["observations"].aggregate([
-        {"$match": {"status": "pending"}},
+    match = {"status": "pending"}
+    match.update(keyset_filter(PENDING_PAGE_FIELDS, after, direction=1))
+    return [
+        {"$match": match},
+        {"$sort": {"created_at": 1, "_id": 1}},
+        {"$limit": limit + 1},
         {"$lookup": {
             "from": "species",
             "localField": "species_id",
             "foreignField": "_id",
+            "pipeline": [{"$project": {"species": 1, "common_name": 1, "image_url": 1}}],
             "as": "species_info"
         }},
         {"$lookup": {
             "from": "users",
             "localField": "user_id",
             "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1, "username": 1}}],
             "as": "user_info"
         }},
         {"$lookup": {
             "from": "locations",
             "localField": "location_id",
             "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1, "region": 1, "country": 1}}],
             "as": "location_info"
         }}
-    ]))
+    ]
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@admin_required
+def pending_content(request):
+    """
+    Admin view for managing pending content.
+    Supports listing one page of pending observations and updating the
+    status of one observation.
+    """
+
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            observation_id = data.get('observation_id')
+            new_status = data.get('status')
+
+            if not observation_id or not new_status:
+                return MongoJsonResponse({'error': 'Observation ID and status are required'}, status=400)
+
+            if new_status not in MODERATION_STATUSES:
+                return MongoJsonResponse({'error': 'Invalid status provided'}, status=400)
+
+            result = moderate_observations(db, [ObjectId(observation_id)], new_status)
+            if result["not_found"]:
+                return MongoJsonResponse({'error': 'Observation not found'}, status=404)
+
+            return MongoJsonResponse({'message': f'Observation status updated to {new_status}'})
+        
+        except Exception as e:
+            return MongoJsonResponse({'error': str(e)}, status=500)
+
+    try:
+        limit = parse_limit(request.GET.get("limit"), default=20, maximum=100)
+        pipeline = pending_content_pipeline(decode_cursor(request.GET.get("cursor")), limit)
+    except (ValueError, InvalidCursor) as e:
+        return MongoJsonResponse({"error": str(e)}, status=400)
+
+    observations = list(db["observations"].aggregate(pipeline))
+    observations, next_cursor = paginate(observations, limit, PENDING_PAGE_FIELDS)
 
     # Base media URL
     media_root_url = request.build_absolute_uri(settings.MEDIA_URL)
@@ -2702,20 +2966,10 @@ def pending_content(request):
         # Location priority: name > region > country
         location_name = location.get("name") or location.get("region") or location.get("country") or "Unknown"
 
-        # Thumbnail complete path logic
-        thumbnail = ""
-        photo_list = obs.get("photo")
-        if not isinstance(photo_list, list):
-            photo_list = []
-
-        if photo_list:
-            first_photo = photo_list[0]
-            if first_photo.startswith("http://") or first_photo.startswith("https://"):
-                thumbnail = first_photo
-            elif first_photo.startswith("/media/"):
-                thumbnail = request.build_absolute_uri(first_photo)
-            else:
-                thumbnail = urljoin(media_root_url, first_photo.lstrip("/"))
+        # Thumbnail: smallest variant of the first photo
+        thumbnails = build_photo_urls(obs, "thumb", request, media_root_url)
+        if thumbnails:
+            thumbnail = thumbnails[0]
         elif species.get("image_url"):
             thumbnail = species["image_url"]
         else:
@@ -2723,16 +2977,7 @@ def pending_content(request):
 
         # Parses and formats date robustly
         timestamp_raw = obs.get("timestamp")
-        if isinstance(timestamp_raw, datetime):
-            formatted_date = timestamp_raw.strftime("%b %d, %Y")
-        elif isinstance(timestamp_raw, str):
-            try:
-                parsed_timestamp = datetime.fromisoformat(timestamp_raw.replace("Z", "+00:00"))
-                formatted_date = parsed_timestamp.strftime("%b %d, %Y")
-            except ValueError:
-                formatted_date = "Unknown"
-        else:
-            formatted_date = "Unknown"
+        formatted_date = timestamp_raw.strftime("%b %d, %Y") if isinstance(timestamp_raw, datetime) else timestamp_raw or "Unknown"
 
         # Final content item
         content_items.append({
@@ -2745,110 +2990,177 @@ def pending_content(request):
             "thumbnail": thumbnail
         })
 
-    return JsonResponse({"content": content_items})
+    return MongoJsonResponse({"content": content_items, "next_cursor": next_cursor})
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@admin_required
+def pending_content_bulk(request):
+    """
+    Sets verified or rejected on many observations in one write.
+    Body: {"observation_ids": [...], "status": "verified"|"rejected"}.
+    """
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return MongoJsonResponse({"error": "Invalid JSON body"}, status=400)
+
+    new_status = data.get("status")
+    if new_status not in MODERATION_STATUSES:
+        return MongoJsonResponse({"error": "Invalid status provided"}, status=400)
+    try:
+        observation_ids = parse_observation_ids(data.get("observation_ids"))
+    except ValueError as e:
+        return MongoJsonResponse({"error": str(e)}, status=400)
+
+    try:
+        result = moderate_observations(db, observation_ids, new_status)
+    except Exception as e:
+        logger.error(f"Error in pending_content_bulk: {e}", exc_info=True)
+        return MongoJsonResponse({"error": "An error occurred while updating observations"}, status=500)
+
+    return MongoJsonResponse({"status": new_status, **result})
 
 
 @user_required
 def export_data(request, format_type):
     """
-    Handles data export requests in JSON or CSV format.
+    Streams a data export in JSON, NDJSON or CSV (zipped) format.
     Supports user-specific exports and admin full exports.
     """
     try:
         # Gets user info from JWT
         user = request.user_info
-        current_user_id = str(user["_id"])
         is_admin = "admin" in user.get("roles", [])
 
+        if format_type not in EXPORT_FORMATS:
+            return MongoJsonResponse({"error": "Unsupported format type"}, status=400)
+
         # Gets target_user_id from query params (if any)
         target_user_id = request.GET.get("target_user_id")
         if target_user_id:
             try:
                 target_user_id = str(ObjectId(target_user_id))
             except Exception:
-                return JsonResponse({"error": "Invalid target_user_id"}, status=400)
+                return MongoJsonResponse({"error": "Invalid target_user_id"}, status=400)
         else:
             target_user_id = None
 
-        collections = db.list_collection_names()
+        plan = plan_export(user["_id"], is_admin, target_user_id)
+        content_type, extension = EXPORT_FORMATS[format_type]
+        response = StreamingHttpResponse(aiterate(stream_export(format_type, plan)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="user_export.{extension}"'
+        return response
+
+    except Exception as e:
+        logger.error(f"Error in export_data: {str(e)}", exc_info=True)
+        return MongoJsonResponse({"error": "An error occurred while exporting data"}, status=500)
+
+@require_GET
+@user_required
+def export_dwca(request):
+    """
+    Streams a Darwin Core Archive of observations (occurrence.txt, meta.xml, eml.xml).
+    Filters: family, genus, species, start_date, end_date, continent, country,
+    region, status. `since` (ISO date, or "last" for the previous complete
+    export with the same filters) limits it to observations changed since then.
+    Admins export every user's observations, others only their own.
+    """
+    user = request.user_info
+    is_admin = "admin" in user.get("roles", [])
 
-        # Collections only admins can see
-        admin_only_collections = ["admin_logs", "celery_tasks", "internal_metrics", "system.indexes"]
+    try:
+        filters = dwca.parse_filters(request.GET)
+    except dwca.InvalidFilter as e:
+        return MongoJsonResponse({"error": str(e)}, status=400)
+
+    since = request.GET.get("since")
+    if since == "last":
+        since = dwca.last_watermark(user["_id"], filters)
+    elif since:
+        since = to_utc_datetime(since)
+        if since is None:
+            return MongoJsonResponse({"error": "Invalid since"}, status=400)
+
+    def save_watermark(generated_at, rows):
+        dwca.save_watermark(user["_id"], filters, generated_at)
+        logger.info(f"[EXPORT] Darwin Core Archive with {rows} occurrences for {user['_id']}")
+
+    archive = dwca.stream_archive(
+        filters,
+        user_id=None if is_admin else user["_id"],
+        since=since,
+        on_complete=save_watermark
+    )
+    response = StreamingHttpResponse(aiterate(archive), content_type="application/zip")
+    response['Content-Disposition'] = 'attachment; filename="dwca_occurrences.zip"'
+    return response
 
-        # Collections that are user-owned and should be filtered by user_id
-        user_owned_collections = {
-            "observations": "user_id",
-            "comments": "user_id"
-        }
+@csrf_exempt
+@require_http_methods(["POST"])
+@user_required
+def create_export_job(request):
+    """
+    Queues a background export. Body: {"format": "json"|"ndjson"|"csv", "target_user_id": optional}.
+    Returns the new job (202), or an identical recent one (200).
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return MongoJsonResponse({"error": "Invalid JSON body"}, status=400)
 
-        # Decides which collections to export based on user role and presence of target_user_id
-        if is_admin and target_user_id:
-            # Admin requesting export of only one user's data for user-owned collections
-            collections_to_export = [col for col in collections if col in user_owned_collections]
-        elif is_admin and not target_user_id:
-            # Admin exporting everything
-            collections_to_export = collections
-        else:
-            # Regular user exporting their own data plus all non-admin collections
-            collections_to_export = [col for col in collections if col not in admin_only_collections]
-
-        # Function to get filtered documents depending on context
-        def get_filtered_docs(collection_name):
-            if is_admin and target_user_id:
-                # Admin exporting only target user's data for user-owned collections
-                if collection_name in user_owned_collections:
-                    field = user_owned_collections[collection_name]
-                    return list(db[collection_name].find({field: ObjectId(target_user_id)}))
-                else:
-                    # No other collections are exported in this mode
-                    return []
-            if is_admin and not target_user_id:
-                # Admin exporting all data unfiltered
-                return list(db[collection_name].find())
-            if not is_admin:
-                # Regular user exports their own data for user-owned collections
-                if collection_name in user_owned_collections:
-                    field = user_owned_collections[collection_name]
-                    return list(db[collection_name].find({field: ObjectId(current_user_id)}))
-                # Skips admin-only collections for regular users
-                elif collection_name in admin_only_collections:
-                    return []
-                else:
-                    # Public collections accessible by all users
-                    return list(db[collection_name].find())
-            # Default fallback - empty
-            return []
-
-        if format_type == "json":
-            full_data = {}
-            for collection_name in collections_to_export:
-                docs = get_filtered_docs(collection_name)
-                full_data[collection_name] = json.loads(dumps(docs))
-            return JsonResponse(full_data, safe=False, json_dumps_params={'indent': 2})
-
-        elif format_type == "csv":
-            zip_buffer = io.BytesIO()
-            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-                for collection_name in collections_to_export:
-                    docs = get_filtered_docs(collection_name)
-                    if not docs:
-                        continue
-                    csv_buffer = io.StringIO()
-                    writer = csv.writer(csv_buffer)
-                    headers = sorted({key for doc in docs for key in doc.keys()})
-                    writer.writerow(headers)
-                    for doc in docs:
-                        row = [doc.get(key, "") for key in headers]
-                        writer.writerow(row)
-                    zip_file.writestr(f"{collection_name}.csv", csv_buffer.getvalue())
-            zip_buffer.seek(0)
-            response = HttpResponse(zip_buffer, content_type='application/zip')
-            response['Content-Disposition'] = 'attachment; filename="user_export.zip"'
-            return response
+    export_format = data.get("format")
+    if export_format not in EXPORT_FORMATS:
+        return MongoJsonResponse({"error": "Unsupported format type"}, status=400)
 
-        else:
-            return JsonResponse({"error": "Unsupported format type"}, status=400)
+    target_user_id = data.get("target_user_id") or None
+    if target_user_id and not ObjectId.is_valid(target_user_id):
+        return MongoJsonResponse({"error": "Invalid target_user_id"}, status=400)
 
-    except Exception as e:
-        logger.error(f"Error in export_data: {str(e)}", exc_info=True)
-        return JsonResponse({"error": "An error occurred while exporting data"}, status=500)
\ No newline at end of file
+    job, created = export_jobs.create_job(request.user_info, export_format, target_user_id)
+    if created:
+        from .tasks import run_export_job
+        try:
+            run_export_job.delay(str(job["_id"]))
+        except Exception as e:
+            logger.error(f"[EXPORT] Could not queue export job {job['_id']}: {e}")
+            export_jobs.fail_queued(job, "Could not queue export")
+            return MongoJsonResponse({"error": "Could not queue export"}, status=503)
+
+    return MongoJsonResponse(export_jobs.serialize_job(job), status=202 if created else 200)
+
+def get_accessible_job(request, job_id):
+    """Returns (job, None) if the requester may see the export job, else (None, error response)."""
+    if not ObjectId.is_valid(job_id):
+        return None, MongoJsonResponse({"error": "Invalid job ID"}, status=400)
+    job = export_jobs_collection.find_one({"_id": ObjectId(job_id)})
+    if not job or not export_jobs.can_access(job, request.user_info):
+        return None, MongoJsonResponse({"error": "Export job not found"}, status=404)
+    return job, None
+
+@require_GET
+@user_required
+def export_job_detail(request, job_id):
+    """Returns an export job's status and progress for polling."""
+    job, error = get_accessible_job(request, job_id)
+    if error:
+        return error
+    return MongoJsonResponse(export_jobs.serialize_job(job))
+
+@require_GET
+@user_required
+def download_export_job(request, job_id):
+    """Streams a finished export's artifact."""
+    job, error = get_accessible_job(request, job_id)
+    if error:
+        return error
+    path = export_jobs.artifact_path(job)
+    if job["status"] != export_jobs.DONE or not os.path.exists(path):
+        return MongoJsonResponse({"error": "Export is not available"}, status=404)
+    content_type, extension = EXPORT_FORMATS[job["format"]]
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename=f"biodiversity_export.{extension}",
+        content_type=content_type
+    )
\ No newline at end of file
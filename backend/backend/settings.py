@@ -36,6 +36,34 @@ ALLOWED_HOSTS = ['*']
 # MongoDB URI from environment variables
 MONGO_DB_URI = env('MONGO_DB_URI') # Tailored for Docker Desktop
 
+# Connection pool per process; the client is created lazily after fork
+MONGO_MAX_POOL_SIZE = env.int('MONGO_MAX_POOL_SIZE', default=100)
+MONGO_MIN_POOL_SIZE = env.int('MONGO_MIN_POOL_SIZE', default=0)
+MONGO_SERVER_SELECTION_TIMEOUT_MS = env.int('MONGO_SERVER_SELECTION_TIMEOUT_MS', default=5000)
+
+# Seconds between taxonomy version checks for the in-memory species name index
+SPECIES_INDEX_REFRESH_SECONDS = env.int('SPECIES_INDEX_REFRESH_SECONDS', default=30)
+
+# `manage.py check --deploy` warns when indexes from api/indexes.py are missing
+MONGO_VERIFY_INDEXES = env.bool('MONGO_VERIFY_INDEXES', default=True)
+
+# source_ids for uploaded observations start above iNaturalist's ids; each process reserves a block at a time
+SOURCE_ID_BASE = env.int('SOURCE_ID_BASE', default=10 ** 10)
+SOURCE_ID_BLOCK_SIZE = env.int('SOURCE_ID_BLOCK_SIZE', default=100)
+
+# Cache used for authenticated principals; locmem is per process, so a
+# shared backend (e.g. rediscache://) makes invalidation visible to all workers
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# Seconds an authenticated user's roles and blocked flag are cached
+PRINCIPAL_CACHE_TTL = env.int('PRINCIPAL_CACHE_TTL', default=30)
+
+# Background enrichment of uploads (reverse geocoding, species images)
+GEOCODER_TIMEOUT_SECONDS = env.float('GEOCODER_TIMEOUT_SECONDS', default=10)
+ENRICHMENT_BATCH_SIZE = env.int('ENRICHMENT_BATCH_SIZE', default=50)
+ENRICHMENT_MAX_ATTEMPTS = env.int('ENRICHMENT_MAX_ATTEMPTS', default=5)
+ENRICHMENT_GEOCODE_INTERVAL = env.float('ENRICHMENT_GEOCODE_INTERVAL', default=1.0)
+
 # Celery Configuration
 CELERY_BROKER_URL = MONGO_DB_URI
 CELERY_RESULT_BACKEND = MONGO_DB_URI
@@ -53,6 +81,27 @@ EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Uploads stream to temporary files; types are sniffed and sizes capped on the stream
+FILE_UPLOAD_HANDLERS = ['api.uploads.StreamingMediaUploadHandler']
+MEDIA_MAX_IMAGE_BYTES = env.int('MEDIA_MAX_IMAGE_BYTES', default=20 * 1024 * 1024)
+MEDIA_MAX_AUDIO_BYTES = env.int('MEDIA_MAX_AUDIO_BYTES', default=50 * 1024 * 1024)
+
+# Thumbnail/medium photo variants: WEBP or JPEG
+IMAGE_DERIVATIVE_FORMAT = env('IMAGE_DERIVATIVE_FORMAT', default='WEBP').upper()
+IMAGE_DERIVATIVE_QUALITY = env.int('IMAGE_DERIVATIVE_QUALITY', default=80)
+
+# Unreferenced media files are deleted after this many seconds
+MEDIA_GC_GRACE_SECONDS = env.int('MEDIA_GC_GRACE_SECONDS', default=3600)
+
+# Export jobs: identical requests within the window share a job; artifacts expire after the TTL
+EXPORT_JOB_DEDUPE_SECONDS = env.int('EXPORT_JOB_DEDUPE_SECONDS', default=600)
+EXPORT_ARTIFACT_TTL_SECONDS = env.int('EXPORT_ARTIFACT_TTL_SECONDS', default=24 * 3600)
+# A running job whose worker has not reported progress for this long is failed by the cleanup task
+EXPORT_JOB_STALE_SECONDS = env.int('EXPORT_JOB_STALE_SECONDS', default=1800)
+
+# Admin dashboard statistics older than this are served while a refresh runs in the background
+DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS = env.int('DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS', default=300)
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 
 LOGGING = {
@@ -0,0 +1,53 @@
+// Runs a background export job: creates it, polls its progress and downloads the artifact.
+
+const API_BASE = 'http://localhost:8000'
+const POLL_INTERVAL_MS = 1500
+
+export interface ExportJob {
+  id: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  format: string
+  progress: { collections_done: number; collections_total: number; rows: number; collection: string | null }
+  error?: string | null
+  download_url?: string | null
+}
+
+async function request(path: string, token: string, init: RequestInit = {}): Promise<Response> {
+  const response = await fetch(`${API_BASE}${path}`, {
+    ...init,
+    headers: { Authorization: `Bearer ${token}`, 'Content-Type': 'application/json', ...(init.headers || {}) }
+  })
+  if (!response.ok) {
+    const errorJson = await response.json().catch(() => ({}))
+    throw new Error(errorJson.error || `Export failed with status ${response.status}`)
+  }
+  return response
+}
+
+export async function runExportJob(
+  format: string,
+  options: { targetUserId?: string | null; onProgress?: (job: ExportJob) => void } = {}
+): Promise<Blob> {
+  const token = localStorage.getItem('token')
+  if (!token) {
+    throw new Error('Authentication error. Please log in again.')
+  }
+
+  const body: Record<string, string> = { format }
+  if (options.targetUserId) {
+    body.target_user_id = options.targetUserId
+  }
+  let job: ExportJob = await (await request('/api/export/jobs/', token, { method: 'POST', body: JSON.stringify(body) })).json()
+
+  while (job.status === 'queued' || job.status === 'running') {
+    options.onProgress?.(job)
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS))
+    job = await (await request(`/api/export/jobs/${job.id}/`, token)).json()
+  }
+  options.onProgress?.(job)
+
+  if (job.status !== 'done' || !job.download_url) {
+    throw new Error(job.error || 'Export failed')
+  }
+  return (await request(job.download_url, token)).blob()
+}
@@ -1,12 +1,13 @@
 // In your types.ts file
 
 export interface Comment {
-  id: string
+  _id: string
   user_name: string
   user_profile_picture?: string
   comment_text: string
   timestamp: string
   parent_comment_id?: string
+  reply_count?: number
   replies?: Comment[] // 🔁 Important: recursive replies
 }
 
@@ -67,7 +68,6 @@ export interface DetailedObservation extends Observation {
   user_profile_picture?: string
   status?: string
   comments_count?: number
-  comments?: Comment[]
   properties: {
     species: string;
     genus: string;